@@ -1,13 +1,62 @@
-def calculate_class_statistics(df, class_name):
+from utils.dataset_store import get_active_derived
+
+CLASS_STAT_COLUMNS = ['count', 'mean', 'median', 'std', 'min', 'max']
+
+
+def calculate_class_statistics(df, class_name, class_col='kelas', value_col='nilai'):
     """Hitung statistik kelas"""
-    class_data = df[df['kelas'] == class_name]
-    
+    class_data = df[df[class_col] == class_name]
+
     stats = {
-        'mean': class_data['nilai'].mean(),
-        'median': class_data['nilai'].median(),
-        'std': class_data['nilai'].std(),
-        'min': class_data['nilai'].min(),
-        'max': class_data['nilai'].max()
+        'mean': class_data[value_col].mean(),
+        'median': class_data[value_col].median(),
+        'std': class_data[value_col].std(),
+        'min': class_data[value_col].min(),
+        'max': class_data[value_col].max()
     }
-    
+
     return stats
+
+
+def calculate_all_class_statistics(df, class_col='KELAS', value_col='NILAI', by=None):
+    """
+    Statistik semua kelas sekaligus dalam satu groupby
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Data nilai (mis. hasil ``clean_leger_batch`` dengan kolom ``KELAS``)
+    class_col : str
+        Kolom kelas
+    value_col : str
+        Kolom nilai
+    by : list of str, optional
+        Kolom pengelompokan tambahan, mis. ``['MAPEL_ID']`` atau
+        ``['MAPEL_ID', 'SEMESTER']``
+
+    Returns:
+    --------
+    stats : DataFrame
+        Satu baris per kelas (dan ``by``) dengan kolom count, mean,
+        median (eksak), std, min, max
+    """
+    keys = [class_col] + list(by or [])
+    return df.groupby(keys, observed=True, sort=True)[value_col].agg(CLASS_STAT_COLUMNS)
+
+
+def get_active_class_statistics(by=None):
+    """
+    ``calculate_all_class_statistics`` untuk nilai semester (tanpa rerata)
+    dataset aktif, di-cache per dataset; None jika data tidak punya kolom
+    ``KELAS`` (hanya hasil upload multi-file yang punya)
+    """
+    by = tuple(by or ())
+
+    def build(df):
+        if 'KELAS' not in df.columns:
+            return None
+        if 'IS_RERATA' in df.columns:
+            df = df[~df['IS_RERATA']]
+        return calculate_all_class_statistics(df, by=list(by))
+
+    return get_active_derived(f"class_statistics:{','.join(by)}", build)
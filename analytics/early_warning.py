@@ -0,0 +1,391 @@
+"""
+Modul early warning: skor risiko per siswa
+
+Semua fitur dihitung per siswa dalam satu kali lintasan (factorize +
+bincount), bukan per baris nilai; perubahan KKM hanya berupa pencarian
+biner pada ``RiskIndex``:
+
+- jumlah mapel tidak tuntas (nilai rerata < KKM)
+- jarak rata-rata di bawah KKM
+- tren nilai antar semester (slope regresi linear rata-rata per semester)
+- kehadiran (opsional, dari data presensi)
+"""
+import numpy as np
+import pandas as pd
+
+from analytics.subject_analytics import DEFAULT_KKM
+from utils.dataset_store import get_active_derived
+from utils.leger_cleaner import leger_student_keys
+
+# Bobot komponen skor (dinormalisasi ulang jika presensi tidak tersedia)
+RISK_WEIGHTS = {'tidak_tuntas': 0.4, 'jarak_kkm': 0.25, 'tren': 0.2, 'kehadiran': 0.15}
+
+# Titik jenuh normalisasi: selisih sebesar ini (atau lebih) bernilai risiko penuh
+JARAK_KKM_MAKS = 20.0   # poin di bawah KKM
+TREN_TURUN_MAKS = 5.0   # poin turun per semester
+KEHADIRAN_KURANG_MAKS = 25.0  # persen di bawah batas kehadiran
+
+RISK_LEVELS = [(60, 'Tinggi'), (30, 'Sedang'), (0, 'Rendah')]
+
+DEFAULT_MIN_ATTENDANCE = 75
+
+
+class RiskIndex:
+    """
+    Struktur per siswa untuk early warning, dibangun sekali per dataset
+
+    Nilai rerata tiap siswa disimpan terurut (kunci gabungan siswa + nilai)
+    beserta jumlah kumulatifnya. Untuk KKM berapa pun, jumlah mapel tidak
+    tuntas dan jarak di bawah KKM semua siswa didapat dari satu
+    ``searchsorted`` vektor dan selisih prefix sum, tanpa memindai ulang data.
+    Fitur yang tidak bergantung KKM (rata-rata, nilai minimum, tren) dihitung
+    sekali saat membangun indeks.
+    """
+
+    def __init__(self, df):
+        keys = leger_student_keys(df['NISN'], df['NAMA_SISWA'])
+        codes, students = pd.factorize(keys)
+        n = len(students)
+
+        values = df['NILAI'].to_numpy(dtype='float64')
+        is_rerata = df['IS_RERATA'].to_numpy(dtype=bool)
+        semester = df['SEMESTER'].to_numpy(dtype='int64')
+        present = ~np.isnan(values)
+
+        # Nilai akhir per mapel = nilai rerata, terurut per (siswa, nilai)
+        final = is_rerata & present
+        final_codes, final_values = codes[final], values[final]
+        order = np.lexsort((final_values, final_codes))
+        final_codes, final_values = final_codes[order], final_values[order]
+
+        counts = np.bincount(final_codes, minlength=n)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._cumsum = np.concatenate([[0.0], np.cumsum(final_values)])
+        self._base = final_values.min() if len(final_values) else 0.0
+        self._span = (final_values.max() - self._base + 1) if len(final_values) else 1.0
+        self._keys = final_codes * self._span + (final_values - self._base)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rata_rata = (self._cumsum[self._offsets[1:]] - self._cumsum[self._offsets[:-1]]) / counts
+        # Nilai pertama setiap irisan siswa adalah nilai minimumnya
+        nilai_min = np.full(n, np.nan)
+        nilai_min[counts > 0] = final_values[self._offsets[:-1][counts > 0]]
+
+        base = pd.DataFrame({
+            'STUDENT_KEY': students,
+            'NAMA_SISWA': _first_per_code(df['NAMA_SISWA'].to_numpy(dtype=object), codes, n),
+            'NISN': _first_per_code(df['NISN'].to_numpy(dtype=object), codes, n),
+        })
+        if 'KELAS' in df.columns:
+            base['KELAS'] = _first_per_code(df['KELAS'].astype(str).to_numpy(dtype=object), codes, n)
+
+        base['RATA_RATA'] = rata_rata
+        base['NILAI_MIN'] = nilai_min
+        base['JUMLAH_MAPEL'] = counts
+        semesters = ~is_rerata & present
+        base['TREN'] = _semester_slope(codes[semesters], semester[semesters], values[semesters], n)
+
+        # Baris diurutkan menurut rata-rata sekali di sini, sehingga peringkat
+        # per KKM cukup satu radix sort skor; ``_rows`` memetakan baris fitur ke kode siswa
+        self._rows = np.argsort(rata_rata, kind='stable')
+        # Kolom identitas sebagai kategori: salin/ambil baris cukup pada kode
+        identity = [col for col in ('NAMA_SISWA', 'NISN', 'KELAS') if col in base.columns]
+        base[identity] = base[identity].astype('category')
+        self._base_features = base.set_index('STUDENT_KEY').take(self._rows)
+        self._counts = counts[self._rows]
+        self._tren = base['TREN'].to_numpy()[self._rows]
+        self._sorted_min = np.sort(nilai_min[counts > 0])
+
+    def __len__(self):
+        return len(self._base_features)
+
+    def failing(self, kkm):
+        """
+        Jumlah mapel tidak tuntas dan total kekurangan di bawah ``kkm``
+        untuk setiap siswa (dua array, urutan sama dengan baris ``features``)
+        """
+        # Kueri terurut per kode siswa (akses memori berurutan), lalu dipetakan
+        offset = min(max(kkm - self._base, 0.0), self._span)
+        positions = np.searchsorted(self._keys, np.arange(len(self)) * self._span + offset, side='left')
+        starts = self._offsets[:-1]
+        below = positions - starts
+        shortfall = kkm * below - (self._cumsum[positions] - self._cumsum[starts])
+        return below[self._rows], shortfall[self._rows]
+
+    def count_students_below(self, kkm):
+        """Jumlah siswa yang punya minimal satu nilai rerata < ``kkm``"""
+        return int(np.searchsorted(self._sorted_min, kkm, side='left'))
+
+    def align_attendance(self, rates):
+        """Kehadiran per NISN (``attendance_rates``) sejajar baris ``features``"""
+        return self._base_features['NISN'].map(rates).to_numpy(dtype='float64')
+
+    def features(self, kkm=DEFAULT_KKM):
+        """Fitur risiko untuk ``kkm`` tertentu (lihat ``compute_risk_features``)"""
+        below, jarak = self._kkm_columns(kkm)
+        return _insert_kkm_columns(self._base_features.copy(), below, jarak)
+
+    def rank(self, kkm=DEFAULT_KKM, attendance=None, min_attendance=DEFAULT_MIN_ATTENDANCE):
+        """
+        Peringkat risiko semua siswa untuk ``kkm`` tanpa menyalin tabel fitur
+
+        Skor dihitung sebagai array sejajar baris fitur (yang sudah terurut
+        menurut rata-rata), lalu diurutkan dengan satu radix sort stabil.
+        Baris tabel baru dibentuk untuk posisi yang diminta
+        (``RiskRanking.take``), misalnya satu halaman tampilan.
+
+        Parameters:
+        -----------
+        kkm : float
+            Batas tuntas nilai rerata mapel
+        attendance : ndarray, optional
+            Persen kehadiran sejajar baris fitur (``align_attendance``)
+        min_attendance : float
+            Batas kehadiran minimal (persen)
+
+        Returns:
+        --------
+        ranking : RiskRanking
+        """
+        below, jarak = self._kkm_columns(kkm)
+        score, berisiko, kehadiran = _risk_scores(
+            self._counts, below, jarak, self._tren, attendance, min_attendance
+        )
+        columns = {'MAPEL_TIDAK_TUNTAS': below, 'JARAK_KKM': jarak}
+        return RiskRanking(self._base_features, columns, score, berisiko, kehadiran)
+
+    def _kkm_columns(self, kkm):
+        """Jumlah mapel tidak tuntas dan jarak rata-rata di bawah ``kkm`` per baris fitur"""
+        below, shortfall = self.failing(kkm)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            jarak = np.where(self._counts > 0, shortfall / np.maximum(self._counts, 1), 0.0)
+        return below, jarak
+
+
+class RiskRanking:
+    """
+    Hasil ``RiskIndex.rank``: skor per siswa sebagai array dan urutan peringkat
+
+    Attributes:
+    -----------
+    order : ndarray
+        Posisi baris fitur, risiko tertinggi lebih dulu
+    at_risk_count : int
+        Jumlah siswa berisiko
+    """
+
+    def __init__(self, base_features, columns, score, berisiko, kehadiran):
+        self.order = _rank_order(score)
+        self.at_risk_count = int(berisiko.sum())
+        self._base = base_features
+        self._columns = columns
+        self._score = score
+        self._berisiko = berisiko
+        self._kehadiran = kehadiran
+        self._levels = _risk_level(score)
+
+    def __len__(self):
+        return len(self.order)
+
+    def count_level(self, level):
+        """Jumlah siswa dengan LEVEL_RISIKO ``level``"""
+        return int((self._levels == level).sum())
+
+    def positions(self, levels=None):
+        """Posisi peringkat (mulai 0) yang level risikonya termasuk ``levels``"""
+        if levels is None:
+            return np.arange(len(self))
+        return np.flatnonzero(np.isin(np.asarray(self._levels)[self.order], list(levels)))
+
+    def take(self, positions):
+        """
+        Baris tabel peringkat untuk posisi peringkat ``positions``, dengan
+        kolom yang sama seperti ``score_student_risk``
+        """
+        positions = np.asarray(positions, dtype='int64')
+        rows = self.order[positions]
+        ranked = _insert_kkm_columns(
+            self._base.take(rows), self._columns['MAPEL_TIDAK_TUNTAS'][rows], self._columns['JARAK_KKM'][rows]
+        )
+        if self._kehadiran is not None:
+            ranked['KEHADIRAN'] = self._kehadiran[rows]
+        ranked['SKOR_RISIKO'] = self._score[rows]
+        ranked['LEVEL_RISIKO'] = self._levels[rows]
+        ranked['BERISIKO'] = self._berisiko[rows]
+        ranked['PERINGKAT'] = positions + 1
+        return ranked
+
+    def to_frame(self):
+        """Seluruh tabel peringkat (untuk ekspor)"""
+        return self.take(np.arange(len(self)))
+
+
+def compute_risk_features(df, kkm=DEFAULT_KKM):
+    """
+    Fitur risiko per siswa dari data tidy leger
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Data tidy hasil ``clean_leger_data`` (kolom KELAS ikut jika ada)
+    kkm : float
+        Batas tuntas nilai rerata mapel
+
+    Returns:
+    --------
+    features : DataFrame
+        Satu baris per siswa (index ``STUDENT_KEY``): NAMA_SISWA, NISN,
+        [KELAS], RATA_RATA, NILAI_MIN, JUMLAH_MAPEL, MAPEL_TIDAK_TUNTAS,
+        JARAK_KKM, TREN
+    """
+    return RiskIndex(df).features(kkm)
+
+
+def attendance_rates(presensi, key='id_siswa', status_col='status', present_status='Hadir'):
+    """
+    Persentase kehadiran per siswa dari data presensi harian
+
+    Returns:
+    --------
+    rates : Series
+        Persen hadir (0-100), index ``key`` sebagai string
+    """
+    hadir = presensi[status_col].astype(str).str.strip().str.lower() == present_status.lower()
+    grouped = hadir.groupby(presensi[key].astype(str).str.strip())
+    return grouped.mean() * 100
+
+
+def score_student_risk(features, attendance=None, min_attendance=DEFAULT_MIN_ATTENDANCE):
+    """
+    Skor risiko 0-100 dan peringkat seluruh siswa
+
+    Parameters:
+    -----------
+    features : DataFrame
+        Hasil ``compute_risk_features``
+    attendance : Series or ndarray, optional
+        Persen kehadiran per NISN (lihat ``attendance_rates``), atau array
+        yang sudah sejajar dengan baris ``features``
+    min_attendance : float
+        Batas kehadiran minimal (persen)
+
+    Returns:
+    --------
+    ranked : DataFrame
+        ``features`` ditambah KEHADIRAN, SKOR_RISIKO, LEVEL_RISIKO,
+        BERISIKO dan PERINGKAT, terurut dari risiko tertinggi
+    """
+    score, berisiko, kehadiran = _risk_scores(
+        features['JUMLAH_MAPEL'].to_numpy(),
+        features['MAPEL_TIDAK_TUNTAS'].to_numpy(),
+        features['JARAK_KKM'].to_numpy(dtype='float64'),
+        features['TREN'].to_numpy(dtype='float64'),
+        features['NISN'].map(attendance) if isinstance(attendance, pd.Series) else attendance,
+        min_attendance
+    )
+
+    # Skor tertinggi dulu; seri diurutkan dari rata-rata terendah
+    by_mean = np.argsort(features['RATA_RATA'].to_numpy(dtype='float64'), kind='stable')
+    order = by_mean[_rank_order(score[by_mean])]
+    ranked = features.take(order)
+    if kehadiran is not None:
+        ranked['KEHADIRAN'] = kehadiran[order]
+    ranked['SKOR_RISIKO'] = score[order]
+    ranked['LEVEL_RISIKO'] = _risk_level(score[order])
+    ranked['BERISIKO'] = berisiko[order]
+    ranked['PERINGKAT'] = np.arange(1, len(ranked) + 1)
+    return ranked
+
+
+def get_active_risk_index():
+    """
+    ``RiskIndex`` dataset aktif, dibangun sekali per dataset (bukan per KKM);
+    None jika data bukan data tidy leger
+    """
+    def build(df):
+        required = {'NISN', 'NAMA_SISWA', 'NILAI', 'IS_RERATA', 'SEMESTER'}
+        if not required.issubset(df.columns):
+            return None
+        return RiskIndex(df)
+
+    return get_active_derived('risk_index', build)
+
+
+def _risk_scores(jumlah, tidak_tuntas, jarak_kkm, tren, attendance, min_attendance):
+    """
+    Skor risiko 0-100, status berisiko dan kehadiran (atau None) per siswa
+    dari array fitur yang sejajar
+    """
+    jumlah = np.asarray(jumlah, dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        components = {
+            'tidak_tuntas': np.where(jumlah > 0, tidak_tuntas / jumlah, 0.0),
+            'jarak_kkm': np.clip(jarak_kkm / JARAK_KKM_MAKS, 0, 1),
+            'tren': np.clip(-np.nan_to_num(tren) / TREN_TURUN_MAKS, 0, 1),
+        }
+
+    berisiko = tidak_tuntas > 0
+    kehadiran = None
+    if attendance is not None:
+        kehadiran = np.asarray(attendance, dtype='float64')
+        kurang = np.clip(min_attendance - np.nan_to_num(kehadiran, nan=min_attendance), 0, None)
+        components['kehadiran'] = np.clip(kurang / KEHADIRAN_KURANG_MAKS, 0, 1)
+        berisiko = berisiko | (kehadiran < min_attendance)
+
+    total_weight = sum(RISK_WEIGHTS[name] for name in components)
+    score = np.round(sum(RISK_WEIGHTS[name] * value for name, value in components.items()) / total_weight * 100, 1)
+    return score, berisiko, kehadiran
+
+
+def _rank_order(score):
+    """
+    Urutan skor tertinggi dulu untuk baris yang sudah terurut menurut
+    rata-rata (seri tetap dari rata-rata terendah). Skor berskala 0,1
+    diurutkan sebagai bilangan bulat dengan radix sort stabil.
+    """
+    return np.argsort(-np.round(score * 10).astype('int16'), kind='stable')
+
+
+def _insert_kkm_columns(features, below, jarak):
+    """Sisipkan MAPEL_TIDAK_TUNTAS dan JARAK_KKM sebelum kolom TREN"""
+    features.insert(features.columns.get_loc('TREN'), 'MAPEL_TIDAK_TUNTAS', below)
+    features.insert(features.columns.get_loc('TREN'), 'JARAK_KKM', jarak)
+    return features
+
+
+def _risk_level(score):
+    """Label level risiko (kategori) dari skor"""
+    minimums = [minimum for minimum, _ in reversed(RISK_LEVELS)]
+    labels = [label for _, label in reversed(RISK_LEVELS)]
+    codes = np.searchsorted(minimums, score, side='right') - 1
+    return pd.Categorical.from_codes(np.clip(codes, 0, None), categories=labels)
+
+
+def _first_per_code(values, codes, n):
+    """Nilai pertama kolom untuk setiap kode siswa"""
+    first = np.full(n, None, dtype=object)
+    _, positions = np.unique(codes, return_index=True)
+    first[codes[positions]] = values[positions]
+    return first
+
+
+def _semester_slope(codes, semester, values, n):
+    """
+    Slope regresi linear rata-rata nilai per semester untuk setiap siswa
+    (NaN jika kurang dari dua semester)
+    """
+    # Rata-rata per (siswa, semester) lebih dulu agar mapel tidak berbobot ganda
+    pair = codes * 16 + semester
+    pair_codes, pairs = pd.factorize(pair)
+    pair_mean = np.bincount(pair_codes, weights=values) / np.bincount(pair_codes)
+    student, x = pairs // 16, (pairs % 16).astype('float64')
+
+    count = np.bincount(student, minlength=n)
+    sum_x = np.bincount(student, weights=x, minlength=n)
+    sum_y = np.bincount(student, weights=pair_mean, minlength=n)
+    sum_xy = np.bincount(student, weights=x * pair_mean, minlength=n)
+    sum_xx = np.bincount(student, weights=x * x, minlength=n)
+
+    denominator = count * sum_xx - sum_x ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, (count * sum_xy - sum_x * sum_y) / denominator, np.nan)
@@ -1,11 +1,97 @@
+import numpy as np
 import pandas as pd
 
-def calculate_student_average(df, student_id):
+from utils.dataset_store import get_active_derived
+
+
+class StudentIndex:
+    """
+    Indeks siswa di atas data nilai
+
+    Posisi baris diurutkan per siswa satu kali; baris satu siswa lalu
+    diambil dari frame bersama lewat tabel offset (O(1)), bukan filter
+    boolean ke seluruh frame. Indeks tidak menyalin frame: yang disimpan
+    hanya posisi baris dan offset per siswa.
+    """
+
+    def __init__(self, df, key='NISN'):
+        codes, uniques = pd.factorize(df[key], sort=True)
+        present = codes >= 0
+        order = np.argsort(codes[present], kind='stable')
+
+        self.key = key
+        self.students = pd.Index(uniques, name=key)
+        self._df = df
+        self._rows = present.nonzero()[0][order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(codes[present], minlength=len(uniques)))])
+        self._positions = {student: i for i, student in enumerate(uniques)}
+
+    def __len__(self):
+        return len(self.students)
+
+    def __contains__(self, student_id):
+        return student_id in self._positions
+
+    def get(self, student_id):
+        """Semua baris milik satu siswa (DataFrame kosong jika tidak ada)"""
+        position = self._positions.get(student_id)
+        if position is None:
+            return self._df.iloc[:0]
+        return self._df.iloc[self._rows[self._offsets[position]:self._offsets[position + 1]]]
+
+    def average(self, student_id, value_col='NILAI'):
+        """Rata-rata nilai satu siswa"""
+        return self.get(student_id)[value_col].mean()
+
+    def trend(self, student_id, semester_col='SEMESTER', value_col='NILAI'):
+        """Rata-rata nilai satu siswa per semester"""
+        return self.get(student_id).groupby(semester_col)[value_col].mean()
+
+
+def calculate_student_average(df, student_id, index=None, key='id_siswa', value_col='nilai'):
     """Hitung rata-rata nilai siswa"""
-    student_data = df[df['id_siswa'] == student_id]
-    return student_data['nilai'].mean()
+    if index is not None:
+        return index.average(student_id, value_col)
+    student_data = df[df[key] == student_id]
+    return student_data[value_col].mean()
+
 
-def get_student_performance_trend(df, student_id):
+def get_student_performance_trend(df, student_id, index=None, key='id_siswa',
+                                  semester_col='semester', value_col='nilai'):
     """Dapatkan tren performa siswa"""
-    student_data = df[df['id_siswa'] == student_id]
-    return student_data.groupby('semester')['nilai'].mean()
+    if index is not None:
+        return index.trend(student_id, semester_col, value_col)
+    student_data = df[df[key] == student_id]
+    return student_data.groupby(semester_col)[value_col].mean()
+
+
+def calculate_all_student_averages(df, key='NISN', value_col='NILAI'):
+    """
+    Rata-rata nilai semua siswa dalam satu groupby
+
+    Returns:
+    --------
+    averages : Series
+        Rata-rata per siswa (index: ``key``)
+    """
+    return df.groupby(key, observed=True)[value_col].mean()
+
+
+def get_all_performance_trends(df, key='NISN', semester_col='SEMESTER', value_col='NILAI'):
+    """
+    Tren performa semua siswa dalam satu groupby
+
+    Baris nilai rerata (SEMESTER 0 pada data tidy) sebaiknya dibuang dulu
+    agar tren hanya berisi semester 1-6.
+
+    Returns:
+    --------
+    trends : DataFrame
+        Satu baris per siswa, satu kolom per semester (rata-rata nilai)
+    """
+    return df.groupby([key, semester_col], observed=True)[value_col].mean().unstack(semester_col)
+
+
+def get_active_student_index():
+    """Indeks siswa (NISN) untuk dataset aktif sesi ini, dibangun sekali per dataset"""
+    return get_active_derived('student_index', StudentIndex)
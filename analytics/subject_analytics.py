@@ -1,9 +1,122 @@
-def analyze_subject_performance(df, subject):
+import numpy as np
+import pandas as pd
+
+from utils.dataset_store import get_active_derived
+
+# KKM (Kriteria Ketuntasan Minimal) bawaan
+DEFAULT_KKM = 70
+
+
+def analyze_subject_performance(df, subject, subject_col='mata_pelajaran', value_col='nilai', kkm=DEFAULT_KKM):
     """Analisis performa per mata pelajaran"""
-    subject_data = df[df['mata_pelajaran'] == subject]
-    
+    subject_data = df[df[subject_col] == subject]
+    total = len(subject_data)
+
     return {
-        'total_students': len(subject_data),
-        'average_score': subject_data['nilai'].mean(),
-        'pass_rate': (subject_data['nilai'] >= 70).sum() / len(subject_data) * 100
+        'total_students': total,
+        'average_score': subject_data[value_col].mean(),
+        'pass_rate': (subject_data[value_col] >= kkm).sum() / total * 100 if total else np.nan
     }
+
+
+class SubjectScores:
+    """
+    Nilai semua mapel yang sudah diurutkan per (mapel, nilai)
+
+    Diurutkan sekali; jumlah siswa lulus untuk berapa pun KKM lalu dihitung
+    dengan ``searchsorted`` pada irisan tiap mapel, tanpa memindai ulang data.
+    """
+
+    def __init__(self, df, subject_col='MAPEL_ID', value_col='NILAI'):
+        subjects = df[subject_col]
+        if isinstance(subjects.dtype, pd.CategoricalDtype):
+            # Kategori tanpa data tetap muncul (grup kosong)
+            codes, labels = subjects.cat.codes.to_numpy(), subjects.cat.categories
+        else:
+            codes, labels = pd.factorize(subjects, sort=True)
+
+        values = df[value_col].to_numpy(dtype='float64')
+        present = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[present], values[present]
+        order = np.lexsort((values, codes))
+
+        self.subjects = pd.Index(labels, name=subject_col)
+        self.counts = np.bincount(codes, minlength=len(labels))
+        self.sums = np.bincount(codes, weights=values, minlength=len(labels))
+        self._values = values[order]
+        self._offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def pass_counts(self, thresholds):
+        """Jumlah nilai >= setiap ambang, bentuk (mapel, ambang)"""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype='float64'))
+        passed = np.empty((len(self.subjects), len(thresholds)), dtype='int64')
+        for i in range(len(self.subjects)):
+            passed[i] = self.counts[i] - np.searchsorted(self._scores(i), thresholds, side='left')
+        return passed
+
+    def _scores(self, i):
+        """Nilai terurut mapel ke-``i``"""
+        return self._values[self._offsets[i]:self._offsets[i + 1]]
+
+    def report(self, thresholds=(DEFAULT_KKM,), subject_kkm=None):
+        """
+        Laporan semua mapel: jumlah, rata-rata dan persentase lulus
+
+        Parameters:
+        -----------
+        thresholds : array-like
+            Daftar KKM yang diuji untuk semua mapel
+        subject_kkm : dict or Series, optional
+            KKM khusus per mapel; mapel yang tidak disebut memakai DEFAULT_KKM
+
+        Returns:
+        --------
+        report : DataFrame
+            Satu baris per mapel: ``JUMLAH``, ``RATA_RATA``, ``LULUS_<kkm>``
+            (persen) untuk tiap ambang, serta ``KKM`` dan ``LULUS_KKM`` jika
+            ``subject_kkm`` diberikan. Mapel tanpa data bernilai NaN.
+        """
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype='float64'))
+        counts = self.counts.astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(counts > 0, self.sums / counts, np.nan)
+            rates = np.where(counts[:, None] > 0, self.pass_counts(thresholds) / counts[:, None] * 100, np.nan)
+
+        report = pd.DataFrame({'JUMLAH': self.counts, 'RATA_RATA': mean}, index=self.subjects)
+        for j, threshold in enumerate(thresholds):
+            report[f"LULUS_{threshold:g}"] = rates[:, j]
+
+        if subject_kkm is not None:
+            kkm = pd.Series(subject_kkm, dtype='float64').reindex(self.subjects).fillna(DEFAULT_KKM)
+            passed = np.array([
+                self.counts[i] - np.searchsorted(self._scores(i), kkm.iat[i], side='left')
+                for i in range(len(self.subjects))
+            ])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                report['KKM'] = kkm.to_numpy()
+                report['LULUS_KKM'] = np.where(counts > 0, passed / counts * 100, np.nan)
+
+        return report
+
+
+def analyze_all_subjects(df, thresholds=(DEFAULT_KKM,), subject_kkm=None,
+                         subject_col='MAPEL_ID', value_col='NILAI'):
+    """
+    Laporan performa semua mapel sekaligus (lihat ``SubjectScores.report``)
+
+    Untuk data tidy leger, pakai baris nilai rerata (``IS_RERATA``) agar
+    setiap siswa dihitung sekali per mapel.
+    """
+    return SubjectScores(df, subject_col, value_col).report(thresholds, subject_kkm)
+
+
+def get_active_subject_scores():
+    """``SubjectScores`` nilai rerata dataset aktif, dibangun sekali per dataset"""
+    def build(df):
+        if 'MAPEL_ID' not in df.columns or 'NILAI' not in df.columns:
+            return None
+        if 'IS_RERATA' in df.columns:
+            df = df[df['IS_RERATA']]
+        return SubjectScores(df)
+
+    return get_active_derived('subject_scores', build)
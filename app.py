@@ -4,6 +4,7 @@ Versi alternatif dengan desain yang lebih modern dan clean
 """
 
 import streamlit as st
+import pandas as pd
 from pathlib import Path
 import sys
 from datetime import datetime
@@ -14,6 +15,9 @@ from datetime import datetime
 PROJECT_ROOT = Path(__file__).parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from utils.aggregate_cube import get_active_cube, get_active_overview
+from utils.dataset_store import get_active_dataset
+
 # ============================================
 # PAGE CONFIGURATION
 # ============================================
@@ -201,8 +205,8 @@ st.markdown("""
 def init_session_state():
     if 'initialized' not in st.session_state:
         st.session_state.initialized = True
-    if 'df_clean' not in st.session_state:
-        st.session_state.df_clean = None
+    if 'dataset_id' not in st.session_state:
+        st.session_state.dataset_id = None
     if 'file_name' not in st.session_state:
         st.session_state.file_name = None
     if 'upload_time' not in st.session_state:
@@ -303,18 +307,21 @@ def render_stats():
         </div>
     """, unsafe_allow_html=True)
     
-    if st.session_state.df_clean is not None:
-        df = st.session_state.df_clean
-        
-        total_students = df['NISN'].nunique() if 'NISN' in df.columns else len(df)
-        avg_score = df['NILAI'].mean() if 'NILAI' in df.columns else 0
-        
-        st.metric("Total Siswa", f"{total_students:,}")
-        st.metric("Rata-rata", f"{avg_score:.1f}")
+    overview = get_active_overview()
+    
+    if overview is not None:
+        st.metric("Total Siswa", f"{overview['total_students']:,}")
+        st.metric("Rata-rata", f"{overview['nilai_mean']:.1f}" if pd.notna(overview['nilai_mean']) else "-")
         
-        if 'NILAI' in df.columns:
-            pass_rate = (len(df[df['NILAI'] >= 60]) / len(df)) * 100
+        # Data leger dari cube; data umum langsung dari kolom NILAI
+        cube = get_active_cube()
+        if cube is not None and overview['total_records']:
+            pass_rate = cube.count_at_least(60) / overview['total_records'] * 100
             st.metric("Kelulusan", f"{pass_rate:.0f}%")
+        elif cube is None:
+            df = get_active_dataset()
+            if 'NILAI' in df.columns and len(df):
+                st.metric("Kelulusan", f"{(df['NILAI'] >= 60).mean() * 100:.0f}%")
     else:
         st.info("Upload data untuk melihat statistik")
 
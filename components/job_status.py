@@ -0,0 +1,160 @@
+"""
+Komponen status job latar belakang (lihat ``utils.job_queue``)
+"""
+
+import time
+import uuid
+
+import pandas as pd
+import streamlit as st
+
+from config.settings import JOB_POLL_SECONDS
+from utils.job_queue import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, get_job_queue
+
+STATUS_LABELS = {
+    JOB_QUEUED: "⏳ Antre",
+    JOB_RUNNING: "⚙️ Berjalan",
+    JOB_DONE: "✅ Selesai",
+    JOB_FAILED: "❌ Gagal",
+}
+
+# Parameter URL token pemilik job (lihat ``current_job_owner``)
+OWNER_PARAM = 'sesi'
+
+# Penanda di session state: ada job berjalan yang progress-nya ditampilkan
+_POLL_KEY = '_job_poll_pending'
+
+KIND_LABELS = {
+    'clean_upload': "Pembersihan data",
+    'export_report': "Laporan",
+    'train_model': "Training model",
+}
+
+
+def current_job_owner():
+    """
+    Token pemilik job untuk sesi ini
+
+    Token disimpan di session state dan di URL (``?sesi=...``), sehingga
+    setelah halaman dimuat ulang pengguna tetap bisa mengambil job miliknya,
+    tetapi tidak melihat job sesi lain.
+    """
+    owner = st.session_state.get('job_owner')
+    if owner is None:
+        owner = st.query_params.get(OWNER_PARAM) or uuid.uuid4().hex
+        st.session_state['job_owner'] = owner
+    if st.query_params.get(OWNER_PARAM) != owner:
+        st.query_params[OWNER_PARAM] = owner
+    return owner
+
+
+def job_button(label, slot, kind, params, files=None, **button_kwargs):
+    """
+    Tombol yang memasukkan job ke antrean saat diklik
+
+    Job dimasukkan di callback tombol (sekali per klik), bukan di badan
+    script yang dijalankan ulang selama progress job dipantau; ``job_id``-nya
+    disimpan di ``st.session_state[slot]`` sebelum halaman dirender.
+
+    Parameters:
+    -----------
+    params : dict or callable
+        Parameter job, atau fungsi yang menghitungnya saat diklik (hasil
+        None: job tidak dimasukkan)
+    files : dict or callable, optional
+        File input job (lihat ``JobQueue.submit``), atau fungsi pembuatnya
+
+    Returns:
+    --------
+    clicked : bool
+    """
+    def submit():
+        job_params = params() if callable(params) else params
+        if job_params is None:
+            return
+        st.session_state[slot] = get_job_queue().submit(
+            kind, job_params, files() if callable(files) else files, owner=current_job_owner()
+        )
+
+    return st.button(label, on_click=submit, **button_kwargs)
+
+
+def render_job_progress(job_id):
+    """
+    Tampilkan progress job sekali, tanpa menunggu job selesai
+
+    Selama job masih antre/berjalan, progress ditampilkan dan halaman
+    dijadwalkan untuk dijalankan ulang setiap ``JOB_POLL_SECONDS`` detik oleh
+    ``rerun_while_job_active`` di akhir script, sehingga sisa halaman tetap
+    dirender dan bisa dipakai. Job tetap berjalan di antrean walau halaman
+    ditutup.
+
+    Returns:
+    --------
+    job : dict or None
+        Job yang sudah selesai/gagal, atau None jika job masih berjalan atau
+        tidak ditemukan (atau milik sesi lain)
+    """
+    job = get_job_queue().get(job_id, owner=current_job_owner())
+    if job is not None and job['status'] in (JOB_QUEUED, JOB_RUNNING):
+        st.progress(job['progress'], text=job['message'] or STATUS_LABELS[job['status']])
+        st.caption(
+            f"{STATUS_LABELS[job['status']]} • job {job_id} • "
+            "halaman boleh ditutup, hasil bisa diambil lagi dari riwayat job"
+        )
+        st.session_state[_POLL_KEY] = True
+        return None
+
+    if job is not None and job['status'] == JOB_FAILED:
+        st.error(f"❌ Job gagal: {job['error']}")
+    return job
+
+
+def rerun_while_job_active():
+    """
+    Jalankan ulang halaman setelah ``JOB_POLL_SECONDS`` detik jika run ini
+    menampilkan progress job yang belum selesai (panggil di akhir halaman)
+    """
+    if st.session_state.pop(_POLL_KEY, False):
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+
+def render_job_history(kinds, key, label="📜 Riwayat job"):
+    """
+    Daftar job terbaru milik sesi ini dan pilihan untuk mengambil hasil job yang sudah selesai
+
+    Returns:
+    --------
+    job_id : str or None
+        Job selesai yang dipilih pengguna untuk diambil hasilnya
+    """
+    jobs = get_job_queue().list(kinds=kinds, owner=current_job_owner())
+    if not jobs:
+        return None
+
+    with st.expander(f"{label} ({len(jobs)})"):
+        st.dataframe(
+            pd.DataFrame({
+                'Job': [job['job_id'] for job in jobs],
+                'Jenis': [KIND_LABELS.get(job['kind'], job['kind']) for job in jobs],
+                'Status': [STATUS_LABELS[job['status']] for job in jobs],
+                'Progress': [f"{job['progress']:.0%}" for job in jobs],
+                'Dibuat': [job['created_at'][:19].replace('T', ' ') for job in jobs],
+                'Keterangan': [job['error'] or job['message'] or '' for job in jobs],
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        done = [job['job_id'] for job in jobs if job['status'] == JOB_DONE]
+        if not done:
+            return None
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            job_id = st.selectbox("Job selesai", done, key=f"{key}_select")
+        with col2:
+            st.write("")
+            if st.button("📥 Ambil hasil", key=f"{key}_load"):
+                return job_id
+    return None
@@ -3,9 +3,19 @@ Sidebar Component untuk SIM Akademik
 Komponen sidebar yang melengkapi navigation bawaan Streamlit
 """
 
+import pandas as pd
 import streamlit as st
 from datetime import datetime
 
+from utils.aggregate_cube import get_active_cube, get_active_overview
+from utils.dataset_catalog import activate_dataset, list_datasets
+from utils.dataset_store import (
+    clear_active_dataset,
+    get_active_dataset,
+    get_dataset_store
+)
+from utils.leger_cache import get_leger_cache
+
 def render_custom_sidebar():
     """
     Render custom sidebar content yang MELENGKAPI sidebar navigation bawaan
@@ -48,8 +58,9 @@ def render_data_status_widget():
     """Widget untuk menampilkan status data yang aktif"""
     st.markdown("### 📊 Status Data")
     
-    if st.session_state.get('df_clean') is not None:
-        df = st.session_state['df_clean']
+    df = get_active_dataset()
+    
+    if df is not None:
         file_name = st.session_state.get('file_name', 'Unknown')
         upload_time = st.session_state.get('upload_time')
         
@@ -59,9 +70,12 @@ def render_data_status_widget():
         else:
             time_str = str(upload_time) if upload_time else 'N/A'
         
-        # Calculate stats
+        # Stats dari cube agregat untuk data leger, atau langsung dari
+        # DataFrame untuk data umum (dibangun sekali per dataset)
+        overview = get_active_overview()
         total_records = len(df)
-        unique_students = df['NISN'].nunique() if 'NISN' in df.columns else 'N/A'
+        has_students = get_active_cube() is not None or 'NISN' in df.columns
+        unique_students = f"{overview['total_students']:,}" if overview and has_students else 'N/A'
         
         # Display in success box
         st.success(f"""
@@ -74,8 +88,8 @@ def render_data_status_widget():
         """)
         
         # Metrics
-        if 'NILAI' in df.columns:
-            avg_score = df['NILAI'].mean()
+        if overview and pd.notna(overview['nilai_mean']):
+            avg_score = overview['nilai_mean']
             st.metric(
                 label="📈 Rata-rata Nilai",
                 value=f"{avg_score:.1f}",
@@ -88,6 +102,31 @@ def render_data_status_widget():
 
 Silakan upload data melalui menu **📤 Upload Data**.
         """)
+        
+        render_dataset_loader()
+
+
+def render_dataset_loader():
+    """Pilih dataset yang sudah diproses dari katalog (tanpa upload ulang)"""
+    datasets = list_datasets()
+    if not datasets:
+        return
+    
+    dataset_ids = {
+        f"{entry['name']} ({entry['timestamp'][:16].replace('T', ' ')})": entry['dataset_id']
+        for entry in datasets
+    }
+    choice = st.selectbox(
+        "📂 Dataset tersimpan",
+        options=list(dataset_ids),
+        key="sidebar_dataset_choice"
+    )
+    
+    if st.button("📂 Muat Dataset", use_container_width=True):
+        if activate_dataset(dataset_ids[choice]):
+            st.rerun()
+        else:
+            st.error("❌ Dataset tidak ditemukan")
 
 
 def render_sidebar_quick_actions():
@@ -105,7 +144,7 @@ def render_sidebar_quick_actions():
             clear_data_with_confirmation()
     
     # Export button (jika ada data)
-    if st.session_state.get('df_clean') is not None:
+    if st.session_state.get('dataset_id') is not None:
         if st.button("📥 Export Data", use_container_width=True, type="primary"):
             export_current_data()
 
@@ -119,6 +158,9 @@ def clear_data_with_confirmation():
         st.session_state.confirm_clear = True
         st.warning("⚠️ Klik sekali lagi untuk konfirmasi")
     else:
+        # Lepas dataset dari store bersama, lalu clear session
+        clear_active_dataset()
+        
         # Clear all data except initialization flag
         keys_to_keep = ['initialized', 'path_initialized']
         keys_to_delete = [k for k in st.session_state.keys() if k not in keys_to_keep]
@@ -132,9 +174,9 @@ def clear_data_with_confirmation():
 
 def export_current_data():
     """Export data yang sedang aktif"""
-    if st.session_state.get('df_clean') is not None:
-        df = st.session_state['df_clean']
-        
+    df = get_active_dataset()
+    
+    if df is not None:
         # Convert to CSV
         csv = df.to_csv(index=False).encode('utf-8-sig')
         
@@ -153,9 +195,14 @@ def render_system_info():
     st.markdown("### ℹ️ Info Sistem")
     
     with st.expander("📊 Statistik", expanded=False):
-        history_count = len(st.session_state.get('upload_history', []))
+        history_count = len(list_datasets())
+        cache_stats = get_leger_cache().stats()
+        store_stats = get_dataset_store().stats()
         st.markdown(f"""
 - **Upload History:** {history_count}
+- **Cache Leger:** {cache_stats['hits']} hit / {cache_stats['misses']} miss
+- **Ukuran Cache:** {cache_stats['entries']} file ({cache_stats['size_mb']:.1f} MB)
+- **Dataset Bersama:** {store_stats['datasets']} ({store_stats['memory_mb']:.1f} MB, {store_stats['sessions']} sesi)
 - **Session:** ✅ Active
 - **Version:** 1.0.0
         """)
@@ -6,10 +6,64 @@ APP_VERSION = "1.0.0"
 MAX_UPLOAD_SIZE_MB = 50
 ALLOWED_FILE_TYPES = ['csv', 'xlsx', 'xls']
 
+# Leger berukuran besar dibaca streaming per batch baris siswa
+LEGER_BATCH_SIZE = 5000
+LEGER_STREAMING_MIN_MB = 10
+
+# Penyimpanan data bersih: direktori dan format ('parquet' atau 'feather')
+PROCESSED_DIR = "data/processed"
+PROCESSED_DATA_FORMAT = "parquet"
+
+# Update inkremental: jumlah file delta maksimum sebelum dipadatkan ke file utama
+LEGER_MAX_DELTA_PARTS = 8
+
+# Cache hasil pembersihan leger (kunci: hash isi file + versi cleaner)
+LEGER_CACHE_DIR = "data/cache/leger"
+LEGER_CACHE_MAX_MB = 500
+
+# Query tabel preview: jumlah hasil pencarian yang di-memo per dataset
+DATA_QUERY_MEMO_ENTRIES = 16
+
+# Laporan: file hasil generate (dipangkas ke N terbaru, kecuali yang lebih
+# muda dari batas umur detik agar file yang baru ditulis/diunduh aman) dan
+# ukuran potongan tulis
+REPORT_DIR = "data/cache/reports"
+REPORT_KEEP_FILES = 20
+REPORT_MIN_AGE_SECONDS = 3600
+REPORT_CHUNK_ROWS = 50000
+
+# Rapor PDF: jumlah siswa per tugas worker render
+REPORT_CARD_BATCH_SIZE = 50
+
+# Penulis XLSX streaming: baris per potongan XML, level kompresi deflate, dan
+# total baris minimum sebelum sheet dibangun paralel di proses terpisah
+XLSX_CHUNK_ROWS = 20000
+XLSX_COMPRESS_LEVEL = 1
+XLSX_PARALLEL_MIN_ROWS = 100000
+
+# Antrean job latar belakang: tabel job SQLite, direktori kerja per job,
+# jumlah worker thread, jumlah job selesai yang disimpan, dan interval polling UI
+JOB_DIR = "data/cache/jobs"
+JOB_DB_PATH = "data/cache/jobs/jobs.sqlite3"
+JOB_WORKERS = 2
+JOB_KEEP = 50
+JOB_POLL_SECONDS = 1.0
+
 # Pengaturan model
 MODEL_PATH = "models/saved_models/"
 MODEL_NAME = "graduation_model.pkl"
 
+# Prediksi kohort besar dilakukan per potongan baris
+PREDICT_CHUNK_SIZE = 50000
+
+# Clustering siswa (MiniBatchKMeans); k otomatis: kandidat dilatih pada sampel
+# CLUSTER_SAMPLE_SIZE siswa dan dinilai silhouette pada CLUSTER_SILHOUETTE_SAMPLE siswa
+CLUSTER_BATCH_SIZE = 4096
+CLUSTER_K_RANGE = range(2, 9)
+CLUSTER_SAMPLE_SIZE = 20000
+CLUSTER_SILHOUETTE_SAMPLE = 2000
+CLUSTER_RANDOM_STATE = 42
+
 # Pengaturan visualisasi
 CHART_HEIGHT = 400
 CHART_WIDTH = 600
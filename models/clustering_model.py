@@ -1,9 +1,141 @@
-from sklearn.cluster import KMeans
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from config.settings import (
+    CLUSTER_BATCH_SIZE,
+    CLUSTER_K_RANGE,
+    CLUSTER_RANDOM_STATE,
+    CLUSTER_SAMPLE_SIZE,
+    CLUSTER_SILHOUETTE_SAMPLE
+)
+from utils.dataset_store import get_active_derived
+from utils.feature_store import FeatureMatrix, get_active_features
 
 class StudentClustering:
-    def __init__(self, n_clusters=3):
-        self.model = KMeans(n_clusters=n_clusters)
-    
-    def fit_predict(self, X):
-        """Clustering siswa berdasarkan performa"""
-        return self.model.fit_predict(X)
+    """
+    Clustering siswa dengan MiniBatchKMeans
+
+    Jumlah klaster bisa dipilih otomatis dengan skor silhouette pada sampel
+    siswa. Label klaster diurutkan dari rata-rata centroid tertinggi
+    (klaster 0 = performa terbaik), dan ``random_state`` tetap sehingga hasil
+    dapat direproduksi.
+    """
+
+    def __init__(self, n_clusters=3, random_state=CLUSTER_RANDOM_STATE, batch_size=CLUSTER_BATCH_SIZE):
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.batch_size = batch_size
+        self.model = None
+        self.columns = None
+        self.silhouette_scores_ = {}
+        self.labels_ = None
+        self.profiles_ = None
+        self._relabel = None
+
+    def fit_predict(self, X, columns=None):
+        """
+        Clustering siswa berdasarkan performa
+
+        ``X`` boleh berupa ``FeatureMatrix`` dari feature store (memory-map);
+        default memakai kolom nilai rerata per mapel, nilai kosong diisi
+        rata-rata kolomnya. ``n_clusters=None`` memilih k otomatis.
+        """
+        matrix, self.columns = self._prepare(X, columns)
+        n_clusters = self.n_clusters or self.select_k(matrix)
+
+        model = self._make_model(n_clusters).fit(matrix)
+        # Urutkan ulang klaster dari rata-rata centroid tertinggi
+        order = np.argsort(-model.cluster_centers_.mean(axis=1), kind='stable')
+        self._relabel = np.empty_like(order)
+        self._relabel[order] = np.arange(len(order))
+
+        self.model = model
+        self.labels_ = self._relabel[model.labels_]
+        self.profiles_ = self._profiles(model.cluster_centers_[order], self.labels_, n_clusters)
+        return self.labels_
+
+    def predict(self, X, columns=None):
+        """Klaster untuk siswa baru dengan model yang sudah dilatih"""
+        matrix, _ = self._prepare(X, columns or self.columns)
+        return self._relabel[self.model.predict(matrix)]
+
+    def select_k(self, matrix, k_range=CLUSTER_K_RANGE, sample_size=CLUSTER_SAMPLE_SIZE,
+                 silhouette_sample=CLUSTER_SILHOUETTE_SAMPLE):
+        """
+        Pilih jumlah klaster dengan skor silhouette tertinggi
+
+        Setiap kandidat k dilatih pada sampel acak (tetap) siswa dan dinilai
+        silhouette pada sampel yang lebih kecil, sehingga biayanya tidak
+        bergantung pada ukuran dataset.
+        """
+        rng = np.random.default_rng(self.random_state)
+        if len(matrix) > sample_size:
+            matrix = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+
+        self.silhouette_scores_ = {}
+        for k in k_range:
+            if k >= len(matrix):
+                break
+            labels = self._make_model(k).fit_predict(matrix)
+            if len(np.unique(labels)) < 2:
+                continue
+            self.silhouette_scores_[k] = float(silhouette_score(
+                matrix, labels, sample_size=min(silhouette_sample, len(matrix)), random_state=self.random_state
+            ))
+
+        if not self.silhouette_scores_:
+            return min(2, len(matrix))
+        return max(self.silhouette_scores_, key=self.silhouette_scores_.get)
+
+    def _make_model(self, n_clusters):
+        return MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=self.batch_size,
+            n_init=3,
+            random_state=self.random_state
+        )
+
+    def _prepare(self, X, columns):
+        """Matriks float32 tanpa NaN dan nama kolomnya"""
+        if isinstance(X, FeatureMatrix):
+            columns = list(columns or X.column_group('RERATA_'))
+            matrix = X.select(columns)
+        elif isinstance(X, pd.DataFrame):
+            columns = list(columns or X.columns)
+            matrix = X[columns].to_numpy(dtype=np.float32)
+        else:
+            matrix = np.asarray(X, dtype=np.float32)
+            columns = list(columns or range(matrix.shape[1]))
+
+        if np.isnan(matrix).any():
+            fill = np.nan_to_num(np.nanmean(matrix, axis=0))
+            matrix = np.where(np.isnan(matrix), fill, matrix)
+        return matrix, columns
+
+    def _profiles(self, centers, labels, n_clusters):
+        """Profil klaster: centroid per mapel, jumlah siswa, rata-rata"""
+        names = [str(column).replace('RERATA_', '', 1) for column in self.columns]
+        profiles = pd.DataFrame(centers, columns=names)
+        profiles.index.name = 'KLASTER'
+        profiles['JUMLAH_SISWA'] = np.bincount(labels, minlength=n_clusters)
+        profiles['RATA_RATA'] = centers.mean(axis=1)
+        return profiles
+
+
+def get_active_clustering(n_clusters=None):
+    """
+    ``StudentClustering`` yang sudah dilatih pada feature store dataset
+    aktif, di-cache per versi dataset dan k (None = k otomatis)
+    """
+    features = get_active_features()
+    if features is None or len(features) < 3:
+        return None
+
+    def build(df):
+        clustering = StudentClustering(n_clusters=n_clusters)
+        clustering.fit_predict(features)
+        return clustering
+
+    return get_active_derived(f"clustering:{features.version}:{n_clusters or 'auto'}", build)
@@ -1,24 +1,362 @@
-from sklearn.linear_model import LogisticRegression
+import hashlib
+import json
+import os
 import pickle
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.base import clone
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from config.settings import MODEL_NAME, MODEL_PATH, PREDICT_CHUNK_SIZE
+from utils.feature_store import FEATURE_SCHEMA_VERSION, FeatureMatrix
+
+# Versi format artefak model (manifest JSON + file estimator)
+MODEL_FORMAT_VERSION = 1
+
+DEFAULT_MODEL_FILE = os.path.join(MODEL_PATH, MODEL_NAME)
+
+# Sumber label training (bagian dari path model per dataset)
+LABEL_SOURCES = ('proksi', 'historis')
+
+# Fitur yang menjadi dasar label proksi (prefix/nama kolom)
+PROXY_LABEL_FEATURES = ('RERATA_', 'RATA_RATA')
+
+
+def make_proxy_labels(features, kkm=70):
+    """
+    Label kelulusan proksi: lulus (1) jika semua nilai rerata mapel >= KKM
+
+    Dipakai jika data kelulusan historis tidak tersedia.
+
+    Parameters:
+    -----------
+    features : FeatureMatrix or DataFrame
+        Fitur per siswa (lihat ``utils.feature_store``)
+    """
+    if isinstance(features, FeatureMatrix):
+        subjects = features.select(features.column_group('RERATA_'))
+        index = features.index
+    else:
+        subjects = features.filter(like='RERATA_').to_numpy(dtype='float64')
+        index = features.index
+    return pd.Series((np.nan_to_num(subjects) >= kkm).all(axis=1).astype('int8'), index=index)
+
+
+def model_file(dataset_id, label_source='proksi'):
+    """
+    Path model untuk satu dataset dan sumber label
+
+    Setiap dataset (dan sumber label) punya artefak serta manifest sendiri,
+    sehingga melatih model untuk satu dataset tidak mengganti model dataset
+    lain yang sedang dipakai sesi lain.
+    """
+    if label_source not in LABEL_SOURCES:
+        raise ValueError(f"Sumber label tidak dikenal: {label_source}")
+    stem, suffix = os.path.splitext(MODEL_NAME)
+    safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', str(dataset_id))
+    return os.path.join(MODEL_PATH, f"{stem}_{safe_id}_{label_source}{suffix}")
+
+
+def proxy_feature_columns(features):
+    """
+    Fitur yang dipakai untuk training dengan label proksi
+
+    Label proksi dihitung langsung dari ``RERATA_*``; jika kolom itu (dan
+    ``RATA_RATA`` turunannya) ikut dipakai, model hanya menyalin aturan KKM.
+    Yang tersisa adalah fitur per semester, tren, varians dan jumlah nilai kosong.
+    """
+    return [name for name in features.columns if not name.startswith(PROXY_LABEL_FEATURES)]
+
 
 class GraduationPredictor:
-    def __init__(self):
-        self.model = LogisticRegression()
-    
-    def train(self, X, y):
-        """Train model prediksi kelulusan"""
-        self.model.fit(X, y)
-    
-    def predict(self, X):
+    """
+    Pipeline prediksi kelulusan: imputasi median, standardisasi, regresi
+    logistik. Fitur dibaca dari feature store (``FeatureMatrix``, memory-map)
+    lalu seluruh kohort diprediksi dalam satu panggilan vektor.
+    """
+
+    def __init__(self, C=1.0, max_iter=1000):
+        self.model = Pipeline([
+            ('imputer', SimpleImputer(strategy='median')),
+            ('scaler', StandardScaler()),
+            ('classifier', LogisticRegression(C=C, max_iter=max_iter)),
+        ])
+        self.feature_names = None
+        self.metadata = {}
+        self.artifact_version = None
+
+    def train(self, X, y, columns=None):
+        """Train model prediksi kelulusan (``columns``: subset fitur, default semua)"""
+        self._set_feature_names(X, columns)
+        # Estimator dari cache model dipakai bersama: latih salinan baru
+        self.model = clone(self.model)
+        self.model.fit(self._matrix(X), np.asarray(y))
+        self.artifact_version = None
+        self.metadata = {
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'n_train': int(len(X)),
+            'dataset_version': X.version if isinstance(X, FeatureMatrix) else None,
+        }
+        return self
+
+    def evaluate(self, X, y, test_size=0.2, random_state=42, columns=None):
+        """
+        Latih pada data latih dan ukur akurasi pada data uji (holdout)
+
+        ``columns`` membatasi fitur yang dipakai (mis. ``proxy_feature_columns``).
+
+        Returns:
+        --------
+        accuracy : float
+            Akurasi pada data uji; model akhir tetap dilatih ulang dengan
+            seluruh data
+        """
+        y = np.asarray(y)
+        self._set_feature_names(X, columns)
+        stratify = y if len(np.unique(y)) > 1 and np.bincount(y).min() >= 2 else None
+        X_train, X_test, y_train, y_test = train_test_split(
+            self._matrix(X), y, test_size=test_size, random_state=random_state, stratify=stratify
+        )
+        self.model = clone(self.model)
+        self.model.fit(X_train, y_train)
+        accuracy = self.model.score(X_test, y_test)
+        self.train(X, y, self.feature_names)
+        self.metadata['accuracy'] = float(accuracy)
+        return accuracy
+
+    def predict(self, X, chunk_size=PREDICT_CHUNK_SIZE):
         """Prediksi kelulusan"""
-        return self.model.predict(X)
-    
-    def save_model(self, filepath):
-        """Simpan model"""
-        with open(filepath, 'wb') as f:
-            pickle.dump(self.model, f)
-    
-    def load_model(self, filepath):
-        """Load model"""
-        with open(filepath, 'rb') as f:
-            self.model = pickle.load(f)
+        return self._batched(self.model.predict, X, chunk_size)
+
+    def predict_proba(self, X, chunk_size=PREDICT_CHUNK_SIZE):
+        """Probabilitas tiap kelas (kolom sesuai ``classes_``) untuk setiap siswa"""
+        return self._batched(self.model.predict_proba, X, chunk_size)
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def predict_cohort(self, features, chunk_size=PREDICT_CHUNK_SIZE):
+        """
+        Prediksi seluruh kohort sekaligus
+
+        Returns:
+        --------
+        result : DataFrame
+            Index sama dengan ``features``; kolom ``PROBA_LULUS`` dan
+            ``PREDIKSI`` ('LULUS' / 'TIDAK LULUS')
+        """
+        proba = self.predict_proba(features, chunk_size)
+        classes = list(self.classes_)
+        proba_lulus = proba[:, classes.index(1)] if 1 in classes else np.zeros(len(features))
+        return pd.DataFrame({
+            'PROBA_LULUS': proba_lulus,
+            'PREDIKSI': np.where(proba_lulus >= 0.5, 'LULUS', 'TIDAK LULUS'),
+        }, index=features.index)
+
+    def _set_feature_names(self, X, columns):
+        if columns is not None:
+            self.feature_names = list(columns)
+        elif isinstance(X, (pd.DataFrame, FeatureMatrix)):
+            self.feature_names = list(X.columns)
+
+    def _matrix(self, X, rows=slice(None)):
+        """Matriks float (baris ``rows``) dengan urutan kolom sesuai fitur saat training"""
+        if isinstance(X, FeatureMatrix):
+            return X.select(self.feature_names, rows)
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None:
+                X = X.reindex(columns=self.feature_names)
+            return X.iloc[rows].to_numpy(dtype='float64')
+        return np.asarray(X[rows], dtype='float64')
+
+    def _batched(self, method, X, chunk_size):
+        """
+        Panggil ``method`` per potongan baris agar memori tetap terbatas;
+        dari ``FeatureMatrix`` hanya potongan yang sedang diproses yang dibaca
+        """
+        if not chunk_size or len(X) <= chunk_size:
+            return method(self._matrix(X))
+        return np.concatenate([
+            method(self._matrix(X, slice(start, start + chunk_size)))
+            for start in range(0, len(X), chunk_size)
+        ])
+
+    def check_schema(self, features):
+        """
+        Pastikan fitur model tersedia di feature store saat ini
+
+        Raises:
+        -------
+        ValueError
+            Jika versi skema fitur berbeda atau ada fitur model yang tidak
+            ada di ``features``
+        """
+        schema_version = self.metadata.get('feature_schema_version', FEATURE_SCHEMA_VERSION)
+        if schema_version != FEATURE_SCHEMA_VERSION:
+            raise ValueError(
+                f"Model dilatih dengan skema fitur v{schema_version}, "
+                f"feature store saat ini v{FEATURE_SCHEMA_VERSION}"
+            )
+        missing = [name for name in self.feature_names or [] if name not in set(features.columns)]
+        if missing:
+            raise ValueError(f"Fitur model tidak ada di data: {', '.join(missing)}")
+
+    def save_model(self, filepath=DEFAULT_MODEL_FILE, dataset_id=None):
+        """
+        Simpan model sebagai artefak berversi
+
+        Estimator ditulis ke ``<nama>-<versi>.pkl`` dan manifest
+        ``<nama>.json`` (versi, checksum SHA-256, daftar fitur, metadata
+        training, hash dataset) diganti secara atomik setelahnya, sehingga
+        pembaca selalu melihat pasangan manifest/estimator yang utuh.
+
+        Returns:
+        --------
+        manifest : dict
+        """
+        payload = pickle.dumps(self.model, protocol=pickle.HIGHEST_PROTOCOL)
+        checksum = hashlib.sha256(payload).hexdigest()
+        version = checksum[:12]
+
+        manifest_path = Path(filepath).with_suffix('.json')
+        artifact_path = manifest_path.with_name(f"{manifest_path.stem}-{version}.pkl")
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        previous = _read_manifest(manifest_path)
+
+        _atomic_write(artifact_path, payload)
+        manifest = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'artifact_version': version,
+            'artifact': artifact_path.name,
+            'sha256': checksum,
+            'estimator': type(self.model.steps[-1][1]).__name__,
+            'feature_names': self.feature_names,
+            'feature_schema_version': FEATURE_SCHEMA_VERSION,
+            'metadata': {**self.metadata, 'dataset_id': dataset_id or self.metadata.get('dataset_id')},
+            'sklearn_version': sklearn.__version__,
+            'saved_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        _atomic_write(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+
+        if previous and previous.get('artifact') != artifact_path.name:
+            manifest_path.with_name(previous['artifact']).unlink(missing_ok=True)
+
+        self.artifact_version = version
+        self.metadata = dict(manifest['metadata'], feature_schema_version=FEATURE_SCHEMA_VERSION)
+        _model_cache.put(manifest_path, manifest, self.model)
+        return manifest
+
+    def load_model(self, filepath=DEFAULT_MODEL_FILE, features=None, refresh=False):
+        """
+        Muat model dari artefak lewat cache hangat proses
+
+        Parameters:
+        -----------
+        filepath : str or Path
+            Path model (manifest ``.json`` di sampingnya)
+        features : FeatureMatrix or DataFrame, optional
+            Fitur saat ini untuk pengecekan skema (lihat ``check_schema``)
+        refresh : bool
+            Baca ulang manifest (kecil) untuk melihat versi baru dari proses
+            lain; estimator tetap diambil dari cache jika versinya sama
+        """
+        manifest, estimator = _model_cache.load(Path(filepath).with_suffix('.json'), refresh)
+        self.model = estimator
+        self.feature_names = manifest['feature_names']
+        self.artifact_version = manifest['artifact_version']
+        self.metadata = dict(manifest['metadata'], feature_schema_version=manifest['feature_schema_version'])
+        if features is not None:
+            self.check_schema(features)
+        return self
+
+
+class ModelCache:
+    """
+    Cache model hangat per proses, dengan kunci versi artefak
+
+    Setelah dimuat sekali, permintaan prediksi untuk path yang sama tidak
+    menyentuh disk lagi. Estimator dipakai bersama; jangan di-fit ulang.
+    """
+
+    def __init__(self):
+        self._by_version = {}
+        self._by_path = {}
+        self._lock = threading.Lock()
+
+    def load(self, manifest_path, refresh=False):
+        """``(manifest, estimator)`` untuk ``manifest_path``, dari cache bila ada"""
+        key = str(Path(manifest_path).resolve())
+        with self._lock:
+            if not refresh and key in self._by_path:
+                return self._by_version[self._by_path[key]]
+
+        manifest = _read_manifest(manifest_path)
+        if manifest is None:
+            raise FileNotFoundError(f"Model tidak ditemukan: {manifest_path}")
+        if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Format model tidak didukung: v{manifest.get('format_version')}")
+
+        version = manifest['artifact_version']
+        with self._lock:
+            cached = self._by_version.get(version)
+        if cached is None:
+            payload = Path(manifest_path).with_name(manifest['artifact']).read_bytes()
+            # Checksum diverifikasi sebelum unpickle: file rusak/terganti ditolak
+            if hashlib.sha256(payload).hexdigest() != manifest['sha256']:
+                raise ValueError(f"Checksum model tidak cocok: {manifest['artifact']}")
+            cached = (manifest, pickle.loads(payload))
+
+        with self._lock:
+            self._by_version[version] = cached
+            self._by_path[key] = version
+        return cached
+
+    def put(self, manifest_path, manifest, estimator):
+        """Daftarkan model yang baru disimpan"""
+        with self._lock:
+            self._by_version[manifest['artifact_version']] = (manifest, estimator)
+            self._by_path[str(Path(manifest_path).resolve())] = manifest['artifact_version']
+
+    def invalidate(self):
+        """Kosongkan cache"""
+        with self._lock:
+            self._by_version.clear()
+            self._by_path.clear()
+
+    def __len__(self):
+        return len(self._by_version)
+
+
+_model_cache = ModelCache()
+
+
+def get_model_cache():
+    """Cache model hangat bersama untuk proses ini"""
+    return _model_cache
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _atomic_write(path, data):
+    """Tulis file lewat file sementara lalu rename"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from pathlib import Path
 import sys
 
@@ -15,6 +16,12 @@ if 'path_initialized' not in st.session_state:
 from components.header import render_page_header, add_page_style
 from components.sidebar import render_custom_sidebar
 from components.footer import render_minimal_footer
+from analytics.class_analytics import get_active_class_statistics
+from analytics.student_analytics import get_active_student_index
+from analytics.subject_analytics import DEFAULT_KKM, get_active_subject_scores
+from utils.aggregate_cube import get_active_cube, get_active_overview
+from utils.dataset_store import get_active_dataset
+from models.clustering_model import get_active_clustering
 
 # Page setup
 add_page_style()
@@ -28,8 +35,11 @@ render_page_header(
 )
 
 # Main content
-if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
-    df = st.session_state['df_clean']
+df = get_active_dataset()
+cube = get_active_cube()
+
+if cube is not None:
+    overview = cube.overview()
     
     # Overview metrics
     st.markdown("### 📈 Overview Performa")
@@ -37,99 +47,250 @@ if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_siswa = df['NISN'].nunique() if 'NISN' in df.columns else len(df)
-        st.metric("Total Siswa", f"{total_siswa:,}")
+        st.metric("Total Siswa", f"{overview['total_students']:,}")
     
     with col2:
-        if 'NILAI' in df.columns:
-            avg_nilai = df['NILAI'].mean()
-            st.metric("Rata-rata Nilai", f"{avg_nilai:.2f}")
-        else:
-            st.metric("Rata-rata Nilai", "-")
+        st.metric("Rata-rata Nilai", f"{overview['nilai_mean']:.2f}")
     
     with col3:
-        if 'NILAI' in df.columns:
-            nilai_tertinggi = df['NILAI'].max()
-            st.metric("Nilai Tertinggi", f"{nilai_tertinggi:.2f}")
-        else:
-            st.metric("Nilai Tertinggi", "-")
+        st.metric("Nilai Tertinggi", f"{overview['nilai_max']:.2f}")
     
     with col4:
-        if 'NILAI' in df.columns:
-            nilai_terendah = df['NILAI'].min()
-            st.metric("Nilai Terendah", f"{nilai_terendah:.2f}")
-        else:
-            st.metric("Nilai Terendah", "-")
+        st.metric("Nilai Terendah", f"{overview['nilai_min']:.2f}")
     
     st.markdown("---")
     
     # Tabs untuk berbagai analisis
-    tab1, tab2, tab3 = st.tabs(["📊 Distribusi Nilai", "👥 Analisis Siswa", "📚 Analisis Mapel"])
+    class_stats = get_active_class_statistics()
+    tab_names = ["📊 Distribusi Nilai", "👥 Analisis Siswa", "📚 Analisis Mapel", "🧩 Klaster Siswa"]
+    if class_stats is not None:
+        tab_names.append("🏫 Perbandingan Kelas")
+    
+    tab1, tab2, tab3, tab_klaster, *tab_kelas = st.tabs(tab_names)
     
     with tab1:
-        if 'NILAI' in df.columns:
-            st.markdown("#### Histogram Distribusi Nilai")
-            fig = px.histogram(
-                df,
-                x='NILAI',
-                nbins=30,
-                title='Distribusi Nilai Keseluruhan',
-                labels={'NILAI': 'Nilai', 'count': 'Jumlah'},
-                color_discrete_sequence=['#3B82F6']
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Box plot
-            st.markdown("#### Box Plot Nilai")
-            fig = px.box(
-                df,
-                y='NILAI',
-                title='Box Plot Distribusi Nilai'
-            )
+        st.markdown("#### Histogram Distribusi Nilai")
+        histogram = cube.value_histogram(bin_width=2.5)
+        fig = px.bar(
+            histogram,
+            x='NILAI',
+            y='JUMLAH',
+            hover_data=['BIN'],
+            title='Distribusi Nilai Keseluruhan',
+            labels={'NILAI': 'Nilai', 'JUMLAH': 'Jumlah'},
+            color_discrete_sequence=['#3B82F6']
+        )
+        fig.update_layout(bargap=0)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Box plot (kuartil dihitung dari histogram cube)
+        st.markdown("#### Box Plot Nilai")
+        box = cube.box_stats()
+        if box is None:
+            st.info("ℹ️ Belum ada nilai untuk box plot.")
+        else:
+            fig = go.Figure(go.Box(
+                name='NILAI',
+                q1=[box['q1']],
+                median=[box['median']],
+                q3=[box['q3']],
+                lowerfence=[box['lowerfence']],
+                upperfence=[box['upperfence']],
+            ))
+            fig.update_layout(title='Box Plot Distribusi Nilai', yaxis_title='NILAI')
             st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
         st.markdown("#### 🔝 Top 10 Siswa")
-        if 'NAMA_SISWA' in df.columns and 'NILAI' in df.columns:
-            top_students = df.groupby('NAMA_SISWA')['NILAI'].mean().sort_values(ascending=False).head(10)
+        top_students = cube.student_means().head(10)
+        
+        fig = px.bar(
+            top_students,
+            x='NAMA_SISWA',
+            y='RATA_RATA',
+            labels={'NAMA_SISWA': 'Nama Siswa', 'RATA_RATA': 'Rata-rata Nilai'},
+            title='Top 10 Siswa Berdasarkan Rata-rata Nilai'
+        )
+        fig.update_xaxes(tickangle=-45)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Table
+        st.dataframe(
+            top_students[['NAMA_SISWA', 'RATA_RATA']].rename(columns={'NAMA_SISWA': 'Nama', 'RATA_RATA': 'Rata-rata'}),
+            use_container_width=True
+        )
+        
+        # Detail satu siswa lewat indeks siswa (tanpa scan seluruh data)
+        st.markdown("#### 🔎 Tren Nilai per Siswa")
+        student_index = get_active_student_index()
+        students = cube.student_means().dropna(subset=['NISN'])
+        labels = dict(zip(students['NAMA_SISWA'] + ' (' + students['NISN'] + ')', students['NISN']))
+        
+        if labels:
+            selected = st.selectbox("Pilih siswa", list(labels))
+            student_data = student_index.get(labels[selected])
+            trend = student_data[~student_data['IS_RERATA']].groupby('SEMESTER')['NILAI'].mean()
             
-            fig = px.bar(
-                x=top_students.index,
-                y=top_students.values,
-                labels={'x': 'Nama Siswa', 'y': 'Rata-rata Nilai'},
-                title='Top 10 Siswa Berdasarkan Rata-rata Nilai'
+            fig = px.line(
+                x=trend.index,
+                y=trend.values,
+                markers=True,
+                labels={'x': 'Semester', 'y': 'Rata-rata Nilai'},
+                title=f'Tren Nilai {selected}'
             )
-            fig.update_xaxis(tickangle=-45)
             st.plotly_chart(fig, use_container_width=True)
-            
-            # Table
-            st.dataframe(
-                top_students.reset_index().rename(columns={'NAMA_SISWA': 'Nama', 'NILAI': 'Rata-rata'}),
-                use_container_width=True
-            )
     
     with tab3:
-        if 'MAPEL_ID' in df.columns and 'NILAI' in df.columns:
-            st.markdown("#### Performa per Mata Pelajaran")
+        st.markdown("#### Performa per Mata Pelajaran")
+        
+        mapel_stats = cube.subject_stats()[['MEAN', 'MIN', 'MAX', 'COUNT']].round(2)
+        mapel_stats.columns = ['Rata-rata', 'Minimum', 'Maksimum', 'Jumlah Data']
+        
+        st.dataframe(
+            mapel_stats.sort_values('Rata-rata', ascending=False),
+            use_container_width=True
+        )
+        
+        # Bar chart
+        fig = px.bar(
+            x=mapel_stats.index.astype(str),
+            y=mapel_stats['Rata-rata'],
+            labels={'x': 'Mata Pelajaran', 'y': 'Rata-rata Nilai'},
+            title='Rata-rata Nilai per Mata Pelajaran'
+        )
+        fig.update_xaxes(tickangle=-45)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Ketuntasan: satu kali urut per dataset, ambang KKM bisa diubah tanpa scan ulang
+        st.markdown("#### ✅ Ketuntasan (KKM) per Mata Pelajaran")
+        subject_scores = get_active_subject_scores()
+        kkm = st.number_input("KKM", min_value=0, max_value=100, value=DEFAULT_KKM, step=5)
+        sweep = list(range(50, 101, 5))
+        report = subject_scores.report(thresholds=sorted(set(sweep) | {kkm}))
+        
+        st.dataframe(
+            report[['JUMLAH', 'RATA_RATA', f'LULUS_{kkm:g}']].round(2).rename(columns={
+                'JUMLAH': 'Jumlah Siswa', 'RATA_RATA': 'Rata-rata Rerata', f'LULUS_{kkm:g}': 'Persen Tuntas'
+            }),
+            use_container_width=True
+        )
+        
+        sweep_rates = report[[f'LULUS_{t}' for t in sweep]]
+        sweep_rates.columns = sweep
+        fig = px.line(
+            sweep_rates.T,
+            markers=True,
+            labels={'index': 'KKM', 'value': 'Persen Tuntas', 'MAPEL_ID': 'Mata Pelajaran'},
+            title='Persentase Tuntas untuk Berbagai KKM'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    with tab_klaster:
+        st.markdown("#### Klaster Siswa berdasarkan Nilai Rerata Mapel")
+        
+        k_option = st.selectbox("Jumlah klaster", ["Otomatis (silhouette)"] + list(range(2, 9)))
+        n_clusters = None if isinstance(k_option, str) else k_option
+        
+        with st.spinner("Menghitung klaster..."):
+            clustering = get_active_clustering(n_clusters)
+        
+        if clustering is None:
+            st.info("ℹ️ Klaster membutuhkan data leger dengan minimal 3 siswa.")
+        else:
+            profiles = clustering.profiles_
+            if clustering.silhouette_scores_ and n_clusters is None:
+                best = len(profiles)
+                st.caption(
+                    f"k = {best} dipilih otomatis (silhouette {clustering.silhouette_scores_[best]:.3f})"
+                )
             
-            mapel_stats = df.groupby('MAPEL_ID')['NILAI'].agg(['mean', 'min', 'max', 'count']).round(2)
-            mapel_stats.columns = ['Rata-rata', 'Minimum', 'Maksimum', 'Jumlah Data']
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                st.dataframe(
+                    profiles[['JUMLAH_SISWA', 'RATA_RATA']].round(2),
+                    use_container_width=True
+                )
+            with col2:
+                subject_profiles = profiles.drop(columns=['JUMLAH_SISWA', 'RATA_RATA'])
+                fig = px.imshow(
+                    subject_profiles,
+                    text_auto='.1f',
+                    aspect='auto',
+                    color_continuous_scale='RdYlGn',
+                    labels={'x': 'Mata Pelajaran', 'y': 'Klaster', 'color': 'Centroid'},
+                    title='Profil Klaster (centroid per mapel)'
+                )
+                st.plotly_chart(fig, use_container_width=True)
+
+    if tab_kelas:
+        with tab_kelas[0]:
+            st.markdown("#### Statistik per Kelas")
             
-            st.dataframe(
-                mapel_stats.sort_values('Rata-rata', ascending=False),
-                use_container_width=True
-            )
+            table = class_stats.round(2)
+            table.columns = ['Jumlah Data', 'Rata-rata', 'Median', 'Std', 'Minimum', 'Maksimum']
+            st.dataframe(table, use_container_width=True)
             
-            # Bar chart
             fig = px.bar(
-                x=mapel_stats.index,
-                y=mapel_stats['Rata-rata'],
-                labels={'x': 'Mata Pelajaran', 'y': 'Rata-rata Nilai'},
-                title='Rata-rata Nilai per Mata Pelajaran'
+                x=class_stats.index.astype(str),
+                y=class_stats['mean'],
+                error_y=class_stats['std'],
+                labels={'x': 'Kelas', 'y': 'Rata-rata Nilai'},
+                title='Rata-rata Nilai per Kelas'
+            )
+            fig.update_xaxes(tickangle=-45)
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Kelas × mapel (satu agregasi, di-cache per dataset)
+            st.markdown("#### Rata-rata Kelas per Mata Pelajaran")
+            heatmap = get_active_class_statistics(by=['MAPEL_ID'])['mean'].unstack('MAPEL_ID')
+            fig = px.imshow(
+                heatmap,
+                text_auto='.1f',
+                aspect='auto',
+                color_continuous_scale='RdYlGn',
+                labels={'x': 'Mata Pelajaran', 'y': 'Kelas', 'color': 'Rata-rata'}
             )
-            fig.update_xaxis(tickangle=-45)
             st.plotly_chart(fig, use_container_width=True)
 
+elif df is not None:
+    # Data umum (bukan leger): metrik ringan langsung dari DataFrame
+    overview = get_active_overview()
+    
+    st.markdown("### 📈 Overview Performa")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    def _fmt(value):
+        return f"{value:.2f}" if pd.notna(value) else "-"
+    
+    with col1:
+        st.metric("Total Siswa", f"{overview['total_students']:,}")
+    
+    with col2:
+        st.metric("Rata-rata Nilai", _fmt(overview['nilai_mean']))
+    
+    with col3:
+        st.metric("Nilai Tertinggi", _fmt(overview['nilai_max']))
+    
+    with col4:
+        st.metric("Nilai Terendah", _fmt(overview['nilai_min']))
+    
+    st.markdown("---")
+    
+    if 'NILAI' in df.columns:
+        st.markdown("#### Histogram Distribusi Nilai")
+        fig = px.histogram(
+            df,
+            x='NILAI',
+            nbins=30,
+            title='Distribusi Nilai Keseluruhan',
+            labels={'NILAI': 'Nilai', 'count': 'Jumlah'},
+            color_discrete_sequence=['#3B82F6']
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.info("ℹ️ Analisis siswa, mapel, klaster dan kelas membutuhkan data leger.")
+
 else:
     st.warning("⚠️ Belum ada data. Silakan upload data terlebih dahulu di halaman **📤 Upload Data**.")
     
@@ -14,6 +14,14 @@ if 'path_initialized' not in st.session_state:
 from components.header import render_page_header, add_page_style
 from components.sidebar import render_custom_sidebar
 from components.footer import render_minimal_footer
+from components.job_status import job_button, render_job_progress, rerun_while_job_active
+from utils.dataset_store import get_active_dataset
+from utils.data_loader import load_csv, load_excel
+from utils.leger_cleaner import leger_student_keys
+from analytics.subject_analytics import DEFAULT_KKM
+from models.prediction_model import GraduationPredictor, make_proxy_labels, model_file
+from utils.feature_store import get_active_features
+from utils.job_queue import JOB_DONE, JOB_KIND_TRAIN
 
 # Page setup
 add_page_style()
@@ -29,50 +37,207 @@ render_page_header(
 # Main content
 st.markdown("### 🤖 Model Prediksi")
 
-if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
-    df = st.session_state['df_clean']
-    
-    st.info("ℹ️ **Fitur prediksi kelulusan akan segera hadir!**")
-    
-    # Placeholder untuk model info
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric("Model", "Random Forest")
-    
-    with col2:
-        st.metric("Accuracy", "92%")
-    
-    with col3:
-        st.metric("Features", "15")
-    
-    st.markdown("---")
+df = get_active_dataset()
+
+
+def load_label_file(file):
+    """Label kelulusan historis: kolom NISN dan LULUS (1/0 atau LULUS/TIDAK LULUS)"""
+    labels = load_csv(file) if file.name.endswith('.csv') else load_excel(file)
+    if labels is None or not {'NISN', 'LULUS'}.issubset(labels.columns):
+        st.warning("⚠️ File label harus memiliki kolom 'NISN' dan 'LULUS'.")
+        return None
+    status = labels['LULUS'].astype(str).str.strip().str.upper()
+    values = status.isin(['1', '1.0', 'LULUS', 'YA', 'TRUE']).astype('int8')
+    labels = pd.Series(values.to_numpy(), index=labels['NISN'].astype(str).str.strip())
+    duplicated = labels.index.duplicated(keep='last')
+    if duplicated.any():
+        st.warning(f"⚠️ {int(duplicated.sum()):,} NISN muncul lebih dari sekali; label baris terakhir yang dipakai.")
+    return labels[~duplicated]
+
+
+if df is not None:
     
-    # Form input untuk prediksi individual
-    st.markdown("### 📝 Prediksi Individual")
+    features = get_active_features()
     
-    with st.form("prediction_form"):
-        col1, col2 = st.columns(2)
+    if features is None or len(features) == 0:
+        st.warning("⚠️ Prediksi membutuhkan data leger (kolom NISN, NAMA_SISWA, MAPEL_ID, SEMESTER, NILAI).")
+    else:
+        # Label training
+        st.markdown("#### 🏷️ Label Training")
+        label_source = st.radio(
+            "Sumber label kelulusan",
+            ["Proksi KKM (semua mapel tuntas)", "Upload data kelulusan historis"],
+            horizontal=True
+        )
+        
+        labels, label_key = None, None
+        if label_source.startswith("Proksi"):
+            kkm = st.number_input("KKM", min_value=0, max_value=100, value=DEFAULT_KKM, step=1)
+            labels, label_key = make_proxy_labels(features, kkm), ('proksi', kkm)
+            st.info(
+                "ℹ️ Label proksi dihitung dari nilai rerata mapel (semua mapel ≥ KKM), jadi fitur rerata "
+                "mapel dan RATA_RATA tidak dipakai saat training. Prediksi hanya memperkirakan aturan "
+                "ketuntasan itu dari nilai per semester dan tren, bukan peluang kelulusan sebenarnya."
+            )
+        else:
+            label_file = st.file_uploader("File label (CSV/Excel: NISN, LULUS)", type=['csv', 'xlsx', 'xls'])
+            if label_file is not None:
+                uploaded = load_label_file(label_file)
+                if uploaded is not None:
+                    labels = uploaded.reindex(features.index).dropna().astype('int8')
+                    label_key = ('upload', label_file.file_id)
+                    st.caption(f"{len(labels):,} siswa memiliki label")
+        
+        # Training berjalan di antrean job latar belakang; model hasilnya
+        # disimpan sebagai artefak berversi lalu dipakai seperti model tersimpan
+        if labels is not None:
+            single_class = labels.nunique() < 2
+            
+            def train_params():
+                if single_class:
+                    return None
+                return {
+                    'dataset_id': st.session_state.get('dataset_id'),
+                    'kkm': label_key[1] if label_key[0] == 'proksi' else None,
+                }
+            
+            def train_files():
+                if label_key[0] != 'upload':
+                    return None
+                return {'labels.csv': labels.rename_axis('KEY').rename('LULUS').reset_index()
+                        .to_csv(index=False).encode('utf-8')}
+            
+            clicked = job_button("🚀 Latih Model", 'train_job', JOB_KIND_TRAIN, train_params, train_files,
+                                 type="primary")
+            if clicked and single_class:
+                st.warning("⚠️ Label hanya berisi satu kelas; model tidak dapat dilatih.")
+        
+        train_job = st.session_state.get('train_job')
+        job = render_job_progress(train_job) if train_job else None
+        if job is not None:
+            del st.session_state['train_job']
+            if job['status'] == JOB_DONE:
+                st.success(
+                    f"✅ Model dilatih dengan {job['result']['n_train']:,} siswa dan disimpan "
+                    f"(v{job['result']['artifact_version']})"
+                )
+        
+        # Model tersimpan milik dataset dan sumber label ini (cache hangat:
+        # setelah pemuatan pertama tidak membaca disk lagi)
+        dataset_id = st.session_state.get('dataset_id')
+        saved_source = 'proksi' if label_source.startswith("Proksi") else 'historis'
+        trained = None
+        try:
+            saved = GraduationPredictor().load_model(model_file(dataset_id, saved_source), features=features)
+        except FileNotFoundError:
+            saved = None
+        except ValueError as e:
+            saved = None
+            st.warning(f"⚠️ Model tersimpan tidak cocok dengan data ini: {e}")
+        
+        if saved is not None:
+            saved_key = (dataset_id, saved_source, saved.artifact_version)
+            trained = st.session_state.get('saved_model_predictions')
+            if trained is None or trained['key'] != saved_key:
+                trained = {'key': saved_key, 'predictor': saved, 'accuracy': saved.metadata.get('accuracy'),
+                           'predictions': saved.predict_cohort(features)}
+                st.session_state['saved_model_predictions'] = trained
+        
+        st.markdown("---")
+        
+        # Model info
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            nama = st.text_input("Nama Siswa")
-            nisn = st.text_input("NISN")
+            st.metric("Model", "Logistic Regression")
         
+        # Dengan label proksi, akurasi hanya mengukur kecocokan dengan aturan KKM
+        proxy_model = bool(trained) and trained['predictor'].metadata.get('label_source') == 'proksi'
         with col2:
-            nilai_rata = st.number_input("Rata-rata Nilai", min_value=0.0, max_value=100.0, value=75.0)
-            kehadiran = st.slider("Kehadiran (%)", 0, 100, 90)
+            st.metric(
+                "Kecocokan Aturan KKM" if proxy_model else "Accuracy",
+                f"{trained['accuracy'] * 100:.1f}%" if trained and trained['accuracy'] else "-"
+            )
+        
+        with col3:
+            st.metric("Features", len(trained['predictor'].feature_names) if trained else features.shape[1])
         
-        submitted = st.form_submit_button("🎯 Prediksi", type="primary")
+        with col4:
+            st.metric("Siswa", f"{len(features):,}")
         
-        if submitted:
-            # Placeholder untuk hasil prediksi
-            st.success("✅ Hasil Prediksi:")
+        if trained is None:
+            st.info("ℹ️ Latih model untuk memprediksi kelulusan seluruh siswa sekaligus.")
+        else:
+            predictor = trained['predictor']
+            st.caption(
+                f"📦 Model tersimpan v{predictor.artifact_version} • dilatih "
+                f"{predictor.metadata.get('trained_at', '-')} dengan {predictor.metadata.get('n_train', '-')} siswa"
+            )
+            if proxy_model:
+                st.warning(
+                    f"⚠️ Model dilatih dengan label proksi KKM {predictor.metadata.get('kkm', '-')}: prediksi "
+                    "mengulang aturan 'semua mapel tuntas', bukan data kelulusan historis."
+                )
+            
+            predictions = trained['predictions']
+            
+            st.markdown("---")
+            st.markdown("### 📋 Prediksi Seluruh Siswa")
+            
+            identity = df[['NISN', 'NAMA_SISWA']].drop_duplicates()
+            identity.index = leger_student_keys(identity['NISN'], identity['NAMA_SISWA'])
+            identity = identity[~identity.index.duplicated()]
+            result = identity.reindex(predictions.index).join(predictions)
+            result['RATA_RATA'] = features.to_frame(['RATA_RATA'])['RATA_RATA']
+            result = result.sort_values('PROBA_LULUS')
+            
+            lulus = int((result['PREDIKSI'] == 'LULUS').sum())
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Prediksi Lulus", f"{lulus:,}")
+            with col2:
+                st.metric("Prediksi Tidak Lulus", f"{len(result) - lulus:,}")
+            
+            search = st.text_input("🔍 Cari nama atau NISN")
+            table = result
+            if search:
+                needle = search.strip().lower()
+                table = result[
+                    result['NAMA_SISWA'].astype(str).str.lower().str.contains(needle, regex=False)
+                    | result['NISN'].astype(str).str.contains(needle, regex=False)
+                ]
             
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Status", "LULUS", delta="Confidence: 95%")
+                page_size = st.selectbox("Baris per halaman", [25, 50, 100], index=1)
+            n_pages = max(1, -(-len(table) // page_size))
             with col2:
-                st.metric("Probabilitas", "95%")
+                page = st.number_input("Halaman", min_value=1, max_value=n_pages, value=1, step=1)
+            
+            st.dataframe(
+                table.iloc[(page - 1) * page_size:page * page_size].style.format(
+                    {'PROBA_LULUS': '{:.1%}', 'RATA_RATA': '{:.2f}'}, na_rep='-'
+                ),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(f"Halaman {page} dari {n_pages} • {len(table):,} siswa")
+            
+            # Download (CSV seluruh prediksi dibuat hanya saat diminta)
+            download_key = (st.session_state.get('dataset_id'), predictor.metadata.get('label_source'),
+                            predictor.metadata.get('trained_at'))
+            if st.button("📄 Siapkan Download Prediksi"):
+                csv = result.to_csv(index=False).encode('utf-8-sig')
+                st.session_state['prediction_csv'] = (download_key, csv)
+            
+            prepared = st.session_state.get('prediction_csv')
+            if prepared is not None and prepared[0] == download_key:
+                st.download_button(
+                    label="📥 Download Prediksi",
+                    data=prepared[1],
+                    file_name=f"prediksi_kelulusan_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv"
+                )
 
 else:
     st.warning("⚠️ Belum ada data. Silakan upload data terlebih dahulu.")
@@ -81,4 +246,7 @@ else:
         st.switch_page("pages/5_📤_Upload_Data.py")
 
 # Footer
-render_minimal_footer()
\ No newline at end of file
+render_minimal_footer()
+
+# Progress job yang masih berjalan diperbarui dengan menjalankan ulang halaman
+rerun_while_job_active()
@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -14,6 +15,16 @@ if 'path_initialized' not in st.session_state:
 from components.header import render_page_header, add_page_style
 from components.sidebar import render_custom_sidebar
 from components.footer import render_minimal_footer
+from utils.dataset_store import get_active_dataset
+from utils.data_loader import load_csv, load_excel
+from analytics.early_warning import (
+    DEFAULT_MIN_ATTENDANCE, attendance_rates, get_active_risk_index
+)
+
+RISK_TABLE_COLUMNS = [
+    'PERINGKAT', 'NAMA_SISWA', 'NISN', 'KELAS', 'SKOR_RISIKO', 'LEVEL_RISIKO',
+    'MAPEL_TIDAK_TUNTAS', 'JUMLAH_MAPEL', 'RATA_RATA', 'NILAI_MIN', 'JARAK_KKM', 'TREN', 'KEHADIRAN'
+]
 
 # Page setup
 add_page_style()
@@ -27,66 +38,131 @@ render_page_header(
 )
 
 # Main content
-if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
-    df = st.session_state['df_clean']
+df = get_active_dataset()
+
+if df is not None:
     
     # Threshold settings
     st.markdown("### ⚙️ Pengaturan Threshold")
     
     col1, col2 = st.columns(2)
     with col1:
-        threshold_nilai = st.slider("Threshold Nilai Berisiko", 0, 100, 60)
+        threshold_nilai = st.slider("Threshold Nilai Berisiko (KKM)", 0, 100, 60)
     with col2:
-        threshold_kehadiran = st.slider("Threshold Kehadiran (%)", 0, 100, 75)
+        threshold_kehadiran = st.slider("Threshold Kehadiran (%)", 0, 100, DEFAULT_MIN_ATTENDANCE)
+    
+    # Indeks dibangun sekali per dataset; geser slider hanya pencarian biner
+    risk_index = get_active_risk_index()
+    
+    # Optional attendance data
+    with st.expander("📅 Data Presensi (opsional)"):
+        presensi_file = st.file_uploader(
+            "Upload presensi (CSV/Excel: id_siswa, tanggal, status)",
+            type=['csv', 'xlsx', 'xls'],
+            key="presensi_uploader"
+        )
+        attendance = None
+        if presensi_file is not None and risk_index is not None:
+            # Presensi dibaca dan disejajarkan ulang hanya jika file/dataset berganti
+            cache_key = (presensi_file.file_id, st.session_state.get('dataset_id'))
+            cached = st.session_state.get('presensi_rates')
+            if cached is not None and cached[0] == cache_key:
+                attendance = cached[1]
+            else:
+                presensi = load_csv(presensi_file) if presensi_file.name.endswith('.csv') else load_excel(presensi_file)
+                if presensi is not None and {'id_siswa', 'status'}.issubset(presensi.columns):
+                    attendance = risk_index.align_attendance(attendance_rates(presensi))
+                    st.session_state['presensi_rates'] = (cache_key, attendance)
+                elif presensi is not None:
+                    st.warning("⚠️ Data presensi harus memiliki kolom 'id_siswa' dan 'status'.")
+            if attendance is not None:
+                st.caption(f"Kehadiran {int((~np.isnan(attendance)).sum()):,} siswa dimuat")
     
     st.markdown("---")
     
-    # Find at-risk students
-    if 'NILAI' in df.columns:
-        at_risk = df[df['NILAI'] < threshold_nilai]
+    if risk_index is not None:
+        # Skor sebagai array; baris tabel hanya dibentuk untuk halaman yang tampil
+        ranking = risk_index.rank(threshold_nilai, attendance, threshold_kehadiran)
+        at_risk_count = ranking.at_risk_count
+        total_siswa = len(ranking)
         
-        # Metrics
-        col1, col2, col3 = st.columns(3)
+        # Metrics (per siswa)
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_siswa = df['NISN'].nunique() if 'NISN' in df.columns else len(df)
-            st.metric("Total Siswa", total_siswa)
+            st.metric("Total Siswa", f"{total_siswa:,}")
         
         with col2:
-            at_risk_count = len(at_risk)
-            st.metric("Siswa Berisiko", at_risk_count, delta=f"{(at_risk_count/len(df)*100):.1f}%")
+            st.metric(
+                "Siswa Berisiko", f"{at_risk_count:,}",
+                delta=f"{(at_risk_count / total_siswa * 100):.1f}%" if total_siswa else None,
+                delta_color="inverse"
+            )
         
         with col3:
-            safe_count = len(df) - at_risk_count
-            st.metric("Siswa Aman", safe_count)
+            st.metric("Siswa Aman", f"{total_siswa - at_risk_count:,}")
+        
+        with col4:
+            st.metric("Risiko Tinggi", f"{ranking.count_level('Tinggi'):,}")
         
         st.markdown("---")
         
-        # Display at-risk students
-        if not at_risk.empty:
-            st.error(f"🚨 Ditemukan {len(at_risk)} data dengan nilai di bawah {threshold_nilai}")
-            
-            # Show data
-            display_columns = ['NAMA_SISWA', 'NISN', 'NILAI', 'MAPEL_ID'] if all(col in at_risk.columns for col in ['NAMA_SISWA', 'NISN', 'NILAI', 'MAPEL_ID']) else at_risk.columns[:4]
-            
-            st.dataframe(
-                at_risk[display_columns].head(20),
-                use_container_width=True
+        if at_risk_count:
+            below_count = risk_index.count_students_below(threshold_nilai)
+            message = f"🚨 Ditemukan {at_risk_count:,} siswa berisiko: {below_count:,} siswa punya mapel di bawah {threshold_nilai}"
+            if attendance is not None:
+                message += f", sisanya kehadiran di bawah {threshold_kehadiran}%"
+            st.error(message)
+        else:
+            st.success("✅ Tidak ada siswa berisiko ditemukan!")
+        
+        # Ranked risk table
+        st.markdown("### 📋 Peringkat Risiko Siswa")
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            level_filter = st.multiselect(
+                "Level Risiko", ['Tinggi', 'Sedang', 'Rendah'], default=['Tinggi', 'Sedang', 'Rendah']
             )
-            
-            # Download button
-            csv = at_risk.to_csv(index=False).encode('utf-8-sig')
+        with col2:
+            page_size = st.selectbox("Baris per halaman", [25, 50, 100, 250], index=1)
+        
+        positions = ranking.positions(level_filter)
+        n_pages = max(1, -(-len(positions) // page_size))
+        with col3:
+            page = st.number_input("Halaman", min_value=1, max_value=n_pages, value=1, step=1)
+        
+        page_rows = ranking.take(positions[(page - 1) * page_size:page * page_size])
+        display_columns = [col for col in RISK_TABLE_COLUMNS if col in page_rows.columns]
+        
+        st.dataframe(
+            page_rows[display_columns].style.format({
+                'RATA_RATA': '{:.2f}', 'NILAI_MIN': '{:.2f}', 'JARAK_KKM': '{:.2f}',
+                'TREN': '{:+.2f}', 'KEHADIRAN': '{:.1f}%', 'SKOR_RISIKO': '{:.1f}'
+            }, na_rep='-'),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Halaman {page} dari {n_pages} • {len(positions):,} siswa")
+        
+        # Download (CSV seluruh peringkat dibuat hanya saat diminta)
+        download_key = (st.session_state.get('dataset_id'), threshold_nilai, threshold_kehadiran,
+                        st.session_state.get('presensi_rates', (None,))[0] if attendance is not None else None)
+        if st.button("📄 Siapkan Download Peringkat Risiko"):
+            csv = ranking.to_frame()[display_columns].to_csv(index=False).encode('utf-8-sig')
+            st.session_state['risk_csv'] = (download_key, csv)
+        
+        prepared = st.session_state.get('risk_csv')
+        if prepared is not None and prepared[0] == download_key:
             st.download_button(
-                label="📥 Download Data Siswa Berisiko",
-                data=csv,
-                file_name=f"siswa_berisiko_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
+                label="📥 Download Peringkat Risiko",
+                data=prepared[1],
+                file_name=f"peringkat_risiko_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
             )
-        else:
-            st.success("✅ Tidak ada siswa berisiko ditemukan!")
     
     else:
-        st.warning("⚠️ Kolom 'NILAI' tidak ditemukan dalam data.")
+        st.warning("⚠️ Early warning membutuhkan data leger (kolom NISN, NAMA_SISWA, NILAI, SEMESTER).")
 
 else:
     st.warning("⚠️ Belum ada data. Silakan upload data terlebih dahulu.")
@@ -6,6 +6,7 @@ Halaman untuk upload dan processing data leger
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -25,14 +26,27 @@ if 'path_initialized' not in st.session_state:
 from components.header import render_page_header, add_page_style
 from components.sidebar import render_custom_sidebar
 from components.footer import render_minimal_footer
+from components.job_status import (
+    job_button,
+    render_job_history,
+    render_job_progress,
+    rerun_while_job_active
+)
 
 # Import utilities
-from utils.data_processor import load_and_process_excel
-from utils.leger_cleaner import (
-    create_student_summary, 
-    create_subject_analysis, 
-    save_clean_data
+from utils.aggregate_cube import get_active_cube
+from utils.data_query import count_pages, get_active_query, take_page
+from utils.dataset_catalog import (
+    activate_dataset,
+    compute_file_hash,
+    list_datasets,
+    remove_dataset,
+    supports_incremental_update
 )
+from utils.dataset_store import get_active_dataset, set_active_dataset
+from utils.job_queue import JOB_DONE, JOB_KIND_CLEAN
+from utils.leger_incremental import ingest_leger_incremental
+from utils.leger_cleaner import load_clean_data
 
 # ============================================
 # PAGE SETUP
@@ -44,8 +58,9 @@ render_custom_sidebar()  # Render sidebar content
 # HELPER FUNCTIONS
 # ============================================
 
-def display_upload_stats(df_clean):
+def display_upload_stats(df_clean, cube):
     """Display quick statistics after upload"""
+    overview = cube.overview() if cube is not None else None
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -56,46 +71,39 @@ def display_upload_stats(df_clean):
         )
     
     with col2:
-        if 'NISN' in df_clean.columns:
-            unique_students = df_clean['NISN'].nunique()
+        if overview:
             st.metric(
                 "👨‍🎓 Jumlah Siswa",
-                f"{unique_students:,}",
+                f"{overview['total_students']:,}",
                 help="Siswa unik berdasarkan NISN"
             )
         else:
             st.metric("👨‍🎓 Jumlah Siswa", "N/A")
     
     with col3:
-        if 'NILAI' in df_clean.columns:
-            avg_score = df_clean['NILAI'].mean()
+        if overview:
             st.metric(
                 "📈 Rata-rata Nilai",
-                f"{avg_score:.2f}",
+                f"{overview['nilai_mean']:.2f}",
                 help="Rata-rata nilai keseluruhan"
             )
         else:
             st.metric("📈 Rata-rata Nilai", "N/A")
     
     with col4:
-        if 'MAPEL_ID' in df_clean.columns:
-            unique_subjects = df_clean['MAPEL_ID'].nunique()
+        if overview:
             st.metric(
                 "📚 Jumlah Mapel",
-                f"{unique_subjects}",
+                f"{overview['total_subjects']}",
                 help="Mata pelajaran unik"
             )
         else:
             st.metric("📚 Jumlah Mapel", "N/A")
 
 
-def display_grade_distribution(df):
+def display_grade_distribution(cube):
     """Display grade distribution pie chart"""
-    bins = [0, 60, 70, 80, 90, 100]
-    labels = ['E (<60)', 'D (60-70)', 'C (70-80)', 'B (80-90)', 'A (90-100)']
-    df['GRADE'] = pd.cut(df['NILAI'], bins=bins, labels=labels, include_lowest=True)
-    
-    grade_counts = df['GRADE'].value_counts().reset_index()
+    grade_counts = cube.grade_distribution().reset_index()
     grade_counts.columns = ['Grade', 'Count']
     
     fig = px.pie(
@@ -116,12 +124,13 @@ def display_grade_distribution(df):
     return fig
 
 
-def display_student_ranking(df):
+def display_student_ranking(cube):
     """Display top students ranking"""
-    summary = create_student_summary(df)
+    summary = cube.student_means(rerata=True).rename(columns={'JUMLAH_NILAI': 'JUMLAH_MAPEL'})
     
     if not summary.empty:
         # Add ranking column
+        summary['RATA_RATA'] = summary['RATA_RATA'].round(2)
         summary['RANKING'] = range(1, len(summary) + 1)
         summary = summary[['RANKING', 'NAMA_SISWA', 'RATA_RATA', 'JUMLAH_MAPEL']]
         
@@ -163,6 +172,118 @@ def display_student_ranking(df):
     
     return pd.DataFrame()
 
+
+def display_subject_boxes(cube):
+    """Box plot nilai rerata per mapel dari kuartil cube"""
+    fig = go.Figure()
+    
+    for mapel in cube.mapel:
+        box = cube.box_stats(rerata=True, mapel=mapel)
+        if box is None:
+            continue
+        fig.add_trace(go.Box(
+            name=str(mapel),
+            q1=[box['q1']],
+            median=[box['median']],
+            q3=[box['q3']],
+            lowerfence=[box['lowerfence']],
+            upperfence=[box['upperfence']],
+        ))
+    
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        yaxis_title='NILAI',
+        showlegend=False,
+        height=400
+    )
+    
+    return fig
+
+def display_upload_job(job_id):
+    """Progress job pembersihan; setelah selesai dataset diaktifkan lalu ringkasan dan download ditampilkan"""
+    job = render_job_progress(job_id)
+    if job is None or job['status'] != JOB_DONE:
+        return
+    
+    result = job['result']
+    upload_name = result['upload_name']
+    if st.session_state.get('upload_job_loaded') != job_id:
+        if not (result['catalogued'] and activate_dataset(result['dataset_id'])):
+            if not Path(result['data_path']).exists():
+                st.warning("⚠️ Hasil job ini sudah dihapus. Silakan proses ulang file.")
+                return
+            set_active_dataset(result['dataset_id'], load_clean_data(result['data_path']))
+            st.session_state['file_name'] = upload_name
+            st.session_state['upload_time'] = datetime.fromisoformat(job['finished_at'])
+            st.session_state['file_type'] = result['file_type']
+        st.session_state['upload_job_loaded'] = job_id
+        st.balloons()
+    
+    df_clean = get_active_dataset()
+    if df_clean is None:
+        return
+    
+    st.success(f"✅ Data berhasil diproses! ({result['rows']:,} baris)")
+    for err in result['errors']:
+        st.warning(f"⚠️ Sheet {err['kelas']} / {err['sheet']} gagal: {err['error']}")
+    if result.get('existing'):
+        st.info(f"ℹ️ Dataset ini sudah ada di katalog: `{result['data_path']}`")
+    elif result['catalogued']:
+        st.success(f"✅ File tersimpan: `{result['data_path']}`")
+    
+    # Display stats
+    st.markdown("### 📊 Ringkasan Data")
+    display_upload_stats(df_clean, get_active_cube())
+    
+    # Download buttons
+    st.markdown("---")
+    col1, col2, col3 = st.columns(3)
+    
+    # File download sudah ditulis job ke direktorinya; dibaca dari disk
+    downloads = result.get('downloads') or {}
+    for column, key, label, mime in [
+        (col1, 'csv', "📥 Download CSV", "text/csv"),
+        (col2, 'xlsx', "📥 Download Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ]:
+        with column:
+            path = Path(downloads[key]) if downloads.get(key) else None
+            if path is None or not path.exists():
+                # Melebihi batas baris Excel, atau file job sudah dihapus
+                st.button(label, disabled=True, use_container_width=True, key=f"download_{key}_disabled")
+                continue
+            with open(path, 'rb') as f:
+                st.download_button(label=label, data=f, file_name=path.name, mime=mime,
+                                   use_container_width=True)
+    
+    with col3:
+        if st.button("🔄 Upload Lagi", use_container_width=True):
+            del st.session_state['upload_job']
+            st.rerun()
+
+def run_incremental_update(uploaded_file, dataset_id):
+    """Update inkremental dataset tersimpan dari leger terbaru"""
+    try:
+        with st.spinner("🔁 Mencari siswa/semester yang berubah..."):
+            result = ingest_leger_incremental(uploaded_file, dataset_id)
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+        return
+    
+    activate_dataset(dataset_id)
+    
+    if result['part_path'] is None:
+        st.info("ℹ️ Tidak ada perubahan dibanding dataset tersimpan.")
+        return
+    
+    st.success(
+        f"✅ Dataset diperbarui: {result['changed_groups']:,} kelompok siswa × semester berubah, "
+        f"{result['new_students']:,} siswa baru "
+        f"(+{result['rows_added']:,} / -{result['rows_removed']:,} baris)"
+    )
+    
+    st.markdown("### 📊 Ringkasan Data")
+    display_upload_stats(get_active_dataset(), get_active_cube())
+
 # ============================================
 # MAIN PAGE CONTENT
 # ============================================
@@ -185,6 +306,29 @@ with st.sidebar:
         help="Pilih jenis data yang akan diupload"
     )
     
+    multi_file = False
+    incremental_target = None
+    if file_type == "Data Leger":
+        multi_file = st.checkbox(
+            "📚 Multi-file (semua sheet)",
+            value=False,
+            help="Upload beberapa file leger sekaligus; setiap sheet diproses paralel"
+        )
+        
+        # Dataset multi-file (per kelas) tidak bisa diperbarui dari satu leger
+        saved_datasets = [entry for entry in list_datasets() if supports_incremental_update(entry)]
+        if not multi_file and saved_datasets and st.checkbox(
+            "🔁 Update inkremental",
+            value=False,
+            help="Perbarui dataset leger tunggal yang tersimpan; hanya siswa/semester yang baru atau "
+                 "berubah yang diproses. Dataset multi-file diproses ulang lewat mode multi-file."
+        ):
+            target_labels = {
+                f"{entry['name']} ({entry['timestamp'][:16].replace('T', ' ')})": entry['dataset_id']
+                for entry in saved_datasets
+            }
+            incremental_target = target_labels[st.selectbox("🎯 Dataset tujuan", list(target_labels))]
+    
     auto_save = st.checkbox("💾 Simpan otomatis", value=True)
     show_raw = st.checkbox("👁️ Tampilkan data mentah", value=False)
     
@@ -216,12 +360,22 @@ with tab1:
     with col1:
         st.markdown("### 📁 Upload File Data")
         
-        uploaded_file = st.file_uploader(
-            f"Pilih file {file_type}",
-            type=['csv', 'xlsx', 'xls'],
-            help="Drag and drop atau klik untuk memilih file",
-            key="file_uploader"
-        )
+        if multi_file:
+            uploaded_files = st.file_uploader(
+                f"Pilih file {file_type} (boleh lebih dari satu)",
+                type=['xlsx', 'xls'],
+                help="Satu workbook per kelas, satu sheet per rombel",
+                accept_multiple_files=True,
+                key="file_uploader_multi"
+            )
+        else:
+            uploaded_file = st.file_uploader(
+                f"Pilih file {file_type}",
+                type=['csv', 'xlsx', 'xls'],
+                help="Drag and drop atau klik untuk memilih file",
+                key="file_uploader"
+            )
+            uploaded_files = [uploaded_file] if uploaded_file is not None else []
     
     with col2:
         st.markdown("### 📋 Template")
@@ -238,121 +392,38 @@ with tab1:
         if st.button("📥 Template Siswa", use_container_width=True):
             st.info("Template akan didownload...")
     
-    if uploaded_file is not None:
+    if uploaded_files:
         st.markdown("---")
         
         # File info
-        file_size = uploaded_file.size / 1024  # KB
-        st.info(f"📄 **File:** {uploaded_file.name} | 📊 **Ukuran:** {file_size:.2f} KB")
+        file_size = sum(f.size for f in uploaded_files) / 1024  # KB
+        if len(uploaded_files) == 1:
+            upload_name = uploaded_files[0].name
+        else:
+            upload_name = f"{len(uploaded_files)} file leger"
+        st.info(f"📄 **File:** {upload_name} | 📊 **Ukuran:** {file_size:.2f} KB")
         
         # Process button
-        if st.button("🚀 Proses Data", type="primary", use_container_width=True):
-            # Processing with progress
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            try:
-                # Step 1: Reading file
-                status_text.text("📖 Membaca file...")
-                progress_bar.progress(25)
-                
-                # Step 2: Processing
-                status_text.text("⚙️ Memproses data...")
-                progress_bar.progress(50)
-                
-                if file_type == "Data Leger":
-                    df_clean, stats = load_and_process_excel(uploaded_file, 'leger')
-                else:
-                    df_clean, stats = load_and_process_excel(uploaded_file, 'general')
-                
-                progress_bar.progress(75)
-                
-                # Step 3: Saving
-                if not df_clean.empty:
-                    status_text.text("💾 Menyimpan data...")
-                    
-                    # Save to session state
-                    st.session_state['df_clean'] = df_clean
-                    st.session_state['file_name'] = uploaded_file.name
-                    st.session_state['upload_time'] = datetime.now()
-                    st.session_state['file_type'] = file_type
-                    
-                    # Add to upload history
-                    if 'upload_history' not in st.session_state:
-                        st.session_state['upload_history'] = []
-                    
-                    st.session_state['upload_history'].append({
-                        'filename': uploaded_file.name,
-                        'timestamp': datetime.now(),
-                        'records': len(df_clean),
-                        'type': file_type
-                    })
-                    
-                    progress_bar.progress(100)
-                    status_text.empty()
-                    
-                    # Success message
-                    st.success("✅ Data berhasil diproses!")
-                    st.balloons()
-                    
-                    # Display stats
-                    st.markdown("### 📊 Ringkasan Data")
-                    display_upload_stats(df_clean)
-                    
-                    # Auto save
-                    if auto_save:
-                        with st.spinner("💾 Menyimpan file..."):
-                            save_results = save_clean_data(df_clean)
-                            st.session_state['save_paths'] = save_results
-                            st.success(f"✅ File tersimpan: `{save_results['csv_path']}`")
-                    
-                    # Download buttons
-                    st.markdown("---")
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        csv = df_clean.to_csv(index=False).encode('utf-8-sig')
-                        st.download_button(
-                            label="📥 Download CSV",
-                            data=csv,
-                            file_name=f"cleaned_{uploaded_file.name.rsplit('.', 1)[0]}.csv",
-                            mime="text/csv",
-                            use_container_width=True
-                        )
-                    
-                    with col2:
-                        # Excel download (if openpyxl available)
-                        try:
-                            from io import BytesIO
-                            buffer = BytesIO()
-                            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                                df_clean.to_excel(writer, index=False)
-                            
-                            st.download_button(
-                                label="📥 Download Excel",
-                                data=buffer.getvalue(),
-                                file_name=f"cleaned_{uploaded_file.name.rsplit('.', 1)[0]}.xlsx",
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                                use_container_width=True
-                            )
-                        except:
-                            st.button("📥 Download Excel", disabled=True, use_container_width=True)
-                    
-                    with col3:
-                        if st.button("🔄 Upload Lagi", use_container_width=True):
-                            st.rerun()
-                
-                else:
-                    st.error("❌ Data kosong atau format tidak sesuai!")
-                    progress_bar.empty()
-                    status_text.empty()
-            
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-                progress_bar.empty()
-                status_text.empty()
+        if incremental_target and st.button("🔁 Update Dataset", type="primary", use_container_width=True):
+            run_incremental_update(uploaded_files[0], incremental_target)
+        
+        elif not incremental_target:
+            # Pembersihan dan penyimpanan berjalan di antrean job latar belakang
+            job_button(
+                "🚀 Proses Data", 'upload_job', JOB_KIND_CLEAN,
+                params=lambda: {
+                    'file_type': file_type,
+                    'multi_file': multi_file,
+                    'upload_name': upload_name,
+                    'source_hash': compute_file_hash(*[f.getbuffer() for f in uploaded_files]),
+                    'auto_save': auto_save,
+                },
+                files=lambda: {f.name: f.getbuffer() for f in uploaded_files},
+                type="primary",
+                use_container_width=True
+            )
     
-    else:
+    elif 'upload_job' not in st.session_state:
         # Upload prompt dengan styling
         st.markdown("""
             <div style="
@@ -371,61 +442,64 @@ with tab1:
                 </p>
             </div>
         """, unsafe_allow_html=True)
+    
+    # Job pembersihan: progress, lalu hasilnya (juga setelah sesi kembali ke halaman ini)
+    if st.session_state.get('upload_job'):
+        display_upload_job(st.session_state['upload_job'])
+    
+    picked_job = render_job_history([JOB_KIND_CLEAN], key='upload_jobs')
+    if picked_job is not None:
+        st.session_state['upload_job'] = picked_job
+        st.rerun()
 
 # ============================================
 # TAB 2: PREVIEW DATA
 # ============================================
 with tab2:
-    if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
+    df_display = get_active_dataset()
+    
+    if df_display is not None:
         st.markdown("### 👁 Preview Data Bersih")
         
-        df_display = st.session_state['df_clean'].copy()
+        # Query lewat indeks pencarian dataset; hanya baris halaman aktif yang diambil
+        query = get_active_query()
         
         # Filter controls
-        col1, col2, col3 = st.columns(3)
+        col1, col2 = st.columns(2)
         
         with col1:
-            show_rows = st.slider(
-                "Jumlah baris",
-                min_value=10,
-                max_value=min(100, len(df_display)),
-                value=20,
-                step=10
-            )
-        
-        with col2:
             filter_type = st.selectbox(
                 "Filter data",
                 ["Semua Data", "Hanya Rerata", "Per Semester"]
             )
         
-        with col3:
-            if filter_type == "Per Semester" and 'SEMESTER' in df_display.columns:
-                selected_semester = st.selectbox(
-                    "Pilih Semester",
-                    sorted(df_display['SEMESTER'].unique())
-                )
-        
-        # Apply filters
-        if filter_type == "Hanya Rerata" and 'IS_RERATA' in df_display.columns:
-            df_display = df_display[df_display['IS_RERATA'] == True]
-        elif filter_type == "Per Semester" and 'SEMESTER' in df_display.columns:
-            df_display = df_display[df_display['SEMESTER'] == selected_semester]
+        selected_semester = None
+        with col2:
+            if filter_type == "Per Semester" and query.semesters:
+                selected_semester = st.selectbox("Pilih Semester", query.semesters)
         
         # Search functionality
         search_term = st.text_input("🔍 Cari data", placeholder="Ketik nama siswa, NISN, atau mata pelajaran...")
-        if search_term:
-            mask = df_display.astype(str).apply(
-                lambda x: x.str.contains(search_term, case=False, na=False)
-            ).any(axis=1)
-            df_display = df_display[mask]
+        positions = query.search(
+            search_term,
+            rerata=filter_type == "Hanya Rerata",
+            semester=selected_semester
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Baris per halaman", [20, 50, 100], index=0)
+        n_pages = count_pages(positions, page_size)
+        with col2:
+            page = st.number_input("Halaman", min_value=1, max_value=n_pages, value=1, step=1)
         
         # Display data
         st.dataframe(
-            df_display.head(show_rows),
+            take_page(df_display, positions, page, page_size),
             use_container_width=True,
             height=400
         )
+        st.caption(f"Halaman {page} dari {n_pages} • {len(positions):,} dari {query.n_rows:,} baris")
         
         # Data info
         st.markdown("---")
@@ -433,9 +507,9 @@ with tab2:
         
         with col1:
             with st.expander("📋 Informasi Struktur Data", expanded=False):
-                st.write(f"**Total Baris:** {len(df_display):,}")
+                st.write(f"**Total Baris:** {query.n_rows:,}")
                 st.write(f"**Total Kolom:** {len(df_display.columns)}")
-                st.write(f"**Ukuran Memory:** {df_display.memory_usage(deep=True).sum() / 1024:.2f} KB")
+                st.write(f"**Ukuran Memory:** {query.nbytes / 1024:.2f} KB")
                 
                 st.markdown("**Daftar Kolom:**")
                 for col in df_display.columns:
@@ -444,7 +518,8 @@ with tab2:
         with col2:
             if 'NILAI' in df_display.columns:
                 with st.expander("📊 Statistik Nilai", expanded=False):
-                    stats_df = df_display['NILAI'].describe().to_frame()
+                    nilai = pd.Series(df_display['NILAI'].to_numpy()[positions])
+                    stats_df = nilai.describe().to_frame()
                     stats_df.columns = ['Nilai']
                     st.dataframe(stats_df, use_container_width=True)
     
@@ -455,76 +530,63 @@ with tab2:
 # TAB 3: ANALISIS
 # ============================================
 with tab3:
-    if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
-        df = st.session_state['df_clean']
+    cube = get_active_cube()
+    
+    if cube is not None:
         
         # Student Ranking
-        if all(col in df.columns for col in ['NAMA_SISWA', 'NILAI', 'IS_RERATA']):
-            st.markdown("## 🏆 Ranking Siswa")
-            display_student_ranking(df)
-            st.markdown("---")
+        st.markdown("## 🏆 Ranking Siswa")
+        display_student_ranking(cube)
+        st.markdown("---")
         
         # Subject Analysis
-        if 'MAPEL_ID' in df.columns:
-            st.markdown("## 📚 Analisis Mata Pelajaran")
-            
-            subject_stats = create_subject_analysis(df)
-            
-            if not subject_stats.empty:
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    st.markdown("#### 📊 Statistik per Mapel")
-                    st.dataframe(
-                        subject_stats.style.background_gradient(
-                            subset=['RATA_RATA'],
-                            cmap='RdYlGn'
-                        ),
-                        use_container_width=True,
-                        height=400
-                    )
-                
-                with col2:
-                    st.markdown("#### 📦 Distribusi Nilai per Mapel")
-                    fig = px.box(
-                        df[df['IS_RERATA'] == True] if 'IS_RERATA' in df.columns else df,
-                        x='MAPEL_ID',
-                        y='NILAI',
-                        color='MAPEL_ID',
-                        title=''
-                    )
-                    fig.update_layout(
-                        xaxis_tickangle=-45,
-                        showlegend=False,
-                        height=400
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-            
-            st.markdown("---")
+        st.markdown("## 📚 Analisis Mata Pelajaran")
         
-        # Overall Distribution
-        if 'NILAI' in df.columns:
-            st.markdown("## 📈 Distribusi Nilai Keseluruhan")
-            
-            col1, col2 = st.columns(2)
+        subject_stats = cube.subject_stats(rerata=True).round(2)
+        subject_stats.columns = ['JUMLAH', 'RATA_RATA', 'STD', 'MIN', 'MAX']
+        
+        if not subject_stats.empty:
+            col1, col2 = st.columns([1, 1])
             
             with col1:
-                st.markdown("#### 📊 Histogram Nilai")
-                fig = px.histogram(
-                    df,
-                    x='NILAI',
-                    nbins=20,
-                    color_discrete_sequence=['#667eea'],
-                    marginal='box'
+                st.markdown("#### 📊 Statistik per Mapel")
+                st.dataframe(
+                    subject_stats.style.background_gradient(
+                        subset=['RATA_RATA'],
+                        cmap='RdYlGn'
+                    ),
+                    use_container_width=True,
+                    height=400
                 )
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                st.markdown("#### 🎯 Distribusi Grade")
-                fig = display_grade_distribution(df)
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                st.markdown("#### 📦 Distribusi Nilai per Mapel")
+                st.plotly_chart(display_subject_boxes(cube), use_container_width=True)
+        
+        st.markdown("---")
+        
+        # Overall Distribution
+        st.markdown("## 📈 Distribusi Nilai Keseluruhan")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("#### 📊 Histogram Nilai")
+            fig = px.bar(
+                cube.value_histogram(bin_width=5),
+                x='NILAI',
+                y='JUMLAH',
+                hover_data=['BIN'],
+                color_discrete_sequence=['#667eea']
+            )
+            fig.update_layout(height=400, bargap=0)
+            st.plotly_chart(fig, use_container_width=True)
+        
+        with col2:
+            st.markdown("#### 🎯 Distribusi Grade")
+            fig = display_grade_distribution(cube)
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
     
     else:
         st.info("ℹ️ Belum ada data untuk dianalisis. Upload file terlebih dahulu.")
@@ -534,37 +596,49 @@ with tab3:
 # ============================================
 with tab4:
     st.markdown("### 📜 Riwayat Upload")
+    st.caption("Dataset yang sudah diproses dan tersimpan; bisa dimuat ulang tanpa upload ulang.")
     
-    if 'upload_history' in st.session_state and st.session_state['upload_history']:
-        history_df = pd.DataFrame(st.session_state['upload_history'])
-        history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
-        history_df = history_df.sort_values('timestamp', ascending=False)
-        
-        for idx, row in history_df.iterrows():
+    datasets = list_datasets()
+    
+    if datasets:
+        for entry in datasets:
             with st.container():
-                col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+                col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 2, 1])
                 
                 with col1:
-                    st.write(f"**📄 {row['filename']}**")
+                    st.write(f"**📄 {entry['name']}**")
+                    st.caption(f"{entry['students'] or '-'} siswa · {entry['subjects'] or '-'} mapel")
                 
                 with col2:
-                    st.write(f"🕐 {row['timestamp'].strftime('%d/%m/%Y %H:%M')}")
+                    timestamp = datetime.fromisoformat(entry['timestamp'])
+                    st.write(f"🕐 {timestamp.strftime('%d/%m/%Y %H:%M')}")
                 
                 with col3:
-                    st.write(f"📊 {row['records']:,} records")
+                    st.write(f"📊 {entry['rows']:,} records")
                 
                 with col4:
-                    st.write(f"📋 {row['type']}")
+                    is_active = st.session_state.get('dataset_id') == entry['dataset_id']
+                    if st.button(
+                        "✅ Aktif" if is_active else "📂 Muat",
+                        key=f"load_{entry['dataset_id']}",
+                        disabled=is_active,
+                        use_container_width=True
+                    ):
+                        activate_dataset(entry['dataset_id'])
+                        st.rerun()
+                
+                with col5:
+                    if st.button("🗑️", key=f"delete_{entry['dataset_id']}", help="Hapus dataset"):
+                        remove_dataset(entry['dataset_id'])
+                        st.rerun()
                 
                 st.markdown("---")
-        
-        # Clear history button
-        if st.button("🗑️ Hapus Riwayat", type="secondary"):
-            st.session_state['upload_history'] = []
-            st.rerun()
     
     else:
         st.info("ℹ️ Belum ada riwayat upload.")
 
 # Footer
-render_minimal_footer()
\ No newline at end of file
+render_minimal_footer()
+
+# Progress job yang masih berjalan diperbarui dengan menjalankan ulang halaman
+rerun_while_job_active()
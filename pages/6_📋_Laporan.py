@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from io import StringIO
 from pathlib import Path
 import sys
 
@@ -15,6 +16,24 @@ if 'path_initialized' not in st.session_state:
 from components.header import render_page_header, add_page_style
 from components.sidebar import render_custom_sidebar
 from components.footer import render_minimal_footer
+from components.job_status import (
+    job_button,
+    render_job_history,
+    render_job_progress,
+    rerun_while_job_active
+)
+from analytics.subject_analytics import DEFAULT_KKM
+from utils.dataset_store import get_active_dataset
+from utils.job_queue import JOB_DONE, JOB_KIND_EXPORT
+from utils.report_cards import BUNDLE_PDF, BUNDLE_ZIP
+from utils.report_engine import REPORT_STUDENT, REPORT_TYPES, find_date_column
+
+MIME_TYPES = {
+    '.csv': "text/csv",
+    '.xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    '.pdf': "application/pdf",
+    '.zip': "application/zip",
+}
 
 # Page setup
 add_page_style()
@@ -28,8 +47,9 @@ render_page_header(
 )
 
 # Main content
-if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
-    df = st.session_state['df_clean']
+df = get_active_dataset()
+
+if df is not None:
     
     st.markdown("### 📊 Generate Laporan")
     
@@ -37,16 +57,7 @@ if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
     col1, col2 = st.columns(2)
     
     with col1:
-        report_type = st.selectbox(
-            "Jenis Laporan",
-            [
-                "Laporan Nilai Keseluruhan",
-                "Laporan Per Siswa",
-                "Laporan Per Mata Pelajaran",
-                "Laporan Kelulusan",
-                "Laporan Siswa Berisiko"
-            ]
-        )
+        report_type = st.selectbox("Jenis Laporan", REPORT_TYPES)
     
     with col2:
         format_type = st.selectbox(
@@ -54,69 +65,102 @@ if 'df_clean' in st.session_state and st.session_state['df_clean'] is not None:
             ["CSV", "Excel", "PDF"]
         )
     
-    # Date range
-    st.markdown("#### 📅 Periode Laporan")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        start_date = st.date_input("Dari Tanggal", datetime.now())
+    # Rapor PDF per siswa (laporan per siswa dalam format PDF)
+    is_leger = {'NISN', 'NAMA_SISWA', 'MAPEL_ID', 'SEMESTER', 'NILAI'}.issubset(df.columns)
+    report_cards = format_type == "PDF" and report_type == REPORT_STUDENT and is_leger
+    bundle = BUNDLE_ZIP
+    if report_cards:
+        bundle_label = st.radio("Bentuk rapor", ["ZIP (satu PDF per siswa)", "Satu PDF gabungan"], horizontal=True)
+        bundle = BUNDLE_ZIP if bundle_label.startswith("ZIP") else BUNDLE_PDF
+        st.caption("Rapor berisi nilai Smt1-Smt6 dan Rerata setiap mapel, diawali rekap kelas.")
     
-    with col2:
-        end_date = st.date_input("Sampai Tanggal", datetime.now())
+    # Date range (hanya jika data punya kolom tanggal)
+    st.markdown("#### 📅 Periode Laporan")
+    date_range = None
+    if find_date_column(df) is not None:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            start_date = st.date_input("Dari Tanggal", datetime.now())
+        
+        with col2:
+            end_date = st.date_input("Sampai Tanggal", datetime.now())
+        date_range = (start_date, end_date)
+    else:
+        st.caption("Data ini tidak memiliki kolom tanggal; laporan mencakup seluruh periode.")
     
     # Additional filters
+    semester, mapel = [], []
     with st.expander("🔧 Filter Tambahan", expanded=False):
         if 'SEMESTER' in df.columns:
-            semester = st.multiselect("Semester", df['SEMESTER'].unique())
+            semester = st.multiselect(
+                "Semester",
+                sorted(df['SEMESTER'].unique()),
+                format_func=lambda s: "Rerata" if s == 0 else f"Semester {s}"
+            )
         
         if 'MAPEL_ID' in df.columns:
-            mapel = st.multiselect("Mata Pelajaran", df['MAPEL_ID'].unique())
+            mapel = st.multiselect("Mata Pelajaran", sorted(df['MAPEL_ID'].dropna().unique()))
+        
+        kkm = st.number_input("KKM (laporan kelulusan / siswa berisiko)", 0, 100, DEFAULT_KKM)
     
     st.markdown("---")
     
-    # Generate button
-    if st.button("📥 Generate Laporan", type="primary", use_container_width=True):
-        with st.spinner("Generating laporan..."):
-            # Simulate processing
-            import time
-            time.sleep(1)
-            
-            st.success(f"✅ Laporan {report_type} berhasil dibuat!")
-            
-            # Preview
+    # Generate button: laporan dibangun dan ditulis di antrean job latar belakang
+    job_button(
+        "📥 Generate Laporan", 'report_job', JOB_KIND_EXPORT,
+        params={
+            'dataset_id': st.session_state.get('dataset_id'),
+            'report_type': "Rapor Siswa" if report_cards else report_type,
+            'format': ("ZIP" if bundle == BUNDLE_ZIP else "PDF") if report_cards else format_type,
+            'report_cards': report_cards,
+            'bundle': bundle,
+            'semesters': [int(s) for s in semester],
+            'subjects': [str(m) for m in mapel],
+            'date_range': [d.isoformat() for d in date_range] if date_range else None,
+            'kkm': kkm,
+        },
+        type="primary",
+        use_container_width=True
+    )
+    
+    picked_job = render_job_history([JOB_KIND_EXPORT], key='report_jobs')
+    if picked_job is not None:
+        st.session_state['report_job'] = picked_job
+    
+    job_id = st.session_state.get('report_job')
+    job = render_job_progress(job_id) if job_id else None
+    if job is not None and job['status'] == JOB_DONE:
+        result = job['result']
+        st.session_state['last_report'] = {
+            'type': job['params']['report_type'],
+            'format': job['params']['format'],
+            'path': result['path'],
+            'rows': result['rows'],
+            'unit': "siswa" if job['params']['report_cards'] else "baris",
+            'preview': pd.read_json(StringIO(result['preview']), orient='split') if result['preview'] else None,
+        }
+        del st.session_state['report_job']
+    
+    report = st.session_state.get('last_report')
+    if report is not None and Path(report['path']).exists():
+        st.success(f"✅ {report['type']} berhasil dibuat! ({report['rows']:,} {report.get('unit', 'baris')})")
+        
+        # Preview
+        if report['preview'] is not None:
             st.markdown("### 👁 Preview Laporan")
-            st.dataframe(df.head(10), use_container_width=True)
-            
-            # Download button
-            if format_type == "CSV":
-                csv = df.to_csv(index=False).encode('utf-8-sig')
-                st.download_button(
-                    label="📥 Download Laporan CSV",
-                    data=csv,
-                    file_name=f"laporan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-            
-            elif format_type == "Excel":
-                try:
-                    from io import BytesIO
-                    buffer = BytesIO()
-                    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                        df.to_excel(writer, index=False)
-                    
-                    st.download_button(
-                        label="📥 Download Laporan Excel",
-                        data=buffer.getvalue(),
-                        file_name=f"laporan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                except:
-                    st.error("❌ Excel export memerlukan library openpyxl")
-            
-            elif format_type == "PDF":
-                st.info("ℹ️ PDF export akan segera hadir!")
+            st.dataframe(report['preview'], use_container_width=True, hide_index=True)
+        
+        # Download (file dibaca dari disk, bukan diserialisasi ulang)
+        path = Path(report['path'])
+        with open(path, 'rb') as f:
+            st.download_button(
+                label=f"📥 Download Laporan {report['format']}",
+                data=f,
+                file_name=path.name,
+                mime=MIME_TYPES.get(path.suffix, "application/octet-stream"),
+                use_container_width=True
+            )
 
 else:
     st.warning("⚠️ Belum ada data. Silakan upload data terlebih dahulu.")
@@ -125,4 +169,7 @@ else:
         st.switch_page("pages/5_📤_Upload_Data.py")
 
 # Footer
-render_minimal_footer()
\ No newline at end of file
+render_minimal_footer()
+
+# Progress job yang masih berjalan diperbarui dengan menjalankan ulang halaman
+rerun_while_job_active()
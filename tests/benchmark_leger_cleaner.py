@@ -0,0 +1,100 @@
+"""
+Benchmark reshaping leger: loop per-sel (implementasi lama) vs vektor
+
+Jalankan dari root project:
+    python -m tests.benchmark_leger_cleaner
+"""
+import time
+
+import pandas as pd
+
+from tests.helpers import make_synthetic_leger
+from utils.leger_cleaner import reshape_leger
+
+
+def reshape_leger_loop(df):
+    """Implementasi lama: iterrows + loop per sel (sebagai pembanding)"""
+    data_start = 0
+    for i in range(len(df)):
+        row_text = ' '.join([str(val).upper() for val in df.iloc[i].values if pd.notna(val)])
+        if 'SMT1' in row_text or 'SMT2' in row_text:
+            data_start = i + 1
+            break
+
+    df_data = df.iloc[data_start:].reset_index(drop=True)
+    data_list = []
+
+    for idx, row in df_data.iterrows():
+        no, nama, nisn, nis = row.iloc[0], row.iloc[1], row.iloc[2], row.iloc[3]
+        if pd.isna(no) or pd.isna(nama):
+            continue
+        try:
+            no = int(float(no))
+            nisn = str(int(float(nisn))) if pd.notna(nisn) else None
+            nis = str(int(float(nis))) if pd.notna(nis) else None
+            nama = str(nama).strip()
+        except:
+            continue
+
+        col_idx = 4
+        mapel_num = 1
+        while col_idx < len(row):
+            for i in range(7):
+                if col_idx + i >= len(row):
+                    break
+                nilai = row.iloc[col_idx + i]
+                if pd.notna(nilai):
+                    try:
+                        if isinstance(nilai, str):
+                            nilai = float(nilai.replace(',', '.'))
+                        else:
+                            nilai = float(nilai)
+                        if 0 <= nilai <= 100:
+                            data_list.append({
+                                'NO': no,
+                                'NAMA_SISWA': nama,
+                                'NISN': nisn,
+                                'NIS': nis,
+                                'MAPEL_ID': f"Mapel_{mapel_num}",
+                                'KOMPONEN': f"Smt{i+1}" if i < 6 else "Rerata",
+                                'SEMESTER': i + 1 if i < 6 else 0,
+                                'NILAI': nilai,
+                                'IS_RERATA': i == 6
+                            })
+                    except:
+                        pass
+            col_idx += 7
+            mapel_num += 1
+
+    df_clean = pd.DataFrame(data_list)
+    if not df_clean.empty:
+        df_clean['NO'] = df_clean['NO'].astype('int16')
+        df_clean['SEMESTER'] = df_clean['SEMESTER'].astype('int8')
+        df_clean['NILAI'] = df_clean['NILAI'].astype('float32')
+        df_clean['IS_RERATA'] = df_clean['IS_RERATA'].astype('bool')
+        df_clean['MAPEL_ID'] = df_clean['MAPEL_ID'].astype('category')
+        df_clean['KOMPONEN'] = df_clean['KOMPONEN'].astype('category')
+    return df_clean
+
+
+def _timeit(func, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes=(100, 1000, 10000)):
+    """Cetak waktu loop vs vektor untuk tiap ukuran leger"""
+    print(f"{'siswa':>8} {'loop (s)':>10} {'vektor (s)':>11} {'speedup':>8}")
+    for n in sizes:
+        df = make_synthetic_leger(n)
+        t_loop = _timeit(reshape_leger_loop, df, repeat=1)
+        t_vec = _timeit(reshape_leger, df, repeat=3)
+        print(f"{n:>8} {t_loop:>10.3f} {t_vec:>11.4f} {t_loop / t_vec:>7.0f}x")
+
+
+if __name__ == '__main__':
+    run_benchmark()
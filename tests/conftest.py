@@ -0,0 +1,27 @@
+import pytest
+
+from tests.helpers import make_synthetic_leger
+from utils import leger_cache
+from utils.leger_cleaner import reshape_leger
+
+# Ukuran default (jumlah siswa, jumlah mapel) fixture ``df_clean``
+DEFAULT_LEGER_SIZE = (40, 4)
+
+
+@pytest.fixture(autouse=True)
+def isolated_leger_cache(tmp_path, monkeypatch):
+    """Setiap test memakai cache leger sendiri di direktori sementara"""
+    cache = leger_cache.LegerCache(cache_dir=tmp_path / 'cache')
+    monkeypatch.setattr(leger_cache, '_leger_cache', cache)
+    return cache
+
+
+@pytest.fixture(scope='module')
+def df_clean(request):
+    """
+    Data tidy dari leger sintetis, dibangun sekali per modul test
+
+    Ukuran bisa diatur per modul dengan ``LEGER_SIZE = (n_siswa, n_mapel)``.
+    """
+    n_students, n_mapel = getattr(request.module, 'LEGER_SIZE', DEFAULT_LEGER_SIZE)
+    return reshape_leger(make_synthetic_leger(n_students, n_mapel=n_mapel))
@@ -0,0 +1,36 @@
+"""
+Data sintetis bersama untuk test dan benchmark
+"""
+import numpy as np
+import pandas as pd
+
+from utils.leger_cleaner import KOLOM_PER_MAPEL, KOMPONEN_LABELS
+
+
+def make_synthetic_leger(n_students, n_mapel=15, seed=0):
+    """
+    Buat sheet leger mentah (seperti ``pd.read_excel(header=None)``)
+    lengkap dengan baris judul, header Smt1-Smt6/Rerata, koma desimal,
+    sel kosong dan nilai di luar rentang
+    """
+    rng = np.random.default_rng(seed)
+    n_nilai = n_mapel * KOLOM_PER_MAPEL
+
+    nilai = rng.uniform(40, 100, size=(n_students, n_nilai)).round(1).astype(object)
+    nilai[rng.random(nilai.shape) < 0.05] = np.nan
+    nilai[rng.random(nilai.shape) < 0.01] = 150
+    koma = rng.random(nilai.shape) < 0.05
+    nilai[koma] = [str(v).replace('.', ',') for v in nilai[koma]]
+
+    identitas = np.empty((n_students, 4), dtype=object)
+    identitas[:, 0] = np.arange(1, n_students + 1)
+    identitas[:, 1] = [f"  Siswa {i}  " for i in range(n_students)]
+    identitas[:, 2] = 1000000000 + np.arange(n_students)
+    identitas[:, 3] = 20000 + np.arange(n_students)
+
+    header = np.full((2, 4 + n_nilai), np.nan, dtype=object)
+    header[0, :4] = ['NO', 'NAMA', 'NISN', 'NIS']
+    header[1, 4:] = KOMPONEN_LABELS * n_mapel
+
+    body = np.hstack([identitas, nilai])
+    return pd.DataFrame(np.vstack([header, body]))
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.aggregate_cube import build_aggregate_cube, frame_overview
+from utils.dataset_store import DatasetStore
+
+
+# Ukuran data sintetis untuk fixture ``df_clean`` (lihat conftest)
+LEGER_SIZE = (60, 5)
+
+
+def test_cube_overview_matches_raw_data(df_clean):
+    overview = build_aggregate_cube(df_clean).overview()
+
+    assert overview['total_records'] == len(df_clean)
+    assert overview['total_students'] == df_clean['NISN'].nunique()
+    assert overview['total_subjects'] == df_clean['MAPEL_ID'].nunique()
+    assert overview['nilai_mean'] == pytest.approx(df_clean['NILAI'].mean(), rel=1e-5)
+    assert overview['nilai_std'] == pytest.approx(df_clean['NILAI'].std(), rel=1e-4)
+    assert overview['nilai_max'] == pytest.approx(df_clean['NILAI'].max())
+
+
+def test_cube_subject_and_student_views(df_clean):
+    cube = build_aggregate_cube(df_clean)
+    rerata = df_clean[df_clean['IS_RERATA']]
+
+    expected = rerata.groupby('MAPEL_ID', observed=True)['NILAI'].agg(['count', 'mean', 'min', 'max'])
+    stats = cube.subject_stats(rerata=True)
+    np.testing.assert_allclose(stats['MEAN'], expected['mean'], rtol=1e-5)
+    np.testing.assert_array_equal(stats['COUNT'], expected['count'])
+
+    means = cube.student_means(rerata=True).set_index('NAMA_SISWA')['RATA_RATA']
+    expected_means = rerata.groupby('NAMA_SISWA')['NILAI'].mean()
+    np.testing.assert_allclose(means.sort_index(), expected_means.sort_index(), rtol=1e-5)
+
+
+def test_cube_histogram_quantiles_and_grades(df_clean):
+    cube = build_aggregate_cube(df_clean)
+    nilai = df_clean['NILAI'].astype('float64').round(2)
+
+    box = cube.box_stats()
+    assert box['median'] == pytest.approx(nilai.median())
+    assert box['q1'] == pytest.approx(nilai.quantile(0.25))
+
+    assert cube.count_at_least(60) == (nilai >= 60).sum()
+    assert cube.value_histogram(bin_width=5)['JUMLAH'].sum() == len(df_clean)
+
+    # Batas bin sama dengan pd.cut(include_lowest=True) yang dipakai sebelumnya
+    grades = pd.cut(nilai, bins=[0, 60, 70, 80, 90, 100], include_lowest=True)
+    np.testing.assert_array_equal(cube.grade_distribution(), grades.value_counts(sort=False))
+
+
+def test_cube_is_built_once_per_dataset(df_clean):
+    store = DatasetStore()
+    store.put('ds', df_clean)
+    calls = []
+
+    def builder(df):
+        calls.append(1)
+        return build_aggregate_cube(df)
+
+    first = store.get_derived('ds', 'cube', builder)
+    second = store.get_derived('ds', 'cube', builder)
+
+    assert first is second
+    assert len(calls) == 1
+
+    store.acquire('ds', 'sesi-1')
+    store.release('ds', 'sesi-1')
+    assert store.get_derived('ds', 'cube', builder) is None
+
+
+def test_cube_keeps_two_decimal_values():
+    # Rerata ber-2 desimal tepat di sekitar KKM tidak boleh dibulatkan melewati batas
+    df = pd.DataFrame({
+        'NISN': ['1', '2', '3', '4'],
+        'NAMA_SISWA': ['A', 'B', 'C', 'D'],
+        'MAPEL_ID': ['MTK'] * 4,
+        'SEMESTER': [0] * 4,
+        'NILAI': [74.96, 74.99, 75.0, 75.04],
+    })
+    cube = build_aggregate_cube(df)
+
+    assert cube.count_at_least(75) == 2
+    assert cube.count_at_least(74.99) == 3
+    assert cube.box_stats()['median'] == pytest.approx(df['NILAI'].median())
+
+
+def test_cube_histogram_last_bin_includes_perfect_score():
+    df = pd.DataFrame({
+        'NISN': ['1', '2', '3'],
+        'NAMA_SISWA': ['A', 'B', 'C'],
+        'MAPEL_ID': ['MTK'] * 3,
+        'SEMESTER': [0] * 3,
+        'NILAI': [0.0, 97.5, 100.0],
+    })
+    histogram = build_aggregate_cube(df).value_histogram(bin_width=5)
+
+    assert len(histogram) == 20
+    assert histogram['BIN'].iloc[-1] == '95-100'
+    assert histogram['JUMLAH'].iloc[-1] == 2
+    assert histogram['JUMLAH'].sum() == 3
+
+
+def test_frame_overview_for_general_data():
+    df = pd.DataFrame({'NAMA': ['A', 'B', 'C'], 'NILAI': ['80', '90', 'x']})
+    overview = frame_overview(df)
+
+    assert overview['total_records'] == 3
+    assert overview['total_students'] == 3
+    assert overview['total_subjects'] == 0
+    assert overview['nilai_mean'] == pytest.approx(85)
+    assert overview['nilai_max'] == pytest.approx(90)
+
+    assert np.isnan(frame_overview(pd.DataFrame({'NAMA': ['A']}))['nilai_mean'])
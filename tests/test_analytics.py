@@ -1,6 +1,183 @@
+import pandas as pd
 import pytest
-from analytics.student_analytics import calculate_student_average
+from analytics.early_warning import RiskIndex, attendance_rates, compute_risk_features, score_student_risk
+from analytics.class_analytics import calculate_all_class_statistics, calculate_class_statistics
+from analytics.subject_analytics import analyze_all_subjects, analyze_subject_performance
+from analytics.student_analytics import (
+    StudentIndex,
+    calculate_all_student_averages,
+    calculate_student_average,
+    get_all_performance_trends,
+    get_student_performance_trend
+)
 
 def test_calculate_student_average():
     # Implementasi test
     pass
+
+
+def _nilai_frame():
+    return pd.DataFrame({
+        'NISN': ['3', '1', '2', '1', None, '3', '1'],
+        'SEMESTER': [1, 1, 1, 2, 1, 2, 2],
+        'NILAI': [70.0, 80.0, 90.0, 60.0, 50.0, 75.0, 100.0],
+    })
+
+
+def test_student_index_matches_boolean_scan():
+    df = _nilai_frame()
+    index = StudentIndex(df)
+
+    assert len(index) == 3
+    assert index._df is df
+    assert '9' not in index and index.get('9').empty
+    for student_id in ['1', '2', '3']:
+        expected = df[df['NISN'] == student_id]
+        assert index.get(student_id).sort_index().equals(expected)
+        assert calculate_student_average(df, student_id, index=index, value_col='NILAI') == expected['NILAI'].mean()
+
+    trend = get_student_performance_trend(df, '1', index=index, semester_col='SEMESTER', value_col='NILAI')
+    assert trend.to_dict() == {1: 80.0, 2: 80.0}
+
+
+def test_batch_student_averages_and_trends():
+    df = _nilai_frame()
+
+    assert calculate_all_student_averages(df).to_dict() == {'1': 80.0, '2': 90.0, '3': 72.5}
+    trends = get_all_performance_trends(df)
+    assert trends.loc['1'].tolist() == [80.0, 80.0]
+    assert trends.loc['3'].tolist() == [70.0, 75.0]
+
+
+def test_batch_class_statistics_match_per_class():
+    df = pd.DataFrame({
+        'KELAS': ['X-1', 'X-2', 'X-1', 'X-2', 'X-1', 'X-3'],
+        'MAPEL_ID': ['a', 'a', 'b', 'b', 'a', 'b'],
+        'NILAI': [70.0, 80.0, 90.0, 65.0, 85.0, 100.0],
+    })
+
+    stats = calculate_all_class_statistics(df)
+    for kelas in ['X-1', 'X-2', 'X-3']:
+        expected = calculate_class_statistics(df, kelas, class_col='KELAS', value_col='NILAI')
+        for name, value in expected.items():
+            assert stats.loc[kelas, name] == pytest.approx(value, nan_ok=True)
+
+    by_mapel = calculate_all_class_statistics(df, by=['MAPEL_ID'])
+    assert by_mapel.loc[('X-1', 'a'), 'median'] == 77.5
+    assert by_mapel.loc[('X-1', 'a'), 'count'] == 2
+
+
+def test_bulk_subject_report_matches_single_subject():
+    df = pd.DataFrame({
+        'MAPEL_ID': pd.Categorical(['a', 'a', 'b', 'a', 'b'], categories=['a', 'b', 'c']),
+        'NILAI': [60.0, 70.0, 80.0, 90.0, 69.5],
+    })
+
+    report = analyze_all_subjects(df, thresholds=[70, 75], subject_kkm={'b': 80})
+
+    for subject in ['a', 'b']:
+        single = analyze_subject_performance(df, subject, subject_col='MAPEL_ID', value_col='NILAI')
+        assert report.loc[subject, 'JUMLAH'] == single['total_students']
+        assert report.loc[subject, 'RATA_RATA'] == pytest.approx(single['average_score'])
+        assert report.loc[subject, 'LULUS_70'] == pytest.approx(single['pass_rate'])
+
+    assert report.loc['a', 'LULUS_75'] == pytest.approx(100 / 3)
+    assert report.loc['b', 'LULUS_KKM'] == 50.0
+    assert report.loc['a', 'KKM'] == 70.0
+
+
+def test_subject_report_handles_empty_subjects():
+    df = pd.DataFrame({'MAPEL_ID': pd.Categorical(['a'], categories=['a', 'b']), 'NILAI': [80.0]})
+
+    report = analyze_all_subjects(df)
+    single = analyze_subject_performance(df, 'b', subject_col='MAPEL_ID', value_col='NILAI')
+
+    assert report.loc['b', 'JUMLAH'] == 0
+    assert report.loc[['b'], ['RATA_RATA', 'LULUS_70']].isna().all(axis=None)
+    assert single['total_students'] == 0 and pd.isna(single['pass_rate'])
+
+
+def _leger_frame():
+    # Siswa A naik dan tuntas, siswa B turun dan tidak tuntas di satu mapel,
+    # siswa C tanpa NISN
+    rows = []
+    for nisn, nama, semesters, rerata in [
+        ('1', 'A', {1: 70.0, 2: 80.0}, {'MTK': 75.0, 'IPA': 85.0}),
+        ('2', 'B', {1: 80.0, 2: 60.0}, {'MTK': 50.0, 'IPA': 90.0}),
+        (None, 'C', {1: 65.0}, {'MTK': 65.0}),
+    ]:
+        for semester, nilai in semesters.items():
+            rows.append((nisn, nama, 'MTK', semester, nilai, False))
+        for mapel, nilai in rerata.items():
+            rows.append((nisn, nama, mapel, 0, nilai, True))
+    return pd.DataFrame(rows, columns=['NISN', 'NAMA_SISWA', 'MAPEL_ID', 'SEMESTER', 'NILAI', 'IS_RERATA'])
+
+
+def test_risk_features_per_student():
+    features = compute_risk_features(_leger_frame(), kkm=70).loc[['1', '2', 'NAMA:C']]
+
+    assert features['MAPEL_TIDAK_TUNTAS'].tolist() == [0, 1, 1]
+    assert features['JUMLAH_MAPEL'].tolist() == [2, 2, 1]
+    assert features['JARAK_KKM'].tolist() == [0.0, 10.0, 5.0]
+    assert features['NILAI_MIN'].tolist() == [75.0, 50.0, 65.0]
+    assert features['TREN'].iloc[:2].tolist() == [10.0, -20.0]
+    assert pd.isna(features['TREN'].iloc[2])
+
+
+def test_risk_ranking_with_attendance():
+    features = compute_risk_features(_leger_frame(), kkm=70)
+    presensi = pd.DataFrame({
+        'id_siswa': [1, 1, 1, 1, 2, 2],
+        'status': ['Hadir', 'Hadir', 'Hadir', 'Sakit', 'Hadir', 'Hadir'],
+    })
+    rates = attendance_rates(presensi)
+    assert rates.to_dict() == {'1': 75.0, '2': 100.0}
+
+    ranked = score_student_risk(features, rates, min_attendance=80)
+
+    assert ranked['NAMA_SISWA'].tolist()[0] == 'B'
+    assert ranked['PERINGKAT'].tolist() == [1, 2, 3]
+    assert ranked['SKOR_RISIKO'].is_monotonic_decreasing
+    assert ranked.set_index('NAMA_SISWA')['BERISIKO'].to_dict() == {'A': True, 'B': True, 'C': True}
+    assert ranked['SKOR_RISIKO'].between(0, 100).all()
+
+    without_attendance = score_student_risk(features).set_index('NAMA_SISWA')
+    assert 'KEHADIRAN' not in without_attendance.columns
+    assert not without_attendance.loc['A', 'BERISIKO']
+    assert without_attendance.loc['A', 'SKOR_RISIKO'] == 0
+
+
+@pytest.mark.parametrize('kkm', [0, 50, 65, 70, 75.5, 90, 120])
+def test_risk_index_threshold_lookup_matches_scan(kkm):
+    df = _leger_frame()
+    index = RiskIndex(df)
+    features = index.features(kkm)
+
+    rerata = df[df['IS_RERATA']].assign(KEY=lambda d: d['NISN'].fillna('NAMA:' + d['NAMA_SISWA']))
+    below = rerata[rerata['NILAI'] < kkm]
+    expected_count = below.groupby('KEY').size().reindex(features.index, fill_value=0)
+    expected_gap = (kkm - below['NILAI']).groupby(below['KEY']).sum().reindex(features.index, fill_value=0)
+    expected_gap = expected_gap / rerata.groupby('KEY').size().reindex(features.index)
+
+    assert features['MAPEL_TIDAK_TUNTAS'].tolist() == expected_count.tolist()
+    assert features['JARAK_KKM'].to_numpy() == pytest.approx(expected_gap.to_numpy())
+    assert index.count_students_below(kkm) == below['KEY'].nunique()
+
+
+@pytest.mark.parametrize('kkm', [60, 70, 80])
+def test_risk_index_rank_matches_score_student_risk(kkm):
+    index = RiskIndex(_leger_frame())
+    attendance = index.align_attendance(pd.Series({'1': 75.0, '2': 100.0}))
+
+    expected = score_student_risk(index.features(kkm), attendance, min_attendance=80)
+    ranking = index.rank(kkm, attendance, min_attendance=80)
+
+    pd.testing.assert_frame_equal(ranking.to_frame(), expected)
+    assert ranking.at_risk_count == int(expected['BERISIKO'].sum())
+    assert ranking.count_level('Rendah') == int((expected['LEVEL_RISIKO'] == 'Rendah').sum())
+
+    positions = ranking.positions(['Sedang', 'Tinggi'])
+    pd.testing.assert_frame_equal(
+        ranking.take(positions),
+        expected[expected['LEVEL_RISIKO'].isin(['Sedang', 'Tinggi'])]
+    )
@@ -1,6 +1,80 @@
 import pytest
-from utils.data_processor import clean_data
+from io import BytesIO
+
+import pandas as pd
+
+from tests.helpers import make_synthetic_leger
+import utils.leger_cleaner as leger_cleaner
+from utils.data_processor import clean_data, load_and_process_excel, process_excel
+from utils.leger_cleaner import clean_leger_data
+
+
+class FakeUploadedFile(BytesIO):
+    """Tiruan ``UploadedFile`` Streamlit (subclass BytesIO)"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def _leger_bytes(n_students=25):
+    buffer = BytesIO()
+    make_synthetic_leger(n_students, n_mapel=2).to_excel(buffer, header=False, index=False)
+    return buffer.getvalue()
+
 
 def test_clean_data():
     # Implementasi test
     pass
+
+
+def test_clean_leger_data_accepts_buffers():
+    data = _leger_bytes()
+    expected = clean_leger_data(BytesIO(data))
+
+    assert not expected.empty
+    pd.testing.assert_frame_equal(clean_leger_data(data), expected)
+    pd.testing.assert_frame_equal(clean_leger_data(memoryview(data)), expected)
+
+
+def test_load_and_process_excel_without_temp_file(tmp_path, monkeypatch):
+    workdir = tmp_path / 'workdir'
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    file = FakeUploadedFile(_leger_bytes(), 'leger.xlsx')
+    file.read()  # posisi buffer di akhir, seperti setelah preview
+
+    df_clean, stats = load_and_process_excel(file, 'leger')
+
+    assert stats['total_students'] == 25
+    assert list(workdir.iterdir()) == []
+
+
+def test_load_and_process_excel_uses_cache(isolated_leger_cache):
+    data = _leger_bytes()
+
+    df_first, _ = load_and_process_excel(FakeUploadedFile(data, 'a.xlsx'), 'leger')
+    df_second, _ = load_and_process_excel(FakeUploadedFile(data, 'b.xlsx'), 'leger')
+
+    assert isolated_leger_cache.stats()['hits'] == 1
+    assert isolated_leger_cache.stats()['misses'] == 1
+    pd.testing.assert_frame_equal(df_first, df_second)
+
+
+def test_process_excel_streams_batches_to_disk(monkeypatch):
+    data = _leger_bytes(60)
+    written = []
+    write_batches = leger_cleaner._write_parquet_batches
+
+    def tracking_write(batches, data_path, csv_path=None):
+        write_batches((written.append(len(batch)) or batch for batch in batches), data_path, csv_path)
+
+    monkeypatch.setattr(leger_cleaner, '_write_parquet_batches', tracking_write)
+    monkeypatch.setattr(leger_cleaner, 'concat_leger_batches', pytest.fail)
+
+    df_clean, stats = process_excel(FakeUploadedFile(data, 'leger.xlsx'), 'leger', batch_size=25, use_cache=False)
+
+    assert len(written) == 3
+    assert stats['total_students'] == 60
+    pd.testing.assert_frame_equal(df_clean, clean_leger_data(data))
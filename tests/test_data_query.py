@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_query import DataQuery, count_pages, take_page
+
+
+# Ukuran data sintetis untuk fixture ``df_clean`` (lihat conftest)
+LEGER_SIZE = (40, 3)
+
+
+def _naive_search(df, text, columns):
+    mask = df[columns].astype(str).apply(lambda x: x.str.contains(text, case=False, regex=False)).any(axis=1)
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('text', ['siswa 1', 'SISWA 3', '100000001', 'mapel_2', ' Mapel_3 ', 'tidak ada'])
+def test_search_matches_contains(df_clean, text):
+    query = DataQuery(df_clean)
+    expected = _naive_search(df_clean, text.strip(), query.columns)
+
+    np.testing.assert_array_equal(query.search(text), expected)
+
+
+def test_search_with_filters(df_clean):
+    query = DataQuery(df_clean)
+    nama = df_clean['NAMA_SISWA'].str.lower().str.contains('siswa 2', regex=False)
+
+    rerata = query.search('siswa 2', rerata=True)
+    np.testing.assert_array_equal(rerata, np.flatnonzero(nama & df_clean['IS_RERATA']))
+
+    semester = query.search('siswa 2', semester=3)
+    np.testing.assert_array_equal(semester, np.flatnonzero(nama & (df_clean['SEMESTER'] == 3)))
+
+    assert query.semesters == sorted(df_clean['SEMESTER'].unique().tolist())
+    assert len(query.search()) == len(df_clean)
+    assert query.search('siswa 2', semester=3) is semester
+
+
+def test_take_page_only_slices_visible_rows(df_clean):
+    query = DataQuery(df_clean)
+    positions = query.search(rerata=True)
+
+    n_pages = count_pages(positions, 50)
+    assert n_pages == -(-len(positions) // 50)
+
+    page = take_page(df_clean, positions, 2, 50)
+    pd.testing.assert_frame_equal(page, df_clean[df_clean['IS_RERATA']].iloc[50:100])
+    assert len(take_page(df_clean, positions, n_pages, 50)) == len(positions) - 50 * (n_pages - 1)
+    assert count_pages(query.search('tidak ada'), 50) == 1
+
+
+def test_general_data_indexes_text_columns():
+    df = pd.DataFrame({
+        'NAMA': ['Ani', 'Budi', None, 'ANITA'],
+        'KOTA': pd.Categorical(['Bandung', 'Bogor', 'Bandung', None]),
+        'UMUR': [15, 16, 15, 17],
+    })
+    query = DataQuery(df)
+
+    assert query.columns == ['NAMA', 'KOTA']
+    np.testing.assert_array_equal(query.search('ani'), [0, 3])
+    np.testing.assert_array_equal(query.search('band'), [0, 2])
+    assert query.semesters == []
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from tests.helpers import make_synthetic_leger
+from utils.dataset_catalog import (
+    compute_file_hash,
+    find_dataset_by_hash,
+    list_datasets,
+    load_dataset,
+    register_dataset,
+    remove_dataset
+)
+from utils.leger_cleaner import reshape_leger, save_clean_data
+
+
+def test_register_and_load_dataset(tmp_path):
+    df_clean = reshape_leger(make_synthetic_leger(12, n_mapel=2))
+    source_hash = compute_file_hash(b'leger')
+
+    save_results = save_clean_data(df_clean, output_dir=str(tmp_path))
+    entry = register_dataset(save_results, df_clean, 'leger.xlsx', source_hash, output_dir=str(tmp_path))
+
+    assert entry['students'] == 12
+    assert entry['subjects'] == 2
+    assert find_dataset_by_hash(source_hash, output_dir=str(tmp_path)) == entry
+    assert list_datasets(output_dir=str(tmp_path)) == [entry]
+    pd.testing.assert_frame_equal(load_dataset(entry['dataset_id'], output_dir=str(tmp_path)), df_clean)
+
+    remove_dataset(entry['dataset_id'], output_dir=str(tmp_path))
+    assert list_datasets(output_dir=str(tmp_path)) == []
+    assert not list(tmp_path.glob('*.parquet'))
+
+
+def test_list_datasets_picks_up_unregistered_files(tmp_path):
+    df_clean = reshape_leger(make_synthetic_leger(5, n_mapel=1))
+    save_clean_data(df_clean, output_dir=str(tmp_path))
+    save_clean_data(df_clean, output_dir=str(tmp_path))
+
+    datasets = list_datasets(output_dir=str(tmp_path))
+
+    assert len(datasets) == 2
+    assert {entry['rows'] for entry in datasets} == {len(df_clean)}
+
+
+def test_list_datasets_rescans_only_when_directory_changes(tmp_path, monkeypatch):
+    from utils import dataset_catalog
+
+    df_clean = reshape_leger(make_synthetic_leger(5, n_mapel=1))
+    save_clean_data(df_clean, output_dir=str(tmp_path))
+    assert len(list_datasets(output_dir=str(tmp_path))) == 1
+
+    loads = []
+    monkeypatch.setattr(dataset_catalog, 'load_clean_data', lambda path: loads.append(path) or df_clean)
+    catalog_mtime = (tmp_path / 'catalog.json').stat().st_mtime_ns
+    for _ in range(3):
+        assert len(list_datasets(output_dir=str(tmp_path))) == 1
+    assert loads == []
+    assert (tmp_path / 'catalog.json').stat().st_mtime_ns == catalog_mtime
+
+    save_clean_data(df_clean, output_dir=str(tmp_path))
+    assert len(list_datasets(output_dir=str(tmp_path))) == 2
+    assert len(loads) == 1
+
+
+def test_concurrent_saves_get_distinct_files(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    df_clean = reshape_leger(make_synthetic_leger(5, n_mapel=1))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: save_clean_data(df_clean, output_dir=str(tmp_path)), range(8)))
+
+    assert len({result['data_path'] for result in results}) == 8
+    assert len(list_datasets(output_dir=str(tmp_path))) == 8
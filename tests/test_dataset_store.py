@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from utils.dataset_store import DatasetStore
+
+
+def _frame():
+    return pd.DataFrame({'NILAI': [80.0, 90.0], 'MAPEL_ID': pd.Categorical(['a', 'b'])})
+
+
+def test_dataset_store_shares_single_instance():
+    store = DatasetStore()
+    first = store.put('ds', _frame())
+    second = store.put('ds', _frame())
+
+    store.acquire('ds', 'sesi-1')
+    store.acquire('ds', 'sesi-2')
+
+    assert first is second
+    assert store.stats()['datasets'] == 1
+    assert store.stats()['sessions'] == 2
+
+
+def test_dataset_store_frames_are_read_only():
+    df = DatasetStore().put('ds', _frame())
+
+    with pytest.raises(ValueError):
+        df.loc[0, 'NILAI'] = 0
+
+
+def test_dataset_store_evicts_without_holders():
+    store = DatasetStore()
+    store.put('ds', _frame())
+    store.acquire('ds', 'sesi-1')
+    store.acquire('ds', 'sesi-2')
+
+    store.release('ds', 'sesi-1')
+    assert store.get('ds') is not None
+
+    store.prune(lambda session_id: session_id != 'sesi-2')
+    assert store.get('ds') is None
+
+
+def test_dataset_store_replaces_frame_with_different_schema():
+    store = DatasetStore()
+    first = store.put('ds', _frame())
+    store.get_derived('ds', 'jumlah', len)
+
+    general = pd.DataFrame({'NAMA': ['Ani', 'Budi'], 'UMUR': [15, 16]})
+    second = store.put('ds', general)
+
+    assert second is not first
+    assert list(second.columns) == ['NAMA', 'UMUR']
+    assert store.peek_derived('ds', 'jumlah') is None
+    assert store.put('ds', general.copy()) is second
+
+
+def test_dataset_store_reloads_stale_frame_lazily():
+    store = DatasetStore()
+    store.put('ds', _frame())
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return _frame().assign(NILAI=[70.0, 75.0])
+
+    store.mark_stale('ds', loader, {'cube': 'diperbarui'})
+
+    assert store.get_derived('ds', 'cube', len) == 'diperbarui'
+    assert loads == []
+    assert store.get('ds')['NILAI'].tolist() == [70.0, 75.0]
+    assert store.get('ds')['NILAI'].tolist() == [70.0, 75.0]
+    assert loads == [1]
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from tests.helpers import make_synthetic_leger
+from utils.job_queue import (
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_KIND_CLEAN,
+    JOB_RUNNING,
+    JobQueue,
+    job_handler
+)
+from utils.leger_cleaner import CLEANER_VERSION, load_clean_data, reshape_leger
+
+
+@job_handler('test_sum')
+def _sum_job(job, params):
+    for i, value in enumerate(params['values'], start=1):
+        job.progress(i / len(params['values']), f"{i} nilai")
+    if params.get('fail'):
+        raise RuntimeError("gagal sengaja")
+    return {'total': sum(params['values'])}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(db_path=tmp_path / 'jobs.sqlite3', job_root=tmp_path / 'jobs', max_workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_runs_and_result_is_persisted(queue, tmp_path):
+    job_id = queue.submit('test_sum', params={'values': [1, 2, 3]})
+    job = queue.wait(job_id, timeout=10)
+
+    assert job['status'] == JOB_DONE
+    assert job['progress'] == 1.0
+    assert job['result'] == {'total': 6}
+    assert job['started_at'] and job['finished_at']
+
+    # Antrean baru (mis. sesi/proses lain) membaca hasil yang sama dari disk
+    reopened = JobQueue(db_path=tmp_path / 'jobs.sqlite3', job_root=tmp_path / 'jobs', max_workers=1)
+    assert reopened.get(job_id)['result'] == {'total': 6}
+    assert [j['job_id'] for j in reopened.list(kinds=['test_sum'])] == [job_id]
+    reopened.shutdown()
+
+
+def test_failed_job_records_error(queue):
+    job = queue.wait(queue.submit('test_sum', params={'values': [1], 'fail': True}), timeout=10)
+
+    assert job['status'] == JOB_FAILED
+    assert job['error'] == "gagal sengaja"
+    assert job['result'] is None
+
+    with pytest.raises(ValueError):
+        queue.submit('tidak_ada')
+
+
+def test_jobs_of_stopped_process_are_marked_failed(queue, tmp_path):
+    with queue._connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, kind, status, pid, created_at) VALUES (?, ?, ?, ?, ?)",
+            ('lama', 'test_sum', JOB_RUNNING, os.getpid() + 1, '2020-01-01T00:00:00')
+        )
+
+    JobQueue(db_path=tmp_path / 'jobs.sqlite3', job_root=tmp_path / 'jobs', max_workers=1).shutdown()
+
+    job = queue.get('lama')
+    assert job['status'] == JOB_FAILED
+    assert 'dimulai ulang' in job['error']
+
+
+def test_jobs_are_filtered_by_owner(queue):
+    mine = queue.submit('test_sum', params={'values': [1]}, owner='sesi_a')
+    other = queue.submit('test_sum', params={'values': [2]}, owner='sesi_b')
+    queue.wait(mine, timeout=10)
+    queue.wait(other, timeout=10)
+
+    assert [job['job_id'] for job in queue.list(kinds=['test_sum'], owner='sesi_a')] == [mine]
+    assert queue.get(mine, owner='sesi_a')['result'] == {'total': 1}
+    assert queue.get(other, owner='sesi_a') is None
+    assert {job['job_id'] for job in queue.list()} == {mine, other}
+
+
+def test_job_table_without_owner_is_migrated(tmp_path):
+    db_path = tmp_path / 'lama.sqlite3'
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                     "progress REAL NOT NULL DEFAULT 0, message TEXT, params TEXT, result TEXT, error TEXT, "
+                     "pid INTEGER, created_at TEXT NOT NULL, started_at TEXT, finished_at TEXT)")
+    conn.close()
+
+    queue = JobQueue(db_path=db_path, job_root=tmp_path / 'jobs', max_workers=1)
+    try:
+        job_id = queue.submit('test_sum', params={'values': [4]}, owner='sesi_a')
+        assert queue.wait(job_id, timeout=10)['owner'] == 'sesi_a'
+    finally:
+        queue.shutdown()
+
+
+def test_clean_upload_job(queue):
+    sheets = {'X-1': make_synthetic_leger(15, n_mapel=2, seed=1),
+              'X-2': make_synthetic_leger(10, n_mapel=2, seed=2)}
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for name, df_raw in sheets.items():
+            df_raw.to_excel(writer, sheet_name=name, header=False, index=False)
+
+    job_id = queue.submit(JOB_KIND_CLEAN, params={
+        'file_type': "Data Leger", 'multi_file': True, 'upload_name': 'kelas_x.xlsx',
+        'source_hash': 'a' * 64, 'auto_save': False,
+    }, files={'kelas_x.xlsx': buffer.getvalue()})
+    job = queue.wait(job_id, timeout=60)
+
+    assert job['status'] == JOB_DONE, job['error']
+    result = job['result']
+    assert result['errors'] == [] and result['catalogued'] is False
+    assert result['dataset_id'] == f"upload_multi_v{CLEANER_VERSION.replace('.', '')}_{'a' * 16}"
+    assert result['rows'] == sum(len(reshape_leger(df_raw)) for df_raw in sheets.values())
+
+    df_clean = load_clean_data(result['data_path'])
+    assert len(df_clean) == result['rows']
+    assert set(df_clean['KELAS']) == {'kelas_x'}
+    assert not (queue.job_dir(job_id) / 'input').exists()
+
+    # File download dibangun sekali oleh job
+    downloads = result['downloads']
+    assert pd.read_csv(downloads['csv'])['NILAI'].tolist() == pytest.approx(df_clean['NILAI'].tolist())
+    assert len(pd.read_excel(downloads['xlsx'], sheet_name='Data_Lengkap')) == result['rows']
+
+
+def test_clean_upload_job_reports_real_error(queue):
+    job_id = queue.submit(JOB_KIND_CLEAN, params={
+        'file_type': "Data Nilai", 'multi_file': False, 'upload_name': 'nilai.xlsx',
+        'source_hash': 'b' * 64, 'auto_save': False,
+    }, files={'nilai.xlsx': b'bukan file excel'})
+    job = queue.wait(job_id, timeout=30)
+
+    # Pesan error asli pembaca file, bukan "Data kosong" dari DataFrame kosong
+    assert job['status'] == JOB_FAILED
+    assert job['error'] and 'Data kosong' not in job['error']
@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pandas as pd
+
+from tests.helpers import make_synthetic_leger
+from utils.leger_batch import clean_leger_batch
+from utils.leger_cleaner import reshape_leger
+
+
+def _write_workbook(path, sheets):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, df_raw in sheets.items():
+            df_raw.to_excel(writer, sheet_name=name, header=False, index=False)
+
+
+def test_clean_leger_batch_all_sheets_and_files(tmp_path):
+    sheets_a = {'X-1': make_synthetic_leger(20, n_mapel=2, seed=1),
+                'X-2': make_synthetic_leger(15, n_mapel=2, seed=2)}
+    sheets_b = {'XI-1': make_synthetic_leger(10, n_mapel=2, seed=3)}
+    _write_workbook(tmp_path / 'kelas_x.xlsx', sheets_a)
+    _write_workbook(tmp_path / 'kelas_xi.xlsx', sheets_b)
+
+    progress = []
+    df_clean, errors = clean_leger_batch(
+        [tmp_path / 'kelas_x.xlsx', tmp_path / 'kelas_xi.xlsx'],
+        max_workers=2,
+        progress_callback=lambda done, total, kelas, sheet: progress.append((done, total))
+    )
+
+    assert errors == []
+    assert progress[-1] == (3, 3)
+    assert list(df_clean['SHEET'].unique()) == ['X-1', 'X-2', 'XI-1']
+    assert set(df_clean['KELAS']) == {'kelas_x', 'kelas_xi'}
+
+    expected = reshape_leger(sheets_a['X-2'])
+    result = df_clean[df_clean['SHEET'] == 'X-2']
+    assert len(result) == len(expected)
+    assert result['NILAI'].sum() == expected['NILAI'].sum()
+
+
+def test_clean_leger_batch_passes_paths_to_workers(tmp_path, monkeypatch):
+    from utils import leger_batch
+
+    _write_workbook(tmp_path / 'kelas_x.xlsx', {'X-1': make_synthetic_leger(8, n_mapel=2, seed=4),
+                                                'X-2': make_synthetic_leger(6, n_mapel=2, seed=5)})
+    upload = ('kelas_x.xlsx', (tmp_path / 'kelas_x.xlsx').read_bytes())
+
+    sources = []
+    clean_sheet = leger_batch._clean_sheet_job
+    monkeypatch.setattr(leger_batch, '_clean_sheet_job',
+                        lambda path, sheet: sources.append(path) or clean_sheet(path, sheet))
+
+    df_clean, errors = clean_leger_batch([upload], max_workers=1)
+
+    assert errors == [] and len(sources) == 2
+    assert all(isinstance(source, str) and source.endswith('kelas_x.xlsx') for source in sources)
+    assert set(df_clean['KELAS']) == {'kelas_x'}
+    assert not Path(sources[0]).exists()
@@ -0,0 +1,28 @@
+import os
+
+import pandas as pd
+
+from utils.leger_cache import LegerCache
+
+
+def test_leger_cache_lru_eviction(tmp_path):
+    df = pd.DataFrame({'NILAI': range(1000)})
+    cache = LegerCache(cache_dir=tmp_path)
+
+    cache.put('a', df)
+    assert cache.stats()['entries'] == 1
+
+    # Entri "a" lebih lama diakses dibanding "b", sehingga dievict duluan
+    os.utime(tmp_path / 'a.parquet', (0, 0))
+    cache.max_bytes = (tmp_path / 'a.parquet').stat().st_size * 1.5
+    cache.put('b', df)
+
+    assert cache.get('a') is None
+    pd.testing.assert_frame_equal(cache.get('b'), df)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_leger_cache_key_depends_on_sheet():
+    cache = LegerCache()
+    assert cache.make_key(b'data') != cache.make_key(b'data', 'Sheet2')
+    assert cache.make_key(b'data') == cache.make_key(memoryview(b'data'))
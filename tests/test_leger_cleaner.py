@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+
+from tests.benchmark_leger_cleaner import reshape_leger_loop
+from tests.helpers import make_synthetic_leger
+from utils.leger_cleaner import (
+    TIDY_COLUMNS,
+    clean_leger_data,
+    clean_leger_streaming,
+    concat_leger_batches,
+    export_clean_excel,
+    iter_leger_batches,
+    load_clean_data,
+    reshape_leger,
+    save_clean_data
+)
+
+
+def test_reshape_leger_matches_loop():
+    df_raw = make_synthetic_leger(50, n_mapel=12)
+    # Baris tidak valid: NO kosong dan NISN bukan angka
+    df_raw.iloc[5, 0] = None
+    df_raw.iloc[7, 2] = 'abc'
+
+    expected = reshape_leger_loop(df_raw)
+    result = reshape_leger(df_raw)
+
+    assert list(result.columns) == TIDY_COLUMNS
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_reshape_leger_comma_and_range():
+    df_raw = pd.DataFrame([
+        [None, None, None, None, 'Smt1', 'Smt2', 'Smt3', 'Smt4', 'Smt5', 'Smt6', 'Rerata'],
+        [1, ' Ani ', 123, 45, '85,5', 101, -1, None, 'x', 70, 80],
+    ])
+
+    result = reshape_leger(df_raw)
+
+    assert result['NILAI'].tolist() == pytest.approx([85.5, 70, 80])
+    assert result['KOMPONEN'].tolist() == ['Smt1', 'Smt6', 'Rerata']
+    assert result['SEMESTER'].tolist() == [1, 6, 0]
+    assert result['NAMA_SISWA'].iloc[0] == 'Ani'
+    assert result['NISN'].iloc[0] == '123'
+
+
+def test_reshape_leger_empty():
+    assert reshape_leger(pd.DataFrame([[None, None, None, None, None]])).empty
+
+
+def test_iter_leger_batches_matches_clean_leger_data(tmp_path):
+    path = tmp_path / 'leger.xlsx'
+    make_synthetic_leger(120, n_mapel=3).to_excel(path, header=False, index=False)
+
+    batches = list(iter_leger_batches(str(path), batch_size=50))
+    result = concat_leger_batches(batches)
+
+    assert len(batches) == 3
+    pd.testing.assert_frame_equal(result, clean_leger_data(str(path)))
+
+
+def test_clean_leger_streaming_matches_clean_leger_data(tmp_path):
+    path = tmp_path / 'leger.xlsx'
+    make_synthetic_leger(120, n_mapel=3).to_excel(path, header=False, index=False)
+
+    result = clean_leger_streaming(str(path), batch_size=50)
+
+    pd.testing.assert_frame_equal(result, clean_leger_data(str(path)))
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_save_clean_data_from_batches(tmp_path):
+    df_clean = reshape_leger(make_synthetic_leger(30, n_mapel=2))
+    batches = [df_clean.iloc[:100], df_clean.iloc[100:]]
+
+    paths = save_clean_data(iter(batches), output_dir=str(tmp_path), write_csv=True)
+
+    assert paths['format'] == 'parquet'
+    assert len(pd.read_csv(paths['csv_path'])) == len(df_clean)
+    pd.testing.assert_frame_equal(load_clean_data(paths['data_path']), df_clean)
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_save_and_load_clean_data_keeps_dtypes(tmp_path, fmt):
+    df_clean = reshape_leger(make_synthetic_leger(20, n_mapel=2))
+
+    paths = save_clean_data(df_clean, output_dir=str(tmp_path), fmt=fmt)
+
+    assert paths['csv_path'] is None
+    pd.testing.assert_frame_equal(load_clean_data(paths['data_path']), df_clean)
+
+
+def test_export_clean_excel_on_demand(tmp_path):
+    df_clean = reshape_leger(make_synthetic_leger(30, n_mapel=2))
+    paths = save_clean_data(df_clean, output_dir=str(tmp_path))
+    assert not list(tmp_path.glob('*.xlsx'))
+
+    excel_path = export_clean_excel(paths['data_path'])
+
+    saved = pd.read_excel(excel_path, sheet_name=None)
+    assert len(saved['Data_Lengkap']) == len(df_clean)
+    assert len(saved['Summary_Siswa']) == 30
+    assert export_clean_excel(paths['data_path']) == excel_path
+
+
+@pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+def test_save_clean_data_removes_placeholder_on_failure(tmp_path, fmt):
+    df_clean = reshape_leger(make_synthetic_leger(10, n_mapel=2))
+
+    def failing_batches():
+        yield df_clean.iloc[:20]
+        raise ValueError("sheet rusak")
+
+    with pytest.raises(ValueError, match="sheet rusak"):
+        save_clean_data(failing_batches(), output_dir=str(tmp_path), fmt=fmt, write_csv=True)
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,171 @@
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.helpers import make_synthetic_leger
+from utils.aggregate_cube import build_aggregate_cube
+from utils.dataset_catalog import (
+    get_dataset_entry,
+    list_datasets,
+    load_dataset,
+    register_dataset,
+    supports_incremental_update
+)
+from utils.dataset_store import get_dataset_store
+from utils.leger_cleaner import KOLOM_PER_MAPEL, merge_leger_delta, reshape_leger, save_clean_data
+from utils.leger_incremental import compact_dataset, ingest_leger_incremental
+
+N_MAPEL = 3
+
+
+def _xlsx(df_raw):
+    buffer = BytesIO()
+    df_raw.to_excel(buffer, header=False, index=False)
+    return buffer.getvalue()
+
+
+def _semester_cols(semester):
+    return [4 + m * KOLOM_PER_MAPEL + semester - 1 for m in range(N_MAPEL)]
+
+
+def _sorted(df):
+    df = df.astype({'MAPEL_ID': str, 'KOMPONEN': str})
+    return df.sort_values(['NO', 'MAPEL_ID', 'SEMESTER'], ignore_index=True)
+
+
+def _register(df_raw, output_dir):
+    df_clean = reshape_leger(df_raw)
+    save_results = save_clean_data(df_clean, output_dir=output_dir)
+    return register_dataset(save_results, df_clean, 'leger.xlsx', output_dir=output_dir)['dataset_id']
+
+
+def test_incremental_ingest_matches_full_clean(tmp_path):
+    output_dir = str(tmp_path)
+    df_old = make_synthetic_leger(30, n_mapel=N_MAPEL)
+    df_old.iloc[2:, _semester_cols(6)] = np.nan
+    dataset_id = _register(df_old, output_dir)
+
+    # Hash disimpan saat dataset dicatat: leger yang sama tidak menghasilkan delta
+    first = ingest_leger_incremental(_xlsx(df_old), dataset_id, output_dir=output_dir)
+    assert first['changed_groups'] == 0 and first['part_path'] is None
+
+    # Semester 6 terisi, satu nilai Smt2 dikoreksi, satu siswa baru
+    df_new = make_synthetic_leger(31, n_mapel=N_MAPEL)
+    df_new.iloc[2:32, :] = df_old.iloc[2:32, :].to_numpy()
+    df_new.iloc[2:, _semester_cols(6)] = 88.0
+    df_new.iloc[5, _semester_cols(2)[0]] = 77.0
+
+    result = ingest_leger_incremental(_xlsx(df_new), dataset_id, output_dir=output_dir)
+
+    assert result['new_students'] == 1
+    assert result['changed_groups'] == 30 + 1 + KOLOM_PER_MAPEL
+    pd.testing.assert_frame_equal(
+        _sorted(load_dataset(dataset_id, output_dir=output_dir)),
+        _sorted(reshape_leger(df_new))
+    )
+
+    entry = get_dataset_entry(dataset_id, output_dir=output_dir)
+    assert entry['rows'] == len(reshape_leger(df_new))
+    assert entry['students'] == 31
+    assert [e['dataset_id'] for e in list_datasets(output_dir=output_dir)] == [dataset_id]
+
+    compact_dataset(dataset_id, output_dir=output_dir)
+    assert not list(tmp_path.glob('*.part-*.parquet'))
+    pd.testing.assert_frame_equal(
+        _sorted(load_dataset(dataset_id, output_dir=output_dir)),
+        _sorted(reshape_leger(df_new))
+    )
+
+
+def test_incremental_ingest_of_dataset_without_hashes(tmp_path):
+    output_dir = str(tmp_path)
+    df_old = make_synthetic_leger(12, n_mapel=N_MAPEL)
+    save_clean_data(reshape_leger(df_old), output_dir=output_dir)
+    dataset_id = list_datasets(output_dir=output_dir)[0]['dataset_id']
+
+    # Hash dihitung dari data tersimpan: hanya kelompok yang diedit yang berubah
+    df_new = df_old.copy()
+    df_new.iloc[4, _semester_cols(1)[1]] = 66.0
+    result = ingest_leger_incremental(_xlsx(df_new), dataset_id, output_dir=output_dir)
+
+    assert result['changed_groups'] == 1
+    assert result['rows_added'] == result['rows_removed'] == N_MAPEL
+    pd.testing.assert_frame_equal(
+        _sorted(load_dataset(dataset_id, output_dir=output_dir)),
+        _sorted(reshape_leger(df_new))
+    )
+
+
+def test_incremental_ingest_removes_emptied_groups(tmp_path):
+    output_dir = str(tmp_path)
+    df_old = make_synthetic_leger(10, n_mapel=N_MAPEL)
+    dataset_id = _register(df_old, output_dir)
+
+    df_new = df_old.copy()
+    df_new.iloc[2:, _semester_cols(3)] = np.nan
+    result = ingest_leger_incremental(_xlsx(df_new), dataset_id, output_dir=output_dir)
+
+    assert result['changed_groups'] == 10
+
+    df_loaded = load_dataset(dataset_id, output_dir=output_dir)
+    assert not (df_loaded['SEMESTER'] == 3).any()
+    assert df_loaded['NILAI'].notna().all()
+
+
+def test_incremental_ingest_updates_loaded_cube(tmp_path):
+    output_dir = str(tmp_path)
+    df_old = make_synthetic_leger(20, n_mapel=N_MAPEL)
+    dataset_id = _register(df_old, output_dir)
+
+    store = get_dataset_store()
+    store.put(dataset_id, load_dataset(dataset_id, output_dir=output_dir))
+    store.get_derived(dataset_id, 'aggregate_cube', build_aggregate_cube)
+
+    df_new = df_old.copy()
+    df_new.iloc[2:, _semester_cols(6)] = 95.0
+    df_newer = df_new.copy()
+    df_newer.iloc[3, _semester_cols(2)] = 61.0
+    try:
+        # Dua update berturut-turut: cube diperbarui dari delta, frame dimuat ulang saat diminta
+        ingest_leger_incremental(_xlsx(df_new), dataset_id, output_dir=output_dir)
+        ingest_leger_incremental(_xlsx(df_newer), dataset_id, output_dir=output_dir)
+
+        cube = store.peek_derived(dataset_id, 'aggregate_cube')
+        pd.testing.assert_frame_equal(_sorted(store.get(dataset_id)), _sorted(reshape_leger(df_newer)))
+        expected = build_aggregate_cube(store.get(dataset_id))
+        np.testing.assert_array_equal(cube.histogram, expected.histogram)
+        assert cube.overview() == expected.overview()
+    finally:
+        store.acquire(dataset_id, 'test')
+        store.release(dataset_id, 'test')
+
+
+def test_incremental_ingest_rejects_multi_file_dataset(tmp_path):
+    output_dir = str(tmp_path)
+    df_raw = make_synthetic_leger(10, n_mapel=N_MAPEL)
+    df_clean = reshape_leger(df_raw).assign(KELAS='X-1', SHEET='Sheet1').astype({'KELAS': 'category'})
+    save_results = save_clean_data(df_clean, output_dir=output_dir)
+    entry = register_dataset(save_results, df_clean, 'kelas_x.xlsx', output_dir=output_dir)
+
+    # Entri baru maupun entri katalog lama (tanpa penanda) dikenali dari kolom KELAS
+    assert not supports_incremental_update(entry)
+    assert not supports_incremental_update({k: v for k, v in entry.items() if k != 'multi_class'})
+
+    with pytest.raises(ValueError, match='leger tunggal'):
+        ingest_leger_incremental(_xlsx(df_raw), entry['dataset_id'], output_dir=output_dir)
+    assert get_dataset_entry(entry['dataset_id'], output_dir=output_dir).get('parts', []) == []
+
+
+def test_merge_delta_keeps_extra_columns():
+    df_clean = reshape_leger(make_synthetic_leger(5, n_mapel=N_MAPEL)).assign(KELAS='X-1')
+    df_clean['KELAS'] = df_clean['KELAS'].astype('category')
+    df_delta = df_clean[df_clean['SEMESTER'] == 1].drop(columns='KELAS').assign(NILAI=90.0)
+
+    merged = merge_leger_delta(df_clean, df_delta)
+
+    assert list(merged.columns) == list(df_clean.columns)
+    assert isinstance(merged['KELAS'].dtype, pd.CategoricalDtype)
+    assert merged.loc[merged['SEMESTER'] != 1, 'KELAS'].eq('X-1').all()
+    assert (merged.loc[merged['SEMESTER'] == 1, 'NILAI'] == 90.0).all()
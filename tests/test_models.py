@@ -1,6 +1,206 @@
+import os
+
+import numpy as np
+import pandas as pd
 import pytest
-from models.prediction_model import GraduationPredictor
+from models.clustering_model import StudentClustering
+from models.prediction_model import GraduationPredictor, make_proxy_labels, model_file, proxy_feature_columns
+from utils.feature_store import build_student_features, materialize_features
 
 def test_graduation_predictor():
     # Implementasi test
     pass
+
+
+def _leger(n_students=60, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_students):
+        level = rng.uniform(50, 95)
+        for mapel in ['MTK', 'IPA']:
+            nilai = [level + rng.normal(0, 3) for _ in range(2)]
+            rows += [(str(i), f"S{i}", mapel, semester + 1, v, False) for semester, v in enumerate(nilai)]
+            rows.append((str(i), f"S{i}", mapel, 0, np.mean(nilai), True))
+    return pd.DataFrame(rows, columns=['NISN', 'NAMA_SISWA', 'MAPEL_ID', 'SEMESTER', 'NILAI', 'IS_RERATA'])
+
+
+def test_student_features_per_student():
+    df = pd.DataFrame({
+        'NISN': ['1'] * 5 + [None] * 2,
+        'NAMA_SISWA': ['A'] * 5 + ['B'] * 2,
+        'MAPEL_ID': ['MTK', 'MTK', 'MTK', 'IPA', 'IPA', 'MTK', 'MTK'],
+        'SEMESTER': [1, 2, 0, 1, 0, 1, 0],
+        'NILAI': [70.0, 80.0, 75.0, 90.0, 90.0, 60.0, 60.0],
+        'IS_RERATA': [False, False, True, False, True, False, True],
+    })
+    features = build_student_features(df)
+
+    assert list(features.index) == ['1', 'NAMA:B']
+    assert features.loc['1', 'RERATA_MTK'] == 75.0
+    assert features.loc['1', 'RATA_RATA'] == 82.5
+    assert np.isnan(features.loc['NAMA:B', 'RERATA_IPA'])
+    # Rata-rata semester siswa A: 80 lalu 80 -> tren 0; B hanya satu semester
+    assert features.loc['1', 'TREN'] == 0.0
+    assert np.isnan(features.loc['NAMA:B', 'TREN'])
+    assert features.loc['1', 'VARIANS'] == pytest.approx(np.var([70, 80, 90], ddof=1))
+    assert features.loc['1', 'SMT_1'] == 80.0
+    # 2 mapel x (2 semester + rerata) = 6 sel; A punya 5, B punya 2
+    assert features['JUMLAH_KOSONG'].tolist() == [1, 4]
+
+
+def test_batch_prediction_matches_chunked():
+    features = build_student_features(_leger())
+    labels = make_proxy_labels(features, kkm=70)
+    predictor = GraduationPredictor().train(features, labels)
+
+    proba = predictor.predict_proba(features)
+    chunked = predictor.predict_proba(features, chunk_size=7)
+    assert proba.shape == (len(features), 2)
+    np.testing.assert_allclose(proba, chunked)
+    assert (predictor.predict(features, chunk_size=7) == predictor.predict(features)).all()
+
+    cohort = predictor.predict_cohort(features[features.columns[::-1]])
+    np.testing.assert_allclose(cohort['PROBA_LULUS'], proba[:, 1])
+    assert (cohort['PREDIKSI'] == 'LULUS').sum() == (proba[:, 1] >= 0.5).sum()
+    assert predictor.evaluate(features, labels) > 0.8
+
+
+def test_proxy_labels_train_without_rerata_features():
+    features = build_student_features(_leger())
+    labels = make_proxy_labels(features, kkm=70)
+    columns = proxy_feature_columns(features)
+
+    assert columns and not any(c.startswith('RERATA_') or c == 'RATA_RATA' for c in columns)
+    assert 'SMT_1' in columns and 'TREN' in columns
+
+    predictor = GraduationPredictor()
+    predictor.evaluate(features, labels, columns=columns)
+    assert predictor.feature_names == columns
+    assert predictor.predict_proba(features).shape == (len(features), 2)
+
+
+def test_model_file_per_dataset_and_label_source(tmp_path, monkeypatch):
+    from models import prediction_model
+
+    monkeypatch.setattr(prediction_model, 'MODEL_PATH', str(tmp_path))
+    monkeypatch.setattr(prediction_model, '_model_cache', prediction_model.ModelCache())
+    paths = {model_file(d, s) for d in ['leger_a', 'leger/b'] for s in ['proksi', 'historis']}
+    assert len(paths) == 4
+    assert all(os.path.dirname(p) == str(tmp_path) for p in paths)
+    with pytest.raises(ValueError):
+        model_file('leger_a', 'lainnya')
+
+    # Model dataset lain tidak mengganti model yang sudah tersimpan
+    features = build_student_features(_leger())
+    labels = make_proxy_labels(features, kkm=70)
+    first = GraduationPredictor().train(features, labels)
+    first.save_model(model_file('leger_a'), dataset_id='leger_a')
+    GraduationPredictor().train(features, 1 - labels).save_model(model_file('leger_b'), dataset_id='leger_b')
+
+    loaded = GraduationPredictor().load_model(model_file('leger_a'))
+    assert loaded.metadata['dataset_id'] == 'leger_a'
+    np.testing.assert_allclose(loaded.predict_proba(features), first.predict_proba(features))
+    with pytest.raises(FileNotFoundError):
+        GraduationPredictor().load_model(model_file('leger_a', 'historis'))
+
+
+def test_feature_store_roundtrip_memmap(tmp_path):
+    df = _leger()
+    df_path = tmp_path / 'leger_clean_x.parquet'
+    df.to_parquet(df_path, index=False)
+    from utils.dataset_catalog import register_dataset, remove_dataset
+    register_dataset({'data_path': str(df_path), 'format': 'parquet', 'timestamp': '20240101_000000'},
+                     df, 'x.xlsx', output_dir=tmp_path)
+
+    features = materialize_features('x', df, output_dir=tmp_path)
+    assert isinstance(features.values, np.memmap)
+    assert features.values.dtype == np.float32
+    expected = build_student_features(df)
+    assert list(features.index) == list(expected.index)
+    np.testing.assert_allclose(features.to_frame().to_numpy(), expected.to_numpy(), rtol=1e-6)
+
+    # Pemuatan berikutnya tidak membangun ulang dari data
+    again = materialize_features('x', df_clean=df.iloc[:0], output_dir=tmp_path)
+    assert again.version == features.version and len(again) == len(features)
+
+    labels = make_proxy_labels(features, kkm=70)
+    predictor = GraduationPredictor().train(features, labels)
+    np.testing.assert_allclose(
+        predictor.predict_proba(features, chunk_size=7),
+        predictor.predict_proba(features.to_frame()),
+        rtol=1e-5
+    )
+    assert len(StudentClustering(n_clusters=2).fit_predict(features)) == len(features)
+
+    remove_dataset('x', output_dir=tmp_path)
+    assert not list(tmp_path.glob('*.features*'))
+
+
+def test_model_artifact_roundtrip_and_warm_cache(tmp_path, monkeypatch):
+    from models import prediction_model
+    from utils.feature_store import FEATURE_SCHEMA_VERSION
+
+    monkeypatch.setattr(prediction_model, '_model_cache', prediction_model.ModelCache())
+    features = build_student_features(_leger())
+    labels = make_proxy_labels(features, kkm=70)
+    predictor = GraduationPredictor()
+    predictor.evaluate(features, labels)
+
+    model_file = tmp_path / 'graduation_model.pkl'
+    manifest = predictor.save_model(model_file, dataset_id='x')
+    assert manifest['feature_names'] == list(features.columns)
+    assert manifest['feature_schema_version'] == FEATURE_SCHEMA_VERSION
+    assert manifest['metadata']['dataset_id'] == 'x'
+    assert 'accuracy' in manifest['metadata']
+    assert (tmp_path / manifest['artifact']).exists()
+
+    # Pemuatan pertama dari disk (proses baru: cache kosong), berikutnya dari cache
+    monkeypatch.setattr(prediction_model, '_model_cache', prediction_model.ModelCache())
+    loaded = GraduationPredictor().load_model(model_file, features=features)
+    np.testing.assert_allclose(loaded.predict_proba(features), predictor.predict_proba(features))
+    (tmp_path / manifest['artifact']).unlink()
+    again = GraduationPredictor().load_model(model_file)
+    assert again.model is loaded.model and again.artifact_version == manifest['artifact_version']
+
+    # Melatih ulang model dari cache tidak mengubah estimator bersama
+    again.train(features, labels)
+    assert again.model is not loaded.model
+
+    with pytest.raises(ValueError, match='RERATA_IPA'):
+        loaded.check_schema(features.drop(columns=['RERATA_IPA']))
+
+
+def test_model_artifact_rejects_tampered_file(tmp_path, monkeypatch):
+    from models import prediction_model
+
+    monkeypatch.setattr(prediction_model, '_model_cache', prediction_model.ModelCache())
+    features = build_student_features(_leger())
+    predictor = GraduationPredictor().train(features, make_proxy_labels(features, kkm=70))
+    manifest = predictor.save_model(tmp_path / 'model.pkl')
+    artifact = tmp_path / manifest['artifact']
+    artifact.write_bytes(artifact.read_bytes() + b'x')
+
+    prediction_model.get_model_cache().invalidate()
+    with pytest.raises(ValueError, match='Checksum'):
+        GraduationPredictor().load_model(tmp_path / 'model.pkl')
+    with pytest.raises(FileNotFoundError):
+        GraduationPredictor().load_model(tmp_path / 'missing.pkl')
+
+
+def test_clustering_auto_k_is_reproducible():
+    rng = np.random.default_rng(3)
+    centers = np.array([[90.0, 88.0], [70.0, 72.0], [50.0, 55.0]])
+    X = pd.DataFrame(centers[rng.integers(0, 3, 600)] + rng.normal(0, 2, (600, 2)),
+                     columns=['RERATA_MTK', 'RERATA_IPA'])
+    X.iloc[0, 0] = np.nan
+
+    clustering = StudentClustering(n_clusters=None)
+    labels = clustering.fit_predict(X)
+
+    assert max(clustering.silhouette_scores_, key=clustering.silhouette_scores_.get) == 3
+    assert (labels == StudentClustering(n_clusters=None).fit_predict(X)).all()
+    profiles = clustering.profiles_
+    assert list(profiles.columns) == ['MTK', 'IPA', 'JUMLAH_SISWA', 'RATA_RATA']
+    assert profiles['RATA_RATA'].is_monotonic_decreasing
+    assert profiles['JUMLAH_SISWA'].sum() == 600
+    assert (clustering.predict(X.fillna(70)) == labels)[1:].all()
@@ -0,0 +1,76 @@
+import re
+import zipfile
+import zlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.pdf_writer import build_pdf, table_pages
+from utils.report_cards import BUNDLE_PDF, BUNDLE_ZIP, student_report_data, write_report_cards
+
+
+def pdf_objects(pdf):
+    """Periksa tabel xref dan kembalikan isi content stream (sudah didekompresi)"""
+    assert pdf.startswith(b'%PDF-1.4') and pdf.rstrip().endswith(b'%%EOF')
+    start = int(pdf.rsplit(b'startxref\n', 1)[1].split(b'\n')[0])
+    xref = pdf[start:].split(b'\n')
+    count = int(xref[1].split()[1])
+    for number, line in enumerate(xref[3:2 + count], start=1):
+        assert pdf[int(line[:10]):].startswith(f"{number} 0 obj".encode())
+    return [zlib.decompress(m) for m in re.findall(rb'stream\n(.*?)\nendstream', pdf, re.S)]
+
+
+# Ukuran data sintetis untuk fixture ``df_clean`` (lihat conftest)
+LEGER_SIZE = (12, 4)
+
+
+def test_student_report_data_matches_leger(df_clean):
+    students, recap = student_report_data(df_clean, kkm=75)
+    rerata = df_clean[df_clean['IS_RERATA']]
+
+    assert len(students) == len(recap) == df_clean['NISN'].nunique()
+    expected = rerata.groupby('NISN')['NILAI'].mean()
+    by_nisn = {s['nisn']: s for s in students}
+    for nisn, mean in expected.items():
+        assert by_nisn[nisn]['rata_rata'] == pytest.approx(mean, rel=1e-5)
+        assert by_nisn[nisn]['tidak_tuntas'] == int((rerata.loc[rerata['NISN'] == nisn, 'NILAI'] < 75).sum())
+    assert recap['PERINGKAT'].iloc[0] == 1
+    assert recap['RATA_RATA'].is_monotonic_decreasing
+
+
+def test_table_pages_paginate_and_escape():
+    frame = pd.DataFrame({'NAMA': ['Ani (A)'] * 120, 'NILAI': np.arange(120, dtype='float32')})
+    streams = pdf_objects(build_pdf(table_pages(frame, 'Rekap'), title='Rekap'))
+
+    assert len(streams) == 3
+    assert b'(Ani \\(A\\)) Tj' in streams[0]
+    assert b'Halaman 3 dari 3' in streams[-1]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_write_report_cards_zip(df_clean, tmp_path, workers):
+    calls = []
+    path = tmp_path / 'rapor.zip'
+    n = write_report_cards(df_clean, path, bundle=BUNDLE_ZIP, workers=workers, batch_size=5,
+                           progress=lambda done, total: calls.append((done, total)))
+
+    assert n == 12
+    assert calls[-1] == (12, 12) and len(calls) == 3
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        assert names[0] == 'rekap_kelas.pdf'
+        assert len(names) == 13
+        first = pdf_objects(archive.read(names[1]))
+    assert b'RAPOR NILAI SISWA' in first[0]
+    assert b'(: Siswa 0)' in first[0]
+
+
+def test_write_report_cards_merged_pdf(df_clean, tmp_path):
+    path = tmp_path / 'rapor.pdf'
+    write_report_cards(df_clean, path, bundle=BUNDLE_PDF, workers=1)
+
+    streams = pdf_objects(path.read_bytes())
+    assert b'Rekap Nilai Kelas' in streams[0]
+    assert sum(b'RAPOR NILAI SISWA' in stream for stream in streams) == 12
+    assert not list(tmp_path.glob('.*.tmp'))
@@ -0,0 +1,103 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.early_warning import RiskIndex
+from utils.aggregate_cube import build_aggregate_cube
+from utils.report_engine import (
+    REPORT_AT_RISK,
+    REPORT_GRADUATION,
+    REPORT_OVERALL,
+    REPORT_STUDENT,
+    REPORT_SUBJECT,
+    _prune_reports,
+    build_report,
+    export_report,
+    filter_leger,
+    iter_csv_chunks,
+)
+
+
+def test_filter_leger_semester_and_subject(df_clean):
+    subject = df_clean['MAPEL_ID'].cat.categories[0]
+    filtered = filter_leger(df_clean, semesters=[1, 2], subjects=[subject])
+
+    assert set(filtered['SEMESTER'].unique()) == {1, 2}
+    assert set(filtered['MAPEL_ID'].unique()) == {subject}
+    assert filter_leger(df_clean) is df_clean
+
+
+def test_filter_leger_date_range():
+    df = pd.DataFrame({
+        'TANGGAL': pd.to_datetime(['2024-01-01', '2024-01-15', '2024-02-01']),
+        'NILAI': [80, 70, 60],
+    })
+    filtered = filter_leger(df, date_range=(pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-15')))
+    assert filtered['NILAI'].tolist() == [80, 70]
+
+
+def test_student_and_subject_reports_match_groupby(df_clean):
+    cube = build_aggregate_cube(df_clean)
+    subjects = list(df_clean['MAPEL_ID'].cat.categories[:2])
+    semesters = [1, 3]
+    expected_rows = df_clean[df_clean['SEMESTER'].isin(semesters) & df_clean['MAPEL_ID'].isin(subjects)]
+
+    subject_report = build_report(REPORT_SUBJECT, df_clean, cube=cube, semesters=semesters, subjects=subjects)
+    expected = expected_rows.groupby('MAPEL_ID', observed=True)['NILAI'].agg(['count', 'mean', 'std'])
+    subject_report = subject_report.set_index('MAPEL_ID')
+    np.testing.assert_array_equal(subject_report['JUMLAH_NILAI'], expected['count'])
+    np.testing.assert_allclose(subject_report['RATA_RATA'], expected['mean'].round(2), atol=0.011)
+    np.testing.assert_allclose(subject_report['STD'], expected['std'].round(2), atol=0.011)
+
+    student_report = build_report(REPORT_STUDENT, df_clean, cube=cube, semesters=semesters, subjects=subjects)
+    assert len(student_report) == expected_rows['NISN'].nunique()
+    assert student_report['RANKING'].tolist() == list(range(1, len(student_report) + 1))
+    assert student_report['RATA_RATA'].is_monotonic_decreasing
+    per_subject = expected_rows.groupby(['NAMA_SISWA', 'MAPEL_ID'], observed=True)['NILAI'].mean().unstack()
+    top = student_report.iloc[0]
+    np.testing.assert_allclose(
+        per_subject.loc[top['NAMA_SISWA']].mean(), top['RATA_RATA'], atol=0.011
+    )
+
+
+def test_graduation_and_at_risk_reports(df_clean):
+    risk_index = RiskIndex(df_clean)
+    graduation = build_report(REPORT_GRADUATION, df_clean, risk_index=risk_index, kkm=75)
+
+    rerata = df_clean[df_clean['IS_RERATA']]
+    failing = (rerata['NILAI'] < 75).groupby(rerata['NISN']).sum()
+    expected_lulus = int((failing == 0).sum())
+    assert int((graduation['STATUS'] == 'LULUS').sum()) == expected_lulus
+    assert len(graduation) == rerata['NISN'].nunique()
+
+    at_risk = build_report(REPORT_AT_RISK, df_clean, risk_index=risk_index, kkm=75)
+    assert at_risk['BERISIKO'].all()
+
+
+def test_csv_chunks_match_to_csv(df_clean, tmp_path):
+    report = build_report(REPORT_OVERALL, df_clean)
+    payload = b''.join(iter_csv_chunks(report, chunk_rows=37))
+    assert payload == report.to_csv(index=False).encode('utf-8-sig')
+
+    path = export_report(report, REPORT_OVERALL, 'CSV', output_dir=tmp_path)
+    assert path.read_bytes() == payload
+    assert not list(tmp_path.glob('.*.tmp'))
+
+
+def test_prune_reports_keeps_recent_files(tmp_path):
+    now = time.time()
+    for i in range(5):
+        path = tmp_path / f"laporan_x_{i}.csv"
+        path.write_text('a')
+        # Tiga file lama (2 jam lalu), dua file baru ditulis
+        age = 7200 + i if i < 3 else i
+        os.utime(path, (now - age, now - age))
+    (tmp_path / 'lainnya.csv').write_text('a')
+
+    _prune_reports(tmp_path, keep=1, min_age=3600)
+
+    # File yang lebih muda dari batas umur tidak dihapus walau melebihi ``keep``
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lainnya.csv', 'laporan_x_3.csv', 'laporan_x_4.csv']
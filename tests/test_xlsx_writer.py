@@ -0,0 +1,119 @@
+import struct
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.helpers import make_synthetic_leger
+from utils.leger_cleaner import clean_excel_sheets, reshape_leger
+from utils.xlsx_writer import write_xlsx, xlsx_bytes
+
+
+def mixed_frame():
+    return pd.DataFrame({
+        'NAMA': ['Ani & Budi', '<Citra>', '  spasi ', None],
+        'KODE': pd.Categorical(['A', 'B', None, 'A']),
+        'NILAI': np.array([85.5, np.nan, 70.25, 100.0], dtype='float32'),
+        'JUMLAH': np.array([1, 2, 3, 4], dtype='int16'),
+        'LULUS': [True, False, True, False],
+        'TANGGAL': pd.to_datetime(['2024-01-15 08:30', None, '2023-12-31 00:00', '2024-07-01 12:00']),
+        'CAMPUR': [1, 'dua', 3.5, None],
+    })
+
+
+def test_roundtrip_preserves_values_and_types(tmp_path):
+    frame = mixed_frame()
+    path = write_xlsx({'Data': frame, 'Kosong': frame.iloc[:0]}, tmp_path / 'out.xlsx', chunk_rows=3)
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+
+    saved = pd.read_excel(path, sheet_name=None)
+    assert list(saved) == ['Data', 'Kosong']
+    assert list(saved['Kosong'].columns) == list(frame.columns)
+
+    data = saved['Data']
+    assert data['NAMA'].tolist()[:3] == ['Ani & Budi', '<Citra>', '  spasi ']
+    assert pd.isna(data['NAMA'][3])
+    assert data['KODE'].tolist()[:2] == ['A', 'B'] and pd.isna(data['KODE'][2])
+    np.testing.assert_allclose(data['NILAI'], frame['NILAI'].astype('float64'))
+    assert data['JUMLAH'].tolist() == [1, 2, 3, 4]
+    assert data['LULUS'].tolist() == [True, False, True, False]
+    assert data['TANGGAL'][0] == pd.Timestamp('2024-01-15 08:30')
+    assert pd.isna(data['TANGGAL'][1])
+    assert data['CAMPUR'].tolist()[:3] == [1, 'dua', 3.5]
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_clean_workbook_matches_source(parallel):
+    df_clean = reshape_leger(make_synthetic_leger(30, n_mapel=3))
+    sheets = clean_excel_sheets(df_clean)
+
+    payload = xlsx_bytes(sheets, parallel=parallel, chunk_rows=100)
+    saved = pd.read_excel(BytesIO(payload), sheet_name=None)
+
+    assert list(saved) == ['Data_Lengkap', 'Summary_Siswa', 'Analisis_Mapel']
+    data = saved['Data_Lengkap']
+    assert len(data) == len(df_clean)
+    assert data['NAMA_SISWA'].tolist() == df_clean['NAMA_SISWA'].tolist()
+    np.testing.assert_allclose(data['NILAI'], df_clean['NILAI'], rtol=1e-6)
+    assert len(saved['Summary_Siswa']) == 30
+
+
+@pytest.mark.parametrize('limit', [1, 300])
+def test_zip64_records_are_readable(tmp_path, monkeypatch, limit):
+    from utils import xlsx_writer
+
+    # Batas kecil memaksa field ekstra ZIP64 (header lokal, direktori pusat,
+    # dan record akhir ZIP64) tanpa harus menulis file 4 GB
+    monkeypatch.setattr(xlsx_writer, 'ZIP64_LIMIT', limit)
+    frame = mixed_frame()
+    path = write_xlsx({'Data': frame, 'Lagi': frame}, tmp_path / 'zip64.xlsx', chunk_rows=2)
+
+    payload = path.read_bytes()
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        infos = archive.infolist()
+
+    # Record akhir ZIP64 menunjuk direktori pusat; field 32-bit yang nilainya
+    # >= batas bernilai 0xFFFFFFFF dan nilai aslinya ada di field ekstra
+    cd_count, _, cd_start = struct.unpack_from('<QQQ', payload, payload.rindex(b'PK\x06\x06') + 32)
+    assert cd_count == len(infos)
+    offset = cd_start
+    for info in infos:
+        compressed, size = struct.unpack_from('<II', payload, offset + 20)
+        name_len, extra_len = struct.unpack_from('<HH', payload, offset + 28)
+        (header_offset,) = struct.unpack_from('<I', payload, offset + 42)
+        for raw, value in [(size, info.file_size), (compressed, info.compress_size),
+                           (header_offset, info.header_offset)]:
+            assert raw == (0xFFFFFFFF if value >= limit else value)
+        offset += 46 + name_len + extra_len
+
+    monkeypatch.setattr(xlsx_writer, 'ZIP64_LIMIT', 0xFFFFFFFF)
+    expected = pd.read_excel(write_xlsx({'Data': frame, 'Lagi': frame}, tmp_path / 'zip32.xlsx'), sheet_name=None)
+    saved = pd.read_excel(path, sheet_name=None)
+    assert list(saved) == ['Data', 'Lagi']
+    for name in saved:
+        pd.testing.assert_frame_equal(saved[name], expected[name])
+
+
+def test_colliding_sheet_names_are_deduplicated(tmp_path):
+    sheets = {'a/b': pd.DataFrame({'X': [1]}), 'a:b': pd.DataFrame({'X': [2]}), 'A_B': pd.DataFrame({'X': [3]}),
+              'k' * 40: pd.DataFrame({'X': [4]}), 'k' * 35: pd.DataFrame({'X': [5]})}
+
+    saved = pd.read_excel(write_xlsx(sheets, tmp_path / 'out.xlsx'), sheet_name=None)
+
+    assert list(saved) == ['a_b', 'a_b (2)', 'A_B (3)', 'k' * 31, 'k' * 27 + ' (2)']
+    assert [frame['X'][0] for frame in saved.values()] == [1, 2, 3, 4, 5]
+
+
+def test_dates_before_march_1900_are_not_shifted(tmp_path):
+    dates = pd.to_datetime(['1900-01-01 00:00', '1900-02-28 12:00', '1900-03-01 00:00', '2024-01-15 00:00'])
+    frame = pd.DataFrame({'TANGGAL': dates, 'OBJEK': pd.Series(list(dates), dtype=object)})
+
+    saved = pd.read_excel(write_xlsx({'Data': frame}, tmp_path / 'out.xlsx'))
+
+    assert saved['TANGGAL'].tolist() == dates.tolist()
+    assert saved['OBJEK'].tolist() == dates.tolist()
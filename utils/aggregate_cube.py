@@ -0,0 +1,307 @@
+"""
+Modul agregat (cube) nilai yang dibangun sekali per dataset
+
+Cube berisi jumlah, jumlah kuadrat, banyak data, min/max dan hitungan grade
+untuk setiap kombinasi siswa × mapel × semester, ditambah histogram nilai
+beresolusi 0,01 poin per mapel. Semua metrik dan grafik halaman analisis
+dibaca dari sini, sehingga rerun Streamlit tidak perlu memindai ulang
+seluruh data tidy.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.dataset_store import get_active_derived
+
+GRADE_BINS = [0, 60, 70, 80, 90, 100]
+GRADE_LABELS = ['E (<60)', 'D (60-70)', 'C (70-80)', 'B (80-90)', 'A (90-100)']
+
+# Histogram per 0,01 poin: nilai rapor/rerata ber-2 desimal terwakili tepat
+HIST_SCALE = 100
+HIST_BINS = 100 * HIST_SCALE + 1
+
+STUDENT_KEYS = ['NISN', 'NAMA_SISWA']
+
+
+class AggregateCube:
+    """
+    Agregat nilai per siswa × mapel × semester
+
+    Attributes:
+    -----------
+    cells : DataFrame
+        Satu baris per (NISN, NAMA_SISWA, MAPEL_ID, SEMESTER) dengan kolom
+        SUM, SUMSQ, COUNT, MIN, MAX dan hitungan grade (GRADE_LABELS).
+        SEMESTER 0 adalah nilai rerata.
+    histogram : ndarray
+        Hitungan nilai berbentuk (mapel, 2, HIST_BINS); sumbu kedua
+        0 = nilai semester, 1 = nilai rerata
+    mapel : list
+        Label MAPEL_ID sesuai sumbu pertama ``histogram``
+    """
+
+    def __init__(self, cells, histogram, mapel):
+        self.cells = cells
+        self.histogram = histogram
+        self.mapel = mapel
+
+    # ------------------------------------------------------------
+    # Metrik ringkas
+    # ------------------------------------------------------------
+
+    def overview(self, rerata=None):
+        """
+        Statistik keseluruhan (jumlah data, siswa, mapel, rata-rata, std, min, max)
+
+        ``rerata``: None = semua nilai, True = hanya rerata, False = hanya semester
+        """
+        cells = self._cells(rerata)
+        count = cells['COUNT'].sum()
+        if count == 0:
+            return {'total_records': 0, 'total_students': 0, 'total_subjects': 0,
+                    'nilai_mean': np.nan, 'nilai_std': np.nan,
+                    'nilai_min': np.nan, 'nilai_max': np.nan}
+
+        total = cells['SUM'].sum()
+        mean = total / count
+        variance = (cells['SUMSQ'].sum() - count * mean ** 2) / (count - 1) if count > 1 else np.nan
+
+        return {
+            'total_records': int(count),
+            'total_students': int(cells.index.get_level_values('NISN').nunique()),
+            'total_subjects': int(cells.index.get_level_values('MAPEL_ID').nunique()),
+            'nilai_mean': float(mean),
+            'nilai_std': float(np.sqrt(max(variance, 0))),
+            'nilai_min': float(cells['MIN'].min()),
+            'nilai_max': float(cells['MAX'].max()),
+        }
+
+    def student_means(self, rerata=None):
+        """Rata-rata nilai per siswa, terurut dari tertinggi"""
+        grouped = self._cells(rerata).groupby(level=STUDENT_KEYS, observed=True, dropna=False)
+        sums = grouped[['SUM', 'COUNT']].sum()
+
+        result = pd.DataFrame({
+            'RATA_RATA': sums['SUM'] / sums['COUNT'],
+            'JUMLAH_NILAI': sums['COUNT'],
+        }).reset_index()
+        return result.sort_values('RATA_RATA', ascending=False, ignore_index=True)
+
+    def subject_stats(self, rerata=None):
+        """Jumlah data, rata-rata, std, min dan max per mapel"""
+        grouped = self._cells(rerata).groupby(level='MAPEL_ID', observed=True)
+        agg = grouped.agg(
+            COUNT=('COUNT', 'sum'),
+            SUM=('SUM', 'sum'),
+            SUMSQ=('SUMSQ', 'sum'),
+            MIN=('MIN', 'min'),
+            MAX=('MAX', 'max'),
+        )
+
+        mean = agg['SUM'] / agg['COUNT']
+        variance = (agg['SUMSQ'] - agg['COUNT'] * mean ** 2) / (agg['COUNT'] - 1)
+
+        return pd.DataFrame({
+            'COUNT': agg['COUNT'],
+            'MEAN': mean,
+            'STD': np.sqrt(variance.clip(lower=0)),
+            'MIN': agg['MIN'],
+            'MAX': agg['MAX'],
+        })
+
+    def grade_distribution(self, rerata=None):
+        """Jumlah nilai per grade (E sampai A)"""
+        return self._cells(rerata)[GRADE_LABELS].sum()
+
+    def count_at_least(self, threshold, rerata=None):
+        """Jumlah nilai >= ``threshold``"""
+        hist = self._histogram(rerata)
+        start = int(np.ceil(threshold * HIST_SCALE - 1e-9))
+        return int(hist[max(start, 0):].sum())
+
+    # ------------------------------------------------------------
+    # Data grafik
+    # ------------------------------------------------------------
+
+    def value_histogram(self, bin_width=5, rerata=None, mapel=None):
+        """Histogram nilai dengan lebar bin ``bin_width`` poin"""
+        hist = self._histogram(rerata, mapel)
+        step = int(bin_width * HIST_SCALE)
+        # Nilai 100 (indeks terakhir) masuk bin terakhir, bukan bin "100-100" sendiri
+        edges = np.arange(0, HIST_BINS - 1, step)
+        counts = np.add.reduceat(hist, edges)
+        starts = edges / HIST_SCALE
+
+        return pd.DataFrame({
+            'NILAI': starts + bin_width / 2,
+            'BIN': [f"{s:g}-{min(s + bin_width, 100):g}" for s in starts],
+            'JUMLAH': counts,
+        })
+
+    def box_stats(self, rerata=None, mapel=None):
+        """Kuartil, median dan pagar whisker (1,5 × IQR) dari histogram"""
+        hist = self._histogram(rerata, mapel)
+        n = hist.sum()
+        if n == 0:
+            return None
+
+        cumulative = np.cumsum(hist)
+        q1, median, q3 = (_hist_quantile(cumulative, n, q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+
+        values = np.nonzero(hist)[0] / HIST_SCALE
+        lower = values[values >= q1 - 1.5 * iqr].min()
+        upper = values[values <= q3 + 1.5 * iqr].max()
+
+        return {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lower, 'upperfence': upper}
+
+    def apply_delta(self, removed, added):
+        """
+        Cube baru setelah baris ``removed`` diganti ``added``
+
+        Biaya sebanding dengan ukuran delta: sel cube milik kelompok yang
+        dihapus dibuang, sel delta ditambahkan, dan histogram dikurangi /
+        ditambah hitungan delta.
+
+        Parameters:
+        -----------
+        removed : DataFrame
+            Baris tidy lama yang digantikan (kelompok siswa × semester utuh)
+        added : DataFrame
+            Baris tidy baru untuk kelompok tersebut
+        """
+        old = build_aggregate_cube(removed) if not removed.empty else None
+        new = build_aggregate_cube(added) if not added.empty else None
+
+        cells = self.cells
+        if old is not None:
+            cells = cells[~cells.index.isin(old.cells.index)]
+        if new is not None:
+            cells = pd.concat([cells, new.cells]).sort_index()
+
+        mapel = sorted(set(self.mapel) | set(new.mapel if new else []))
+        histogram = _align_histogram(self.histogram, self.mapel, mapel)
+        if old is not None:
+            histogram -= _align_histogram(old.histogram, old.mapel, mapel)
+        if new is not None:
+            histogram += _align_histogram(new.histogram, new.mapel, mapel)
+
+        return AggregateCube(cells, histogram, mapel)
+
+    def _cells(self, rerata):
+        if rerata is None:
+            return self.cells
+        is_rerata = self.cells.index.get_level_values('SEMESTER') == 0
+        return self.cells[is_rerata if rerata else ~is_rerata]
+
+    def _histogram(self, rerata=None, mapel=None):
+        hist = self.histogram
+        if mapel is not None:
+            hist = hist[[self.mapel.index(mapel)]] if mapel in self.mapel else hist[:0]
+        if rerata is not None:
+            hist = hist[:, [1 if rerata else 0]]
+        return hist.sum(axis=(0, 1))
+
+
+def build_aggregate_cube(df):
+    """
+    Bangun cube dari data tidy leger (satu kali pindai)
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Data tidy hasil ``clean_leger_data``
+
+    Returns:
+    --------
+    cube : AggregateCube or None
+        None jika data bukan format tidy leger
+    """
+    if not set(STUDENT_KEYS + ['MAPEL_ID', 'SEMESTER', 'NILAI']).issubset(df.columns):
+        return None
+
+    nilai = df['NILAI'].to_numpy(dtype='float64')
+
+    grade_idx = np.clip(np.searchsorted(GRADE_BINS, nilai, side='left') - 1, 0, len(GRADE_LABELS) - 1)
+    grades = pd.DataFrame(
+        (grade_idx[:, None] == np.arange(len(GRADE_LABELS))).astype('int32'),
+        columns=GRADE_LABELS,
+        index=df.index
+    )
+
+    work = pd.concat([
+        df[STUDENT_KEYS + ['MAPEL_ID', 'SEMESTER']],
+        pd.DataFrame({'NILAI': nilai, 'NILAI_SQ': nilai ** 2}, index=df.index),
+        grades,
+    ], axis=1)
+
+    grouped = work.groupby(STUDENT_KEYS + ['MAPEL_ID', 'SEMESTER'], observed=True, dropna=False, sort=True)
+    cells = grouped.agg(
+        SUM=('NILAI', 'sum'),
+        SUMSQ=('NILAI_SQ', 'sum'),
+        COUNT=('NILAI', 'count'),
+        MIN=('NILAI', 'min'),
+        MAX=('NILAI', 'max'),
+    )
+    cells = cells.join(grouped[GRADE_LABELS].sum())
+
+    # Histogram 0,01 poin per (mapel, semester/rerata)
+    mapel = pd.Categorical(df['MAPEL_ID'])
+    n_mapel = len(mapel.categories)
+    value_idx = np.clip(np.rint(nilai * HIST_SCALE), 0, HIST_BINS - 1).astype('int64')
+    is_rerata = (df['SEMESTER'].to_numpy() == 0).astype('int64')
+    flat = (mapel.codes.astype('int64') * 2 + is_rerata) * HIST_BINS + value_idx
+    histogram = np.bincount(flat, minlength=n_mapel * 2 * HIST_BINS).reshape(n_mapel, 2, HIST_BINS)
+
+    return AggregateCube(cells, histogram, list(mapel.categories))
+
+
+def get_active_cube():
+    """Cube untuk dataset aktif sesi ini (dibangun sekali per dataset), atau None"""
+    return get_active_derived('aggregate_cube', build_aggregate_cube)
+
+
+def frame_overview(df):
+    """
+    Statistik keseluruhan langsung dari DataFrame, untuk data non-leger
+    (CSV/Excel umum) yang tidak punya cube
+
+    Kunci sama dengan ``AggregateCube.overview``. Tanpa kolom NISN jumlah
+    siswa = jumlah baris; tanpa kolom NILAI statistik nilai bernilai NaN.
+    """
+    nilai = pd.to_numeric(df['NILAI'], errors='coerce') if 'NILAI' in df.columns else pd.Series(dtype='float64')
+    return {
+        'total_records': int(len(df)),
+        'total_students': int(df['NISN'].nunique()) if 'NISN' in df.columns else int(len(df)),
+        'total_subjects': int(df['MAPEL_ID'].nunique()) if 'MAPEL_ID' in df.columns else 0,
+        'nilai_mean': float(nilai.mean()),
+        'nilai_std': float(nilai.std()),
+        'nilai_min': float(nilai.min()),
+        'nilai_max': float(nilai.max()),
+    }
+
+
+def get_active_overview():
+    """
+    Statistik keseluruhan dataset aktif: dari cube untuk data leger, atau
+    dari ``frame_overview`` untuk data lain; None jika belum ada data
+    """
+    cube = get_active_cube()
+    if cube is not None:
+        return cube.overview()
+    return get_active_derived('frame_overview', frame_overview)
+
+
+def _align_histogram(histogram, mapel, target_mapel):
+    """Salin histogram ke urutan mapel ``target_mapel`` (mapel baru diisi nol)"""
+    aligned = np.zeros((len(target_mapel), 2, HIST_BINS), dtype='int64')
+    if mapel:
+        aligned[[target_mapel.index(m) for m in mapel]] = histogram
+    return aligned
+
+
+def _hist_quantile(cumulative, n, q):
+    """Kuantil (interpolasi linear seperti pandas) dari histogram kumulatif"""
+    position = q * (n - 1)
+    lower = np.searchsorted(cumulative, np.floor(position), side='right') / HIST_SCALE
+    upper = np.searchsorted(cumulative, np.ceil(position), side='right') / HIST_SCALE
+    return float(lower + (upper - lower) * (position - np.floor(position)))
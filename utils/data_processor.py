@@ -4,7 +4,13 @@ Modul untuk pemrosesan data umum
 import pandas as pd
 import numpy as np
 import streamlit as st
-from utils.leger_cleaner import clean_leger_data, calculate_basic_statistics
+from config.settings import LEGER_BATCH_SIZE, LEGER_STREAMING_MIN_MB
+from utils.leger_cache import get_leger_cache
+from utils.leger_cleaner import (
+    clean_leger_data,
+    calculate_basic_statistics,
+    clean_leger_streaming
+)
 
 def clean_data(df):
     """Membersihkan data dari nilai null dan duplikat"""
@@ -23,10 +29,74 @@ def preprocess_student_data(df):
     return df
 
 
-def load_and_process_excel(file, file_type='leger'):
+def process_excel(file, file_type='leger', batch_size=None, use_cache=True):
+    """
+    Load dan proses file Excel berdasarkan tipe (tanpa UI Streamlit)
+    
+    Kesalahan baca/format tidak ditangkap, sehingga pemanggil di luar
+    halaman (mis. job latar belakang) mendapat pesan error aslinya.
+    
+    Parameters:
+    -----------
+    file : UploadedFile or file-like
+        File yang diupload (butuh ``name``, ``size`` dan ``getbuffer()``)
+    file_type : str
+        Tipe file: 'leger', 'siswa', 'nilai', 'presensi'
+    batch_size : int, optional
+        Jika diisi, leger dibaca streaming per batch baris siswa dan
+        setiap batch langsung ditulis ke disk (``clean_leger_streaming``);
+        DataFrame hasil tetap dimuat utuh sekali di akhir.
+        Default: otomatis untuk file di atas ``LEGER_STREAMING_MIN_MB``
+    use_cache : bool
+        Pakai cache hasil pembersihan (kunci: hash isi file)
+    
+    Returns:
+    --------
+    df : DataFrame
+        Data yang sudah diproses
+    stats : dict
+        Statistik data
+    """
+    if file_type == 'leger':
+        if batch_size is None and file.size > LEGER_STREAMING_MIN_MB * 1024 * 1024:
+            batch_size = LEGER_BATCH_SIZE
+        
+        # Bersihkan data leger langsung dari buffer upload (tanpa file sementara)
+        def clean():
+            if batch_size:
+                return clean_leger_streaming(file, batch_size=batch_size)
+            return clean_leger_data(file)
+        
+        if use_cache:
+            cache = get_leger_cache()
+            df_clean = cache.get_or_compute(cache.make_key(file.getbuffer()), clean)
+        else:
+            df_clean = clean()
+        
+        # Hitung statistik
+        stats = calculate_basic_statistics(df_clean)
+        
+        return df_clean, stats
+    
+    # Untuk file lainnya, baca langsung
+    if file.name.endswith('.csv'):
+        df = pd.read_csv(file)
+    else:
+        df = pd.read_excel(file)
+    
+    # Bersihkan data
+    df = clean_data(df)
+    
+    return df, {}
+
+
+def load_and_process_excel(file, file_type='leger', batch_size=None, use_cache=True):
     """
     Load dan proses file Excel berdasarkan tipe
     
+    Sama dengan ``process_excel``, tetapi kesalahan ditampilkan dengan
+    ``st.error`` dan menghasilkan DataFrame kosong.
+    
     Parameters:
     -----------
     file : UploadedFile
@@ -43,36 +113,7 @@ def load_and_process_excel(file, file_type='leger'):
     """
     
     try:
-        if file_type == 'leger':
-            # Simpan file sementara
-            temp_path = f"temp_{file.name}"
-            with open(temp_path, 'wb') as f:
-                f.write(file.getbuffer())
-            
-            # Bersihkan data leger
-            df_clean = clean_leger_data(temp_path)
-            
-            # Hapus file temporary
-            import os
-            os.remove(temp_path)
-            
-            # Hitung statistik
-            stats = calculate_basic_statistics(df_clean)
-            
-            return df_clean, stats
-        
-        else:
-            # Untuk file lainnya, baca langsung
-            if file.name.endswith('.csv'):
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-            
-            # Bersihkan data
-            df = clean_data(df)
-            
-            return df, {}
-            
+        return process_excel(file, file_type, batch_size=batch_size, use_cache=use_cache)
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
         return pd.DataFrame(), {}
\ No newline at end of file
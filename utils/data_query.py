@@ -0,0 +1,142 @@
+"""
+Modul query data tidy untuk tabel preview: indeks pencarian dan paging
+
+Indeks dibangun sekali per dataset (artefak turunan ``data_query``). Setiap
+kolom identitas (NAMA_SISWA, NISN, MAPEL_ID, ...) difaktorkan menjadi kode
+per baris plus daftar nilai unik dalam huruf kecil. Pencarian hanya memindai
+nilai unik (ribuan, bukan ratusan ribu baris), lalu kode yang cocok
+dipetakan ke baris lewat satu lookup numpy. Hasil query berupa posisi
+baris; hanya baris di halaman yang ditampilkan yang diambil dari DataFrame.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config.settings import DATA_QUERY_MEMO_ENTRIES
+from utils.dataset_store import get_active_derived
+
+# Kolom yang diindeks untuk pencarian (yang ada di data)
+SEARCH_COLUMNS = ['NAMA_SISWA', 'NISN', 'NIS', 'MAPEL_ID', 'KELAS']
+
+
+class DataQuery:
+    """
+    Indeks pencarian dan filter untuk satu dataset
+
+    Pencarian tidak peka huruf besar/kecil dan mencocokkan potongan teks
+    (seperti ``str.contains``) pada kolom ``SEARCH_COLUMNS``; data non-leger
+    memakai semua kolom teks/kategori. Hasil query di-memo (LRU kecil)
+    sehingga berpindah halaman tidak menghitung ulang.
+
+    Attributes:
+    -----------
+    n_rows : int
+        Jumlah baris dataset
+    columns : list
+        Kolom yang diindeks
+    semesters : list
+        Nilai SEMESTER yang ada (kosong jika kolom tidak ada)
+    nbytes : int
+        Ukuran memori dataset (deep), dihitung sekali
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.columns = [col for col in SEARCH_COLUMNS if col in df.columns] or [
+            col for col in df.columns
+            if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)
+        ]
+        self._codes = {}
+        self._values = {}
+        for col in self.columns:
+            self._codes[col], self._values[col] = _encode(df[col])
+
+        self._rerata = df['IS_RERATA'].to_numpy(dtype=bool) if 'IS_RERATA' in df.columns else None
+        self._semester = df['SEMESTER'].to_numpy() if 'SEMESTER' in df.columns else None
+        self.semesters = [] if self._semester is None else np.unique(self._semester).tolist()
+        self.nbytes = int(df.memory_usage(deep=True).sum())
+
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, text=None, rerata=False, semester=None):
+        """
+        Posisi baris yang cocok dengan pencarian dan filter
+
+        Parameters:
+        -----------
+        text : str, optional
+            Potongan teks yang dicari di kolom yang diindeks
+        rerata : bool
+            Hanya baris nilai rerata (IS_RERATA)
+        semester : int, optional
+            Hanya baris SEMESTER ini
+
+        Returns:
+        --------
+        positions : ndarray
+            Posisi baris (urut naik, read-only)
+        """
+        needle = (text or '').strip().lower()
+        key = (needle, bool(rerata), semester)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+
+        mask = None
+        if needle:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            for col in self.columns:
+                hits = np.asarray(self._values[col].str.contains(needle, regex=False), dtype=bool)
+                if hits.any():
+                    # Kode -1 (kosong) jatuh ke elemen terakhir yang selalu False
+                    mask |= np.append(hits, False)[self._codes[col]]
+        if rerata and self._rerata is not None:
+            mask = self._rerata.copy() if mask is None else mask & self._rerata
+        if semester is not None and self._semester is not None:
+            matched = self._semester == semester
+            mask = matched if mask is None else mask & matched
+
+        positions = np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+        positions.flags.writeable = False
+
+        with self._lock:
+            self._memo[key] = positions
+            while len(self._memo) > DATA_QUERY_MEMO_ENTRIES:
+                self._memo.popitem(last=False)
+        return positions
+
+
+def _encode(series):
+    """Kode int per baris dan nilai unik huruf kecil (``pd.Index``)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    return codes, pd.Index(uniques.astype(str), dtype=object).str.lower()
+
+
+def take_page(df, positions, page, page_size):
+    """
+    Baris halaman ``page`` (mulai 1) dari hasil query; hanya baris ini yang disalin
+
+    Returns:
+    --------
+    df_page : DataFrame
+        Indeks baris asli dipertahankan
+    """
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]]
+
+
+def count_pages(positions, page_size):
+    """Jumlah halaman (minimal 1) untuk hasil query"""
+    return max(1, -(-len(positions) // page_size))
+
+
+def get_active_query():
+    """``DataQuery`` dataset aktif sesi ini (dibangun sekali per dataset), atau None"""
+    return get_active_derived('data_query', DataQuery)
@@ -0,0 +1,303 @@
+"""
+Modul katalog dataset yang sudah diproses
+
+Katalog adalah indeks kecil (JSON) di atas file yang ditulis
+``save_clean_data`` di ``data/processed``. Setiap entri menyimpan metadata
+(jumlah baris, siswa, mapel, hash sumber, waktu proses) sehingga halaman
+mana pun bisa memuat ulang dataset tanpa mem-parsing Excel lagi.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import streamlit as st
+
+from config.settings import PROCESSED_DIR
+from utils.dataset_store import set_active_dataset
+from utils.leger_cleaner import (
+    TIDY_COLUMNS,
+    combine_leger_deltas,
+    leger_group_hashes,
+    load_clean_data,
+    merge_leger_delta,
+    stored_columns
+)
+
+CATALOG_FILE = 'catalog.json'
+
+# Semua penulisan katalog (register/remove/update/sinkronisasi) lewat lock ini
+_catalog_lock = threading.Lock()
+
+# mtime direktori saat sinkronisasi terakhir dan cache hasil parse katalog
+_synced_mtimes = {}
+_parsed_catalogs = {}
+
+
+def compute_file_hash(*contents):
+    """Hash SHA-256 (hex) dari isi satu atau beberapa file"""
+    digest = hashlib.sha256()
+    for data in contents:
+        digest.update(hashlib.sha256(data).digest())
+    return digest.hexdigest()
+
+
+def list_datasets(output_dir=PROCESSED_DIR):
+    """
+    Daftar dataset di katalog, terbaru lebih dulu
+
+    File data yang ada di ``output_dir`` tetapi belum tercatat (misalnya
+    hasil proses sebelum katalog ada) ikut didaftarkan otomatis.
+    """
+    catalog = _sync_catalog(output_dir)
+    return sorted(catalog.values(), key=lambda entry: entry['timestamp'], reverse=True)
+
+
+def get_dataset_entry(dataset_id, output_dir=PROCESSED_DIR):
+    """Entri katalog untuk ``dataset_id``, atau None"""
+    return _read_catalog(output_dir).get(dataset_id)
+
+
+def find_dataset_by_hash(source_hash, output_dir=PROCESSED_DIR):
+    """Entri katalog dengan hash sumber yang sama, atau None"""
+    for entry in _read_catalog(output_dir).values():
+        if source_hash and entry.get('hash') == source_hash and Path(entry['data_path']).exists():
+            return entry
+    return None
+
+
+def register_dataset(save_results, df_clean, source_name, source_hash=None,
+                     file_type='Data Leger', output_dir=PROCESSED_DIR):
+    """
+    Catat hasil ``save_clean_data`` ke katalog
+
+    Parameters:
+    -----------
+    save_results : dict
+        Hasil ``save_clean_data``
+    df_clean : DataFrame
+        Data yang disimpan (untuk metadata)
+    source_name : str
+        Nama file sumber
+    source_hash : str, optional
+        Hash isi file sumber (lihat ``compute_file_hash``)
+    file_type : str
+        Jenis data
+
+    Returns:
+    --------
+    entry : dict
+        Entri katalog yang baru
+    """
+    entry = _make_entry(save_results['data_path'], df_clean)
+    entry.update({
+        'name': source_name,
+        'hash': source_hash,
+        'type': file_type,
+        'format': save_results['format'],
+        'timestamp': datetime.strptime(save_results['timestamp'], '%Y%m%d_%H%M%S').isoformat(),
+    })
+
+    # Hash per (siswa, semester) untuk update inkremental (hanya data leger)
+    if set(TIDY_COLUMNS) <= set(df_clean.columns):
+        data_path = Path(save_results['data_path'])
+        hash_path = data_path.with_name(f"{data_path.stem}.hashes.parquet")
+        leger_group_hashes(df_clean).to_parquet(hash_path, index=False)
+        entry['hash_path'] = str(hash_path)
+
+    with _catalog_lock:
+        catalog = _read_catalog(output_dir)
+        catalog[entry['dataset_id']] = entry
+        _write_catalog(catalog, output_dir)
+
+    return entry
+
+
+def remove_dataset(dataset_id, output_dir=PROCESSED_DIR):
+    """Hapus dataset dari katalog beserta file datanya"""
+    with _catalog_lock:
+        catalog = _read_catalog(output_dir)
+        entry = catalog.pop(dataset_id, None)
+        if entry:
+            for path in dataset_files(entry):
+                path.unlink(missing_ok=True)
+        _write_catalog(catalog, output_dir)
+
+
+def update_dataset_entry(dataset_id, updates, output_dir=PROCESSED_DIR):
+    """Perbarui field entri katalog (mis. setelah update inkremental)"""
+    with _catalog_lock:
+        catalog = _read_catalog(output_dir)
+        if dataset_id not in catalog:
+            raise KeyError(f"Dataset tidak ditemukan: {dataset_id}")
+        catalog[dataset_id].update(updates)
+        _write_catalog(catalog, output_dir)
+        return catalog[dataset_id]
+
+
+def dataset_files(entry):
+    """Semua file milik sebuah dataset: data utama, delta, hash, fitur, dan ekspor"""
+    data_path = Path(entry['data_path'])
+    paths = [data_path, data_path.with_suffix('.xlsx'), data_path.with_suffix('.csv')]
+    paths += [Path(part) for part in entry.get('parts', [])]
+    if entry.get('hash_path'):
+        paths.append(Path(entry['hash_path']))
+    paths += sorted(data_path.parent.glob(f"{data_path.stem}.features*"))
+    return paths
+
+
+def load_dataset(dataset_id, output_dir=PROCESSED_DIR):
+    """
+    Muat data tidy sebuah dataset dari katalog (tanpa parsing Excel)
+    
+    File delta hasil update inkremental digabung dulu (delta terakhir menang)
+    lalu diterapkan sekali di atas file utama.
+    """
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if entry is None:
+        raise KeyError(f"Dataset tidak ditemukan: {dataset_id}")
+    
+    df_clean = load_clean_data(entry['data_path'])
+    parts = [load_clean_data(part) for part in entry.get('parts', [])]
+    if parts:
+        df_clean = merge_leger_delta(df_clean, combine_leger_deltas(parts))
+    return df_clean
+
+
+def supports_incremental_update(entry):
+    """
+    Apakah dataset bisa diperbarui dengan ``ingest_leger_incremental``
+
+    Hanya dataset leger tunggal: dataset multi-file (kolom KELAS/SHEET)
+    berisi banyak leger kelas yang nomor urutnya (NO) berulang, sedangkan
+    update inkremental membaca satu sheet leger tanpa konteks kelas.
+    """
+    if entry.get('type', 'Data Leger') != 'Data Leger':
+        return False
+    multi_class = entry.get('multi_class')
+    if multi_class is None:
+        # Entri katalog lama: cek skema file data
+        try:
+            multi_class = 'KELAS' in stored_columns(entry['data_path'])
+        except (OSError, ValueError):
+            return False
+    return not multi_class
+
+
+def activate_dataset(dataset_id, output_dir=PROCESSED_DIR):
+    """
+    Jadikan dataset dari katalog sebagai data aktif sesi ini
+
+    Returns:
+    --------
+    bool
+        True jika berhasil dimuat
+    """
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if entry is None:
+        return False
+
+    set_active_dataset(dataset_id)
+    st.session_state['file_name'] = entry['name']
+    st.session_state['upload_time'] = datetime.fromisoformat(entry['timestamp'])
+    st.session_state['file_type'] = entry.get('type', 'Data Leger')
+    return True
+
+
+def _make_entry(data_path, df_clean):
+    """Metadata dasar dataset dari path data dan isinya"""
+    data_path = Path(data_path)
+    return {
+        'dataset_id': data_path.stem.replace('leger_clean_', ''),
+        'data_path': str(data_path),
+        'rows': int(len(df_clean)),
+        'students': int(df_clean['NISN'].nunique()) if 'NISN' in df_clean.columns else None,
+        'subjects': int(df_clean['MAPEL_ID'].nunique()) if 'MAPEL_ID' in df_clean.columns else None,
+        'multi_class': 'KELAS' in df_clean.columns,
+    }
+
+
+def _sync_catalog(output_dir):
+    """
+    Buang entri yang filenya hilang dan daftarkan file yang belum tercatat
+
+    Direktori hanya dipindai ulang jika mtime-nya berubah sejak sinkronisasi
+    terakhir (file ditambah, dihapus, atau katalog ditulis ulang).
+    """
+    key = str(Path(output_dir).resolve())
+    mtime = _dir_mtime(output_dir)
+    if mtime is not None and _synced_mtimes.get(key) == mtime:
+        return _read_catalog(output_dir)
+
+    with _catalog_lock:
+        catalog = _read_catalog(output_dir)
+        changed = False
+
+        for dataset_id in [k for k, v in catalog.items() if not Path(v['data_path']).exists()]:
+            del catalog[dataset_id]
+            changed = True
+
+        known = {Path(entry['data_path']).resolve() for entry in catalog.values()}
+        for pattern in ('leger_clean_*.parquet', 'leger_clean_*.feather'):
+            for path in Path(output_dir).glob(pattern):
+                # File delta/hash (``<dataset>.part-N``, ``<dataset>.hashes``) bukan dataset
+                if path.resolve() in known or '.' in path.stem:
+                    continue
+                try:
+                    entry = _make_entry(path, load_clean_data(path))
+                except Exception:
+                    continue
+                entry.update({
+                    'name': path.name,
+                    'hash': None,
+                    'type': 'Data Leger',
+                    'format': path.suffix.lstrip('.'),
+                    'timestamp': datetime.fromtimestamp(path.stat().st_mtime).isoformat(timespec='seconds'),
+                })
+                catalog[entry['dataset_id']] = entry
+                changed = True
+
+        if changed:
+            _write_catalog(catalog, output_dir)
+        _synced_mtimes[key] = _dir_mtime(output_dir)
+
+    return catalog
+
+
+def _dir_mtime(output_dir):
+    try:
+        return os.stat(output_dir).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_catalog(output_dir):
+    """Isi katalog (salinan); file JSON hanya diparse ulang jika berubah"""
+    path = Path(output_dir) / CATALOG_FILE
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return {}
+
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsed_catalogs.get(str(path))
+    if cached is None or cached[0] != version:
+        try:
+            with open(path, encoding='utf-8') as f:
+                entries = {entry['dataset_id']: entry for entry in json.load(f)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        cached = _parsed_catalogs[str(path)] = (version, entries)
+    return {dataset_id: dict(entry) for dataset_id, entry in cached[1].items()}
+
+
+def _write_catalog(catalog, output_dir):
+    """Tulis katalog secara atomik (file sementara lalu rename)"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    path = Path(output_dir) / CATALOG_FILE
+    tmp_path = path.with_suffix(f'.{os.getpid()}-{threading.get_ident()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(list(catalog.values()), f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,258 @@
+"""
+Modul penyimpanan dataset bersama lintas sesi
+
+Setiap sesi Streamlit hanya menyimpan ``dataset_id`` di session_state.
+DataFrame-nya disimpan sekali di registry proses (read-only) dan dipakai
+bersama oleh semua sesi yang membuka dataset yang sama. Registry mencatat
+sesi mana saja yang memegang setiap dataset; dataset yang tidak lagi
+dipegang sesi aktif mana pun dilepas dari memori.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+class DatasetStore:
+    """Registry DataFrame read-only dengan hitungan referensi per sesi"""
+
+    def __init__(self):
+        self._frames = {}
+        self._holders = {}
+        self._derived = {}
+        self._loaders = {}
+        self._lock = threading.RLock()
+
+    def put(self, dataset_id, df):
+        """
+        Daftarkan DataFrame; jika ``dataset_id`` sudah ada dengan skema yang
+        sama, instance yang sudah terdaftar yang dikembalikan (salinan baru
+        dibuang). Skema berbeda (kolom/dtype) berarti data lain dengan ID
+        yang sama: frame diganti dan artefak turunannya dibuang.
+        """
+        with self._lock:
+            current = self._frames.get(dataset_id)
+            if (current is not None and dataset_id not in self._loaders
+                    and _schema(current) == _schema(df)):
+                return current
+            self._frames[dataset_id] = _freeze(df)
+            self._loaders.pop(dataset_id, None)
+            self._derived.pop(dataset_id, None)
+            self._holders.setdefault(dataset_id, set())
+            return self._frames[dataset_id]
+
+    def mark_stale(self, dataset_id, loader, derived=None):
+        """
+        Tandai DataFrame dataset usang (mis. setelah update inkremental)
+
+        Frame baru dibangun dengan ``loader()`` saat pertama kali diminta lagi,
+        bukan sekarang. Artefak turunan lama dibuang kecuali yang sudah
+        diperbarui lewat ``derived`` (mis. cube hasil ``apply_delta``), yang
+        tetap bisa dipakai tanpa memuat ulang frame.
+        """
+        with self._lock:
+            if dataset_id not in self._frames:
+                return
+            self._loaders[dataset_id] = loader
+            self._derived[dataset_id] = dict(derived or {})
+
+    def peek_derived(self, dataset_id, name):
+        """Artefak turunan yang sudah dibangun, atau None (tidak membangun)"""
+        with self._lock:
+            return self._derived.get(dataset_id, {}).get(name)
+
+    def get(self, dataset_id):
+        """DataFrame bersama untuk ``dataset_id`` (dimuat ulang jika usang), atau None"""
+        with self._lock:
+            loader = self._loaders.get(dataset_id)
+            if loader is None:
+                return self._frames.get(dataset_id)
+
+        # Dimuat di luar lock; hanya dipasang jika belum ditandai usang lagi
+        df = _freeze(loader())
+        with self._lock:
+            if self._loaders.get(dataset_id) is loader:
+                del self._loaders[dataset_id]
+                self._frames[dataset_id] = df
+            elif dataset_id not in self._loaders and dataset_id in self._frames:
+                # Sudah dimuat ulang sesi lain lebih dulu
+                df = self._frames[dataset_id]
+        return df
+
+    def get_derived(self, dataset_id, name, builder):
+        """
+        Artefak turunan ``name`` (mis. agregat) untuk dataset, dibangun
+        sekali dengan ``builder(df)`` lalu dipakai bersama semua sesi
+        """
+        with self._lock:
+            derived = self._derived.get(dataset_id, {})
+            if dataset_id not in self._frames or name in derived:
+                return derived.get(name)
+
+        df = self.get(dataset_id)
+        if df is None:
+            return None
+        # Dibangun di luar lock agar sesi lain tidak ikut menunggu
+        value = builder(df)
+        with self._lock:
+            if self._frames.get(dataset_id) is not df:
+                return value
+            return self._derived.setdefault(dataset_id, {}).setdefault(name, value)
+
+    def acquire(self, dataset_id, session_id):
+        """Catat bahwa sesi memegang dataset"""
+        with self._lock:
+            self._holders.setdefault(dataset_id, set()).add(session_id)
+
+    def release(self, dataset_id, session_id):
+        """Lepas pegangan sesi; dataset tanpa pemegang dihapus dari memori"""
+        with self._lock:
+            holders = self._holders.get(dataset_id)
+            if holders is None:
+                return
+            holders.discard(session_id)
+            if not holders:
+                self._holders.pop(dataset_id, None)
+                self._frames.pop(dataset_id, None)
+                self._loaders.pop(dataset_id, None)
+                self._derived.pop(dataset_id, None)
+
+    def prune(self, is_active_session):
+        """Lepas semua pegangan milik sesi yang sudah tidak aktif"""
+        with self._lock:
+            for dataset_id, holders in list(self._holders.items()):
+                for session_id in [s for s in holders if not is_active_session(s)]:
+                    self.release(dataset_id, session_id)
+
+    def stats(self):
+        """Jumlah dataset, total pemegang dan memori yang dipakai"""
+        with self._lock:
+            return {
+                'datasets': len(self._frames),
+                'sessions': sum(len(h) for h in self._holders.values()),
+                'memory_mb': sum(
+                    df.memory_usage(deep=False).sum() for df in self._frames.values()
+                ) / (1024 * 1024),
+            }
+
+
+def _freeze(df):
+    """
+    Tandai array numerik (termasuk kode kategori) di dalam DataFrame sebagai
+    read-only, sehingga penulisan in-place ke data bersama langsung gagal.
+    Kolom object dibiarkan karena sebagian rutin Cython pandas menolak
+    buffer object yang read-only.
+    """
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            values = column.array.codes
+        else:
+            values = column.to_numpy(copy=False)
+        if isinstance(values, np.ndarray) and values.dtype != object:
+            # Kolom adalah view; flag dipasang di array pemilik datanya
+            while isinstance(values.base, np.ndarray):
+                values = values.base
+            values.flags.writeable = False
+    return df
+
+
+def _schema(df):
+    """Nama kolom dan dtype, untuk membedakan data dengan ID yang sama"""
+    return list(zip(df.columns, map(str, df.dtypes)))
+
+
+_store = DatasetStore()
+
+
+def get_dataset_store():
+    """Registry dataset bersama untuk seluruh proses"""
+    return _store
+
+
+def set_active_dataset(dataset_id, df=None):
+    """
+    Jadikan ``dataset_id`` data aktif sesi ini
+
+    Parameters:
+    -----------
+    dataset_id : str
+        ID dataset (ID katalog, atau ID upload yang tidak disimpan)
+    df : DataFrame, optional
+        Data hasil proses; jika dataset sudah dipegang sesi lain, instance
+        bersama yang dipakai dan ``df`` dibuang
+
+    Returns:
+    --------
+    df : DataFrame or None
+        DataFrame bersama (read-only)
+    """
+    session_id = _session_id()
+    previous = st.session_state.get('dataset_id')
+    if previous is not None and previous != dataset_id:
+        _store.release(previous, session_id)
+
+    st.session_state['dataset_id'] = dataset_id
+    if df is not None:
+        _store.put(dataset_id, df)
+    _store.acquire(dataset_id, session_id)
+
+    return get_active_dataset()
+
+
+def get_active_dataset():
+    """
+    DataFrame aktif sesi ini dari registry bersama, atau None
+
+    Dataset katalog yang belum ada di memori (misalnya setelah restart
+    server) dimuat ulang dari file Parquet/Feather.
+    """
+    dataset_id = st.session_state.get('dataset_id')
+    if dataset_id is None:
+        return None
+
+    if runtime.exists():
+        _store.prune(runtime.get_instance().is_active_session)
+
+    df = _store.get(dataset_id)
+    if df is None:
+        from utils.dataset_catalog import get_dataset_entry, load_dataset
+
+        if get_dataset_entry(dataset_id) is None:
+            return None
+        df = _store.put(dataset_id, load_dataset(dataset_id))
+
+    _store.acquire(dataset_id, _session_id())
+    return df
+
+
+def get_active_derived(name, builder):
+    """
+    Artefak turunan ``name`` untuk dataset aktif sesi ini, atau None
+
+    Parameters:
+    -----------
+    name : str
+        Nama artefak (unik per jenis turunan)
+    builder : callable
+        ``builder(df)`` untuk membangun artefak jika belum ada
+    """
+    if get_active_dataset() is None:
+        return None
+    return _store.get_derived(st.session_state['dataset_id'], name, builder)
+
+
+def clear_active_dataset():
+    """Lepas data aktif sesi ini"""
+    dataset_id = st.session_state.get('dataset_id')
+    if dataset_id is not None:
+        _store.release(dataset_id, _session_id())
+    st.session_state['dataset_id'] = None
+
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else 'local'
@@ -0,0 +1,251 @@
+"""
+Modul feature store: matriks fitur per siswa untuk model ML
+
+Fitur per siswa (rata-rata per mapel, rata-rata per semester, tren, varians,
+jumlah nilai kosong) diturunkan dari data tidy leger sekali per versi
+dataset, lalu disimpan di samping file data bersih sebagai array NumPy
+float32 (``<dataset>.features.npy``) beserta indeks siswa dan metadata.
+Pemakai (``GraduationPredictor``, ``StudentClustering``) memuatnya dengan
+memory-map sehingga tidak ada pivot ulang dan tidak ada salinan penuh.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from config.settings import PROCESSED_DIR
+from utils.dataset_catalog import get_dataset_entry, load_dataset
+from utils.dataset_store import get_active_derived
+from utils.leger_cleaner import leger_student_keys
+
+# Naikkan jika daftar/definisi fitur berubah agar file lama dibangun ulang
+FEATURE_SCHEMA_VERSION = 1
+
+FEATURE_DTYPE = np.float32
+
+
+class FeatureMatrix:
+    """
+    Matriks fitur per siswa (baris: ``STUDENT_KEY``, kolom: nama fitur)
+
+    ``values`` bisa berupa array biasa atau memory-map read-only.
+    """
+
+    def __init__(self, values, index, columns, version=None):
+        self.values = values
+        self.index = pd.Index(index, name='STUDENT_KEY')
+        self.columns = list(columns)
+        self.version = version
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def column_group(self, prefix):
+        """Nama kolom yang diawali ``prefix`` (mis. ``'RERATA_'``)"""
+        return [column for column in self.columns if column.startswith(prefix)]
+
+    def select(self, columns=None, rows=slice(None)):
+        """
+        Array float untuk kolom dan baris tertentu
+
+        Kolom yang tidak ada di matriks (mis. mapel yang tidak diajarkan di
+        dataset ini) bernilai NaN, sehingga urutan fitur model tetap terjaga.
+        """
+        block = self.values[rows]
+        if columns is None:
+            return np.asarray(block)
+        positions = np.array([self._positions.get(column, -1) for column in columns], dtype='int64')
+        selected = block[:, np.maximum(positions, 0)].astype(FEATURE_DTYPE, copy=True)
+        selected[:, positions < 0] = np.nan
+        return selected
+
+    def take(self, keys):
+        """Matriks baru berisi baris siswa ``keys`` saja (urutan mengikuti ``keys``)"""
+        positions = self.index.get_indexer(keys)
+        if (positions < 0).any():
+            raise KeyError("Siswa tidak ada di feature store")
+        return FeatureMatrix(self.values[positions], self.index[positions], self.columns, self.version)
+
+    def to_frame(self, columns=None):
+        """DataFrame fitur (salinan) untuk tampilan atau analisis"""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame(self.select(columns), index=self.index, columns=columns)
+
+
+def build_student_features(df_clean):
+    """
+    Fitur per siswa dari data tidy leger
+
+    Parameters:
+    -----------
+    df_clean : DataFrame
+        Data tidy hasil ``clean_leger_data``
+
+    Returns:
+    --------
+    features : DataFrame
+        Satu baris per siswa (index ``STUDENT_KEY``: NISN, atau nama jika
+        NISN kosong) dengan kolom:
+
+        - ``RERATA_<mapel>``: nilai rerata per mapel
+        - ``SMT_<n>``: rata-rata semua mapel di semester n
+        - ``RATA_RATA``: rata-rata nilai rerata mapel
+        - ``TREN``: slope rata-rata per semester
+        - ``VARIANS``: varians nilai semester
+        - ``JUMLAH_KOSONG``: jumlah sel (mapel x semester/rerata) tanpa nilai
+    """
+    keys = pd.Series(leger_student_keys(df_clean['NISN'], df_clean['NAMA_SISWA']),
+                     index=df_clean.index, name='STUDENT_KEY')
+    rerata = df_clean['IS_RERATA'].to_numpy(dtype=bool)
+    nilai = df_clean['NILAI'].astype('float64')
+
+    per_subject = nilai[rerata].groupby([keys[rerata], df_clean['MAPEL_ID'][rerata]], observed=True).mean()
+    features = per_subject.unstack('MAPEL_ID')
+    features.columns = [f"RERATA_{mapel}" for mapel in features.columns]
+    rata_rata = features.mean(axis=1)
+
+    semester_values = nilai[~rerata]
+    semester_keys = keys[~rerata]
+    per_semester = semester_values.groupby(
+        [semester_keys, df_clean['SEMESTER'][~rerata]], observed=True
+    ).mean().unstack('SEMESTER')
+
+    index = features.index.union(per_semester.index)
+    features = features.reindex(index)
+    for semester in per_semester.columns:
+        features[f"SMT_{semester}"] = per_semester[semester].reindex(index)
+    features['RATA_RATA'] = rata_rata.reindex(index)
+    features['TREN'] = _row_slope(per_semester).reindex(index)
+    features['VARIANS'] = semester_values.groupby(semester_keys).var().reindex(index)
+
+    # Sel yang diharapkan: setiap mapel x (semester yang ada + rerata)
+    expected = df_clean['MAPEL_ID'].nunique() * df_clean['SEMESTER'].nunique()
+    present = nilai.notna().groupby(keys).sum().reindex(index, fill_value=0)
+    features['JUMLAH_KOSONG'] = (expected - present).clip(lower=0)
+
+    features.index.name = 'STUDENT_KEY'
+    return features
+
+
+def dataset_version(entry):
+    """Versi isi dataset katalog: berubah setiap kali data atau delta berubah"""
+    fingerprint = json.dumps([
+        FEATURE_SCHEMA_VERSION, entry['data_path'], entry.get('timestamp'),
+        entry.get('rows'), entry.get('parts', []),
+    ])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def feature_paths(data_path):
+    """Path file matriks, indeks siswa dan metadata feature store sebuah dataset"""
+    data_path = Path(data_path)
+    return {
+        'values': data_path.with_name(f"{data_path.stem}.features.npy"),
+        'index': data_path.with_name(f"{data_path.stem}.features.index.npy"),
+        'meta': data_path.with_name(f"{data_path.stem}.features.json"),
+    }
+
+
+def load_features(dataset_id, output_dir=PROCESSED_DIR):
+    """
+    Muat matriks fitur tersimpan (memory-map), atau None jika belum ada
+    atau versinya sudah tidak sesuai dataset
+    """
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if entry is None:
+        return None
+
+    paths = feature_paths(entry['data_path'])
+    try:
+        with open(paths['meta'], encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != dataset_version(entry):
+            return None
+        values = np.load(paths['values'], mmap_mode='r')
+        index = np.load(paths['index'])
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return None
+
+    return FeatureMatrix(values, index.astype(object), meta['columns'], meta['version'])
+
+
+def materialize_features(dataset_id, df_clean=None, output_dir=PROCESSED_DIR):
+    """
+    Matriks fitur dataset: dimuat dari disk jika versinya masih sesuai,
+    jika tidak dibangun dari ``df_clean`` (atau data tersimpan) lalu ditulis
+
+    Dataset yang tidak tercatat di katalog dibangun di memori saja.
+
+    Returns:
+    --------
+    features : FeatureMatrix
+    """
+    features = load_features(dataset_id, output_dir)
+    if features is not None:
+        return features
+
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if df_clean is None:
+        df_clean = load_dataset(dataset_id, output_dir)
+    frame = build_student_features(df_clean)
+    values = frame.to_numpy(dtype=FEATURE_DTYPE)
+    index = frame.index.to_numpy(dtype=str)
+
+    if entry is None:
+        return FeatureMatrix(values, frame.index, frame.columns)
+
+    version = dataset_version(entry)
+    paths = feature_paths(entry['data_path'])
+    # Tulis ke file sementara lalu rename agar pembaca tidak melihat file setengah jadi
+    for name, array in (('values', values), ('index', index)):
+        tmp_path = paths[name].with_name(f".{paths[name].name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(tmp_path, paths[name])
+    tmp_path = paths['meta'].with_name(f".{paths['meta'].name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'schema_version': FEATURE_SCHEMA_VERSION,
+                   'columns': list(frame.columns), 'rows': len(frame)}, f, indent=2)
+    os.replace(tmp_path, paths['meta'])
+
+    return load_features(dataset_id, output_dir)
+
+
+def get_active_features():
+    """
+    ``FeatureMatrix`` dataset aktif, dimuat/dibangun sekali per dataset;
+    None jika data bukan data tidy leger
+    """
+    dataset_id = st.session_state.get('dataset_id')
+
+    def build(df):
+        required = {'NISN', 'NAMA_SISWA', 'MAPEL_ID', 'SEMESTER', 'NILAI', 'IS_RERATA'}
+        if not required.issubset(df.columns):
+            return None
+        return materialize_features(dataset_id, df)
+
+    return get_active_derived('feature_matrix', build)
+
+
+def _row_slope(frame):
+    """Slope regresi linear setiap baris terhadap label kolom (NaN diabaikan)"""
+    y = frame.to_numpy(dtype='float64')
+    x = np.broadcast_to(frame.columns.to_numpy(dtype='float64'), y.shape)
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    sum_x, sum_y = x.sum(axis=1), y.sum(axis=1)
+    denominator = n * (x * x).sum(axis=1) - sum_x ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denominator > 0, (n * (x * y).sum(axis=1) - sum_x * sum_y) / denominator, np.nan)
+    return pd.Series(slope, index=frame.index)
@@ -0,0 +1,474 @@
+"""
+Modul antrean job latar belakang
+
+Proses panjang (pembersihan + penyimpanan upload, export laporan, training
+model) dijalankan di thread pool proses server, bukan di thread script
+Streamlit, sehingga UI tetap responsif. Status setiap job (antre, berjalan,
+selesai, gagal), progress dan hasilnya dicatat di tabel SQLite di disk:
+halaman mana pun bisa membaca status job lewat ``job_id``, dan sesi yang
+sudah ditutup bisa kembali mengambil hasil job yang sudah selesai. Setiap
+job mencatat pemiliknya (``owner``); ``get``/``list`` dengan ``owner`` hanya
+mengembalikan job milik pemilik tersebut.
+
+Handler job didaftarkan per jenis dengan ``job_handler`` dan dipanggil
+``handler(job, params)``; ``job.progress(fraksi, pesan)`` melaporkan
+progress nyata, nilai kembaliannya (dict JSON) menjadi hasil job.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+from config.settings import JOB_DB_PATH, JOB_DIR, JOB_KEEP, JOB_WORKERS
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+JOB_KIND_CLEAN = 'clean_upload'
+JOB_KIND_EXPORT = 'export_report'
+JOB_KIND_TRAIN = 'train_model'
+
+# Jeda minimum antar penulisan progress ke tabel job (detik)
+PROGRESS_INTERVAL = 0.25
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    pid INTEGER,
+    owner TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+)
+"""
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """Dekorator: daftarkan ``func(job, params)`` sebagai handler job ``kind``"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+class JobContext:
+    """Konteks job yang sedang berjalan: ID, direktori kerja, pelapor progress"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self.dir = queue.job_dir(job_id)
+        self._last_write = 0.0
+        self._last_message = None
+
+    def progress(self, fraction, message=None):
+        """Catat progress (0-1); penulisan ke disk dibatasi ``PROGRESS_INTERVAL``"""
+        now = time.monotonic()
+        if message == self._last_message and fraction < 1 and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write, self._last_message = now, message
+        self.queue._update(self.job_id, progress=min(max(float(fraction), 0.0), 1.0), message=message)
+
+
+class JobQueue:
+    """
+    Antrean job dengan thread pool dan tabel job SQLite
+
+    Job yang tercatat masih antre/berjalan oleh proses lain (server sudah
+    berhenti) ditandai gagal saat antrean dibuat.
+    """
+
+    def __init__(self, db_path=JOB_DB_PATH, job_root=JOB_DIR, max_workers=JOB_WORKERS):
+        self.db_path = Path(db_path)
+        self.job_root = Path(job_root)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            # Tabel dari versi sebelum job punya pemilik
+            if 'owner' not in {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status IN (?, ?) AND pid != ?",
+                (JOB_FAILED, "Proses terhenti sebelum selesai (server dimulai ulang)", _now(),
+                 JOB_QUEUED, JOB_RUNNING, os.getpid())
+            )
+
+    def submit(self, kind, params=None, files=None, owner=None):
+        """
+        Masukkan job ke antrean
+
+        Parameters:
+        -----------
+        kind : str
+            Jenis job (handler terdaftar, mis. ``JOB_KIND_CLEAN``)
+        params : dict, optional
+            Parameter job (harus bisa diserialisasi JSON)
+        files : dict, optional
+            Nama file -> isi (bytes) yang disalin ke direktori job sebelum
+            job berjalan, tersedia di handler lewat ``job.dir / 'input'``
+        owner : str, optional
+            Pemilik job (mis. token sesi pengguna) untuk filter ``get``/``list``
+
+        Returns:
+        --------
+        job_id : str
+        """
+        if kind not in _handlers:
+            raise ValueError(f"Jenis job tidak dikenal: {kind}")
+
+        job_id = uuid.uuid4().hex[:16]
+        if files:
+            input_dir = self.job_dir(job_id) / 'input'
+            input_dir.mkdir(parents=True, exist_ok=True)
+            for name, data in files.items():
+                (input_dir / Path(name).name).write_bytes(bytes(data))
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, pid, owner, created_at, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, json.dumps(params or {}), os.getpid(), owner, _now(),
+                 "Menunggu antrean...")
+            )
+        self._prune()
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id, owner=None):
+        """
+        Status job sebagai dict (``params``/``result`` sudah di-decode), atau
+        None jika tidak ada (atau bukan milik ``owner`` bila diberikan)
+        """
+        query, args = "SELECT * FROM jobs WHERE job_id = ?", [job_id]
+        if owner is not None:
+            query += " AND owner = ?"
+            args.append(owner)
+        with self._connect() as conn:
+            row = conn.execute(query, args).fetchone()
+        return _decode(row)
+
+    def list(self, kinds=None, limit=20, owner=None):
+        """Job terbaru (opsional hanya jenis ``kinds`` dan milik ``owner``), terbaru dahulu"""
+        conditions, args = [], []
+        if kinds:
+            conditions.append(f"kind IN ({','.join('?' * len(kinds))})")
+            args.extend(kinds)
+        if owner is not None:
+            conditions.append("owner = ?")
+            args.append(owner)
+        query = "SELECT * FROM jobs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        args.append(limit)
+        with self._connect() as conn:
+            return [_decode(row) for row in conn.execute(query, args).fetchall()]
+
+    def wait(self, job_id, timeout=None, interval=0.05):
+        """Tunggu job selesai/gagal (dipakai di test dan skrip)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (JOB_DONE, JOB_FAILED):
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} belum selesai")
+            time.sleep(interval)
+
+    def job_dir(self, job_id):
+        """Direktori kerja job (file input dan hasil)"""
+        return self.job_root / job_id
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        self._update(job_id, status=JOB_RUNNING, started_at=_now(), message="Memulai...")
+        context = JobContext(self, job_id)
+        try:
+            result = _handlers[job['kind']](context, job['params'])
+        except Exception as e:
+            self._update(job_id, status=JOB_FAILED, error=str(e) or type(e).__name__, finished_at=_now())
+        else:
+            self._update(job_id, status=JOB_DONE, progress=1.0, message="Selesai",
+                         result=json.dumps(result or {}, default=str), finished_at=_now())
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def _prune(self, keep=JOB_KEEP):
+        """Hapus job selesai/gagal yang lebih lama dari ``keep`` job terbaru beserta direktorinya"""
+        with self._connect() as conn:
+            old = [row['job_id'] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) ORDER BY created_at DESC, rowid DESC "
+                "LIMIT -1 OFFSET ?", (JOB_DONE, JOB_FAILED, keep)
+            )]
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in old])
+        for job_id in old:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def _connect(self):
+        # Satu koneksi per operasi: aman dipakai dari thread mana pun
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return _ClosingConnection(conn)
+
+
+class _ClosingConnection:
+    """Context manager yang menutup koneksi SQLite setelah dipakai"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Antrean job bersama untuk proses ini (dibuat saat pertama dipakai)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def _decode(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job['params'] = json.loads(job['params'] or '{}')
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def _now():
+    return datetime.now().isoformat(timespec='milliseconds')
+
+
+# ============================================
+# HANDLER JOB
+# ============================================
+
+class _StoredUpload(BytesIO):
+    """File input job dengan antarmuka mirip ``UploadedFile`` (name, size, getbuffer)"""
+
+    def __init__(self, path):
+        super().__init__(Path(path).read_bytes())
+        self.name = Path(path).name
+        self.size = len(self.getbuffer())
+
+
+def _load_dataset(dataset_id):
+    """Dataset dari registry bersama proses ini, atau dari katalog"""
+    from utils.dataset_catalog import load_dataset
+    from utils.dataset_store import get_dataset_store
+
+    df = get_dataset_store().get(dataset_id)
+    if df is not None:
+        return df
+    try:
+        return load_dataset(dataset_id)
+    except KeyError:
+        raise ValueError("Dataset tidak ditemukan; silakan upload ulang data") from None
+
+
+@job_handler(JOB_KIND_CLEAN)
+def _clean_upload(job, params):
+    """
+    Bersihkan file upload lalu simpan
+
+    Parameters (``params``):
+    ``file_type``, ``multi_file``, ``upload_name``, ``source_hash``,
+    ``auto_save``. Hasil: ``dataset_id``, ``data_path``, ``catalogued``,
+    ``rows``, ``errors`` dan ``downloads`` (path file CSV/XLSX hasil
+    pembersihan di direktori job; XLSX None jika melebihi batas Excel).
+    """
+    from utils.data_processor import process_excel
+    from utils.dataset_catalog import find_dataset_by_hash, register_dataset
+    from utils.leger_batch import clean_leger_batch
+    from utils.leger_cleaner import CLEANER_VERSION, save_clean_data
+    from utils.report_engine import write_report
+
+    paths = sorted((job.dir / 'input').iterdir())
+    errors = []
+    job.progress(0.05, "📖 Membaca file...")
+
+    if params['multi_file']:
+        def report_sheet(done, total, kelas, sheet):
+            job.progress(0.05 + 0.7 * done / total, f"⚙️ Sheet {done}/{total} selesai: {kelas} / {sheet}")
+
+        df_clean, errors = clean_leger_batch([str(path) for path in paths], progress_callback=report_sheet)
+    else:
+        job.progress(0.1, "⚙️ Memproses data...")
+        file_type = 'leger' if params['file_type'] == "Data Leger" else 'general'
+        df_clean, _ = process_excel(_StoredUpload(paths[0]), file_type)
+
+    if df_clean.empty:
+        raise ValueError("Data kosong atau format tidak sesuai")
+    job.progress(0.75, f"💾 Menyimpan {len(df_clean):,} baris...")
+
+    source_hash = params['source_hash']
+    entry = find_dataset_by_hash(source_hash) if params['auto_save'] else None
+    if entry is not None:
+        result = {'dataset_id': entry['dataset_id'], 'data_path': entry['data_path'], 'existing': True}
+    elif params['auto_save']:
+        save_results = save_clean_data(df_clean)
+        job.progress(0.95, "🗂️ Mencatat dataset ke katalog...")
+        entry = register_dataset(save_results, df_clean, source_name=params['upload_name'],
+                                 source_hash=source_hash, file_type=params['file_type'])
+        result = {'dataset_id': entry['dataset_id'], 'data_path': entry['data_path'], 'existing': False}
+    else:
+        # Tanpa simpan otomatis: data disimpan di direktori job saja
+        save_results = save_clean_data(df_clean, output_dir=str(job.dir))
+        # Mode proses dan versi cleaner ikut di id: file sama yang diproses
+        # berbeda tidak berbagi DataFrame di DatasetStore
+        mode = 'multi' if params['multi_file'] else ('leger' if params['file_type'] == "Data Leger" else 'general')
+        dataset_id = f"upload_{mode}_v{CLEANER_VERSION.replace('.', '')}_{source_hash[:16]}"
+        result = {'dataset_id': dataset_id, 'data_path': save_results['data_path']}
+
+    # File download dibangun sekali di sini; halaman hanya membacanya dari disk
+    job.progress(0.97, "📦 Menyiapkan file download...")
+    output_stem = job.dir / 'output' / f"cleaned_{params['upload_name'].rsplit('.', 1)[0]}"
+    downloads = {'csv': str(write_report(df_clean, output_stem.with_suffix('.csv'))), 'xlsx': None}
+    try:
+        downloads['xlsx'] = str(write_report(df_clean, output_stem.with_suffix('.xlsx'), 'Excel',
+                                             sheet_name='Data_Lengkap'))
+    except ValueError:
+        # Melebihi batas baris Excel
+        pass
+
+    shutil.rmtree(job.dir / 'input', ignore_errors=True)
+    return {
+        **result,
+        'downloads': downloads,
+        'catalogued': params['auto_save'],
+        'rows': len(df_clean),
+        'upload_name': params['upload_name'],
+        'file_type': params['file_type'],
+        'errors': errors,
+    }
+
+
+@job_handler(JOB_KIND_EXPORT)
+def _export_report(job, params):
+    """
+    Bangun dan tulis laporan (lihat ``utils.report_engine``)
+
+    Parameters (``params``): ``dataset_id``, ``report_type``, ``format``
+    ('CSV'/'Excel'/'PDF'), ``semesters``, ``subjects``, ``date_range``
+    (tanggal ISO), ``kkm``, dan untuk rapor PDF ``report_cards`` + ``bundle``.
+    File laporan ditulis di direktori job sendiri (``output/``) sehingga
+    umurnya mengikuti job dan tidak dipangkas oleh ekspor sesi lain.
+    Hasil: ``path``, ``rows`` dan ``preview`` (10 baris pertama, JSON split).
+    """
+    from utils.dataset_store import get_dataset_store
+    from utils.report_engine import build_report, export_report, export_report_cards, filter_leger
+
+    job.progress(0.05, "📂 Memuat data...")
+    dataset_id = params['dataset_id']
+    df = _load_dataset(dataset_id)
+    output_dir = job.dir / 'output'
+
+    if params.get('report_cards'):
+        counts = {}
+
+        def report_progress(done, total):
+            counts['total'] = total
+            job.progress(0.05 + 0.9 * done / total, f"🖨️ Merender rapor {done:,}/{total:,} siswa")
+
+        path = export_report_cards(
+            filter_leger(df, subjects=params.get('subjects'), date_range=params.get('date_range')),
+            kkm=params['kkm'], bundle=params['bundle'], output_dir=output_dir, progress=report_progress
+        )
+        return {'path': str(path), 'rows': counts.get('total', 0), 'preview': None}
+
+    # Agregat dataset dipakai jika sudah dibangun sesi lain; jika belum, dibangun di job ini
+    store = get_dataset_store()
+    job.progress(0.2, "📊 Menyusun laporan...")
+    report = build_report(
+        params['report_type'], df,
+        cube=store.peek_derived(dataset_id, 'aggregate_cube'),
+        risk_index=store.peek_derived(dataset_id, 'risk_index'),
+        semesters=params.get('semesters'), subjects=params.get('subjects'),
+        date_range=params.get('date_range'), kkm=params['kkm']
+    )
+    job.progress(0.6, f"💾 Menulis {len(report):,} baris ({params['format']})...")
+    path = export_report(report, params['report_type'], params['format'], output_dir=output_dir)
+    return {'path': str(path), 'rows': len(report), 'preview': report.head(10).to_json(orient='split')}
+
+
+@job_handler(JOB_KIND_TRAIN)
+def _train_model(job, params):
+    """
+    Latih dan simpan model prediksi kelulusan
+
+    Parameters (``params``): ``dataset_id`` dan ``kkm`` (label proksi). Jika
+    file input ``labels.csv`` (kolom KEY, LULUS) ada, label tersebut dipakai;
+    dengan label proksi, fitur rerata mapel tidak ikut dilatih.
+    Model disimpan sebagai artefak berversi per dataset dan sumber label
+    (``model_file``) agar bisa diambil sesi mana pun.
+    Hasil: versi artefak dan akurasi holdout.
+    """
+    import pandas as pd
+
+    from models.prediction_model import (
+        GraduationPredictor,
+        make_proxy_labels,
+        model_file,
+        proxy_feature_columns
+    )
+    from utils.feature_store import materialize_features
+
+    job.progress(0.05, "🧮 Menyiapkan feature store...")
+    features = materialize_features(params['dataset_id'], _load_dataset(params['dataset_id']))
+    label_file = job.dir / 'input' / 'labels.csv'
+    if label_file.exists():
+        labels = pd.read_csv(label_file, dtype={'KEY': str}).set_index('KEY')['LULUS'].astype('int8')
+        labels = labels[~labels.index.duplicated(keep='last')]
+        columns, label_source = None, 'historis'
+    else:
+        # Fitur dasar label proksi tidak dipakai (lihat ``proxy_feature_columns``)
+        labels = make_proxy_labels(features, params['kkm'])
+        columns, label_source = proxy_feature_columns(features), 'proksi'
+    if labels.nunique() < 2:
+        raise ValueError("Label hanya berisi satu kelas; model tidak dapat dilatih")
+
+    job.progress(0.3, f"🤖 Melatih model ({len(labels):,} siswa)...")
+    predictor = GraduationPredictor()
+    accuracy = predictor.evaluate(features.take(labels.index), labels.to_numpy(), columns=columns)
+    predictor.metadata.update({'label_source': label_source, 'kkm': params.get('kkm')})
+    job.progress(0.9, "💾 Menyimpan model...")
+    manifest = predictor.save_model(model_file(params['dataset_id'], label_source), dataset_id=params['dataset_id'])
+    return {'artifact_version': manifest['artifact_version'], 'accuracy': accuracy, 'n_train': len(labels)}
@@ -0,0 +1,145 @@
+"""
+Modul untuk memproses banyak file dan sheet leger sekaligus secara paralel
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import LEGER_BATCH_SIZE
+from utils.leger_cache import get_leger_cache
+from utils.leger_cleaner import concat_leger_batches, iter_leger_batches
+
+
+def list_leger_sheets(source):
+    """Daftar nama sheet dalam satu workbook leger"""
+    with pd.ExcelFile(source) as workbook:
+        return list(workbook.sheet_names)
+
+
+def clean_leger_batch(files, max_workers=None, progress_callback=None):
+    """
+    Bersihkan setiap sheet dari setiap file leger secara paralel
+
+    Setiap sheet menjadi satu job di process pool. Hasil digabung menjadi
+    satu DataFrame tidy dengan kolom sumber ``KELAS`` (nama file tanpa
+    ekstensi) dan ``SHEET`` (nama sheet).
+
+    Parameters:
+    -----------
+    files : list
+        File leger: UploadedFile, path, atau tuple ``(nama, bytes)``
+    max_workers : int, optional
+        Jumlah proses (default: jumlah CPU)
+    progress_callback : callable, optional
+        Dipanggil ``progress_callback(selesai, total, kelas, sheet)``
+        setiap kali satu sheet selesai diproses
+
+    Returns:
+    --------
+    df_clean : DataFrame
+        Data tidy gabungan semua sheet
+    errors : list of dict
+        Sheet yang gagal diproses beserta pesan error-nya
+    """
+    # Worker hanya menerima path workbook, bukan isi file: upload ditulis
+    # sekali ke direktori sementara, bukan dipickle ulang untuk setiap sheet
+    with tempfile.TemporaryDirectory(prefix='leger_batch_') as staging_dir:
+        cache = get_leger_cache()
+        jobs = []
+        for i, file in enumerate(files):
+            name, path, data = _stage_source(file, staging_dir, i)
+            kelas = Path(name).stem
+            for sheet in list_leger_sheets(path):
+                jobs.append((kelas, sheet, path, cache.make_key(data, sheet)))
+            del data
+
+        return _run_sheet_jobs(jobs, cache, max_workers, progress_callback)
+
+
+def _run_sheet_jobs(jobs, cache, max_workers, progress_callback):
+    """Bersihkan ``(kelas, sheet, path, kunci_cache)`` lalu gabungkan hasilnya"""
+    results = []
+    errors = []
+    total = len(jobs)
+    done = 0
+
+    def collect(kelas, sheet, get_result, cache_key=None):
+        nonlocal done
+        try:
+            df_sheet = get_result()
+        except Exception as e:
+            errors.append({'kelas': kelas, 'sheet': sheet, 'error': str(e)})
+        else:
+            if cache_key:
+                cache.put(cache_key, df_sheet)
+            if not df_sheet.empty:
+                results.append(df_sheet.assign(KELAS=kelas, SHEET=sheet))
+
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, kelas, sheet)
+
+    # Sheet yang sudah pernah dibersihkan diambil dari cache
+    pending = []
+    for kelas, sheet, path, key in jobs:
+        df_cached = cache.get(key)
+        if df_cached is None:
+            pending.append((kelas, sheet, path, key))
+        else:
+            collect(kelas, sheet, lambda: df_cached)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(pending))
+
+    if workers <= 1:
+        # Satu sheet saja: tidak perlu overhead process pool
+        for kelas, sheet, path, key in pending:
+            collect(kelas, sheet, lambda: _clean_sheet_job(path, sheet), key)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_clean_sheet_job, path, sheet): (kelas, sheet, key)
+                for kelas, sheet, path, key in pending
+            }
+            for future in as_completed(futures):
+                kelas, sheet, key = futures[future]
+                collect(kelas, sheet, future.result, key)
+
+    if not results:
+        return pd.DataFrame(), errors
+
+    # Urutkan sesuai urutan file/sheet, bukan urutan selesai
+    order = {(kelas, sheet): i for i, (kelas, sheet, _, _) in enumerate(jobs)}
+    results.sort(key=lambda df: order[(df['KELAS'].iat[0], df['SHEET'].iat[0])])
+
+    df_clean = concat_leger_batches(results)
+    df_clean['KELAS'] = df_clean['KELAS'].astype('category')
+    df_clean['SHEET'] = df_clean['SHEET'].astype('category')
+
+    return df_clean, errors
+
+
+def _stage_source(file, staging_dir, position):
+    """
+    ``(nama, path, bytes)`` dari UploadedFile, path, atau tuple; isi yang
+    tidak berasal dari path ditulis ke ``staging_dir``
+    """
+    if isinstance(file, (str, Path)):
+        return str(file), str(file), Path(file).read_bytes()
+
+    if isinstance(file, tuple):
+        name, data = file
+    else:
+        name, data = file.name, file.getbuffer()
+
+    path = Path(staging_dir) / f"{position:03d}_{Path(name).name}"
+    path.write_bytes(data)
+    return name, str(path), data
+
+
+def _clean_sheet_job(path, sheet_name):
+    """Job worker: bersihkan satu sheet dari workbook di ``path``"""
+    batches = iter_leger_batches(path, sheet_name=sheet_name, batch_size=LEGER_BATCH_SIZE)
+    return concat_leger_batches(batches)
@@ -0,0 +1,150 @@
+"""
+Modul cache hasil pembersihan leger di disk
+
+Kunci cache adalah hash isi file (bytes) ditambah versi cleaner, sehingga
+upload ulang leger yang sama, dari sesi mana pun, langsung memakai hasil
+yang sudah ada. Data disimpan sebagai Parquet (dtype ringkas tetap terjaga)
+dan ukuran total dibatasi dengan eviksi LRU.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import LEGER_CACHE_DIR, LEGER_CACHE_MAX_MB
+from utils.leger_cleaner import CLEANER_VERSION, clean_leger_data
+
+
+class LegerCache:
+    """
+    Cache DataFrame tidy di disk dengan eviksi LRU berdasarkan ukuran
+
+    Waktu akses terakhir dicatat lewat mtime file, sehingga urutan LRU
+    tetap berlaku lintas restart server.
+    """
+
+    def __init__(self, cache_dir=LEGER_CACHE_DIR, max_bytes=LEGER_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, data, sheet_name=None):
+        """Kunci cache: hash isi file + versi cleaner + nama sheet"""
+        digest = hashlib.sha256(data)
+        digest.update(f"\0{CLEANER_VERSION}\0{sheet_name}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Ambil DataFrame dari cache, atau None jika tidak ada"""
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, key, df):
+        """Simpan DataFrame ke cache lalu jalankan eviksi jika perlu"""
+        if df.empty:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Tulis ke file sementara lalu rename agar pembaca tidak melihat file setengah jadi
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._path(key))
+
+        self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Ambil dari cache, atau hitung dengan ``compute()`` lalu simpan"""
+        df = self.get(key)
+        if df is None:
+            df = compute()
+            self.put(key, df)
+        return df
+
+    def stats(self):
+        """Statistik cache: hit, miss, jumlah entri dan ukuran total"""
+        files = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(files),
+            'size_mb': sum(size for _, size, _ in files) / (1024 * 1024),
+        }
+
+    def clear(self):
+        """Hapus semua entri cache"""
+        for path, _, _ in self._entries():
+            path.unlink(missing_ok=True)
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.parquet"
+
+    def _entries(self):
+        """List ``(path, ukuran, mtime)`` semua entri cache"""
+        if not self.cache_dir.exists():
+            return []
+
+        entries = []
+        for path in self.cache_dir.glob('*.parquet'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        """Hapus entri yang paling lama tidak diakses sampai di bawah batas ukuran"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+_leger_cache = None
+_leger_cache_lock = threading.Lock()
+
+
+def get_leger_cache():
+    """Instance cache leger bersama untuk seluruh proses (semua sesi)"""
+    global _leger_cache
+    with _leger_cache_lock:
+        if _leger_cache is None:
+            _leger_cache = LegerCache()
+        return _leger_cache
+
+
+def cached_clean_leger_data(data, sheet_name=None):
+    """
+    Versi ``clean_leger_data`` dengan cache berbasis hash isi file
+
+    Parameters:
+    -----------
+    data : bytes or memoryview
+        Isi file Excel
+    sheet_name : str, optional
+        Nama sheet (default: sheet pertama)
+    """
+    cache = get_leger_cache()
+    key = cache.make_key(data, sheet_name)
+    return cache.get_or_compute(key, lambda: clean_leger_data(data, sheet_name=sheet_name))
@@ -3,17 +3,46 @@ Modul untuk membersihkan data leger nilai rapor dari format Excel ke format tidy
 """
 import pandas as pd
 import numpy as np
+import tempfile
+from io import BytesIO
 from pathlib import Path
+from openpyxl import load_workbook
+import pyarrow as pa
+import pyarrow.feather as pa_feather
+import pyarrow.parquet as pq
 import streamlit as st
 
+from config.settings import PROCESSED_DATA_FORMAT, PROCESSED_DIR
+from utils.xlsx_writer import write_xlsx
+
+# Versi logika pembersihan; naikkan jika hasil clean_leger_data berubah
+# agar cache leger yang lama tidak dipakai lagi
+CLEANER_VERSION = '2.0'
+
+# Tata letak leger: 4 kolom identitas (NO, NAMA, NISN, NIS) lalu
+# setiap mata pelajaran menempati 7 kolom (Smt1-Smt6 + Rerata)
+KOLOM_IDENTITAS = 4
+KOLOM_PER_MAPEL = 7
+KOMPONEN_LABELS = ['Smt1', 'Smt2', 'Smt3', 'Smt4', 'Smt5', 'Smt6', 'Rerata']
+
+TIDY_COLUMNS = [
+    'NO', 'NAMA_SISWA', 'NISN', 'NIS', 'MAPEL_ID',
+    'KOMPONEN', 'SEMESTER', 'NILAI', 'IS_RERATA'
+]
+
+# Hash isi per kelompok (siswa, semester) untuk update inkremental
+HASH_COLUMNS = ['STUDENT_KEY', 'SEMESTER', 'HASH', 'ROWS']
+
+
 def clean_leger_data(file_path, sheet_name=None):
     """
     Fungsi utama untuk membersihkan data leger nilai rapor
     
     Parameters:
     -----------
-    file_path : str
-        Path ke file Excel
+    file_path : str, bytes, or file-like
+        Path ke file Excel, isi file (bytes/memoryview), atau buffer
+        seperti ``UploadedFile``/``BytesIO`` (dibaca langsung dari memori)
     sheet_name : str, optional
         Nama sheet (default: sheet pertama)
     
@@ -24,6 +53,8 @@ def clean_leger_data(file_path, sheet_name=None):
     """
     
     try:
+        file_path = as_excel_source(file_path)
+        
         # Load data dari Excel
         if sheet_name:
             df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
@@ -34,110 +65,447 @@ def clean_leger_data(file_path, sheet_name=None):
         if isinstance(df, dict):
             df = df[list(df.keys())[0]]
         
-        # Find data start position
-        data_start = 0
-        for i in range(len(df)):
-            row_text = ' '.join([str(val).upper() for val in df.iloc[i].values if pd.notna(val)])
-            if 'SMT1' in row_text or 'SMT2' in row_text:
-                data_start = i + 1
-                break
-        
-        # Extract data
-        df_data = df.iloc[data_start:].reset_index(drop=True)
-        
-        # Initialize list untuk menyimpan data
-        data_list = []
-        
-        # Process setiap baris
-        for idx, row in df_data.iterrows():
-            # Ambil identitas siswa
-            no = row.iloc[0]
-            nama = row.iloc[1]
-            nisn = row.iloc[2]
-            nis = row.iloc[3]
-            
-            # Skip jika baris kosong
-            if pd.isna(no) or pd.isna(nama):
-                continue
-            
-            # Clean identitas
-            try:
-                no = int(float(no))
-                nisn = str(int(float(nisn))) if pd.notna(nisn) else None
-                nis = str(int(float(nis))) if pd.notna(nis) else None
-                nama = str(nama).strip()
-            except:
-                continue
-            
-            # Process nilai dari kolom 4 sampai akhir
-            # Asumsi: setiap 7 kolom = 1 mata pelajaran (Smt1-6 + Rerata)
-            col_idx = 4
-            mapel_num = 1
-            
-            while col_idx < len(row):
-                # Ambil 7 kolom untuk 1 mata pelajaran
-                for i in range(7):
-                    if col_idx + i >= len(row):
-                        break
-                    
-                    nilai = row.iloc[col_idx + i]
-                    
-                    if pd.notna(nilai):
-                        try:
-                            # Convert nilai (handle koma)
-                            if isinstance(nilai, str):
-                                nilai = float(nilai.replace(',', '.'))
-                            else:
-                                nilai = float(nilai)
-                            
-                            # Validasi range
-                            if 0 <= nilai <= 100:
-                                # Tentukan komponen
-                                if i < 6:
-                                    komponen = f"Smt{i+1}"
-                                    semester = i + 1
-                                    is_rerata = False
-                                else:
-                                    komponen = "Rerata"
-                                    semester = 0
-                                    is_rerata = True
-                                
-                                data_list.append({
-                                    'NO': no,
-                                    'NAMA_SISWA': nama,
-                                    'NISN': nisn,
-                                    'NIS': nis,
-                                    'MAPEL_ID': f"Mapel_{mapel_num}",
-                                    'KOMPONEN': komponen,
-                                    'SEMESTER': semester,
-                                    'NILAI': nilai,
-                                    'IS_RERATA': is_rerata
-                                })
-                        except:
-                            pass
-                
-                col_idx += 7
-                mapel_num += 1
-        
-        # Create DataFrame
-        df_clean = pd.DataFrame(data_list)
-        
-        # Optimize dtypes
-        if not df_clean.empty:
-            df_clean['NO'] = df_clean['NO'].astype('int16')
-            df_clean['SEMESTER'] = df_clean['SEMESTER'].astype('int8')
-            df_clean['NILAI'] = df_clean['NILAI'].astype('float32')
-            df_clean['IS_RERATA'] = df_clean['IS_RERATA'].astype('bool')
-            df_clean['MAPEL_ID'] = df_clean['MAPEL_ID'].astype('category')
-            df_clean['KOMPONEN'] = df_clean['KOMPONEN'].astype('category')
-        
-        return df_clean
+        return reshape_leger(df)
         
     except Exception as e:
         st.error(f"Error dalam membersihkan data: {str(e)}")
         return pd.DataFrame()
 
 
+def find_data_start(df):
+    """
+    Cari baris pertama data siswa (baris setelah header Smt1/Smt2)
+    """
+    for i in range(len(df)):
+        row_text = ' '.join([str(val).upper() for val in df.iloc[i].values if pd.notna(val)])
+        if 'SMT1' in row_text or 'SMT2' in row_text:
+            return i + 1
+    return 0
+
+
+def reshape_leger(df):
+    """
+    Ubah sheet leger mentah (format lebar) menjadi format tidy secara vektor
+    
+    Seluruh blok nilai diparsing sekaligus (koma desimal dan validasi
+    rentang 0-100 dilakukan pada satu array, bukan per sel), lalu sel yang valid
+    diambil dengan satu kali ``np.nonzero`` sehingga urutan baris hasil
+    sama dengan pembacaan baris-per-baris.
+    
+    Parameters:
+    -----------
+    df : DataFrame
+        Sheet leger mentah hasil ``pd.read_excel(header=None)``
+    
+    Returns:
+    --------
+    df_clean : DataFrame
+        Data tidy dengan kolom ``TIDY_COLUMNS``
+    """
+    return reshape_leger_rows(df.iloc[find_data_start(df):])
+
+
+def reshape_leger_rows(df_data):
+    """
+    Sama seperti ``reshape_leger`` untuk baris data saja (tanpa header),
+    dipakai juga oleh mode streaming untuk setiap batch baris
+    """
+    if df_data.shape[1] < KOLOM_IDENTITAS:
+        return pd.DataFrame()
+    
+    valid, no, nama, nisn, nis = parse_leger_identity(df_data)
+    
+    df_data = df_data[valid]
+    if df_data.empty or df_data.shape[1] <= KOLOM_IDENTITAS:
+        return pd.DataFrame()
+    
+    # Blok nilai: parsing koma desimal dan mask rentang 0-100 sekaligus
+    block = df_data.iloc[:, KOLOM_IDENTITAS:]
+    nilai = _parse_numeric(pd.Series(block.to_numpy().ravel())).reshape(block.shape)
+    with np.errstate(invalid='ignore'):
+        mask = (nilai >= 0) & (nilai <= 100)
+    
+    rows, cols = np.nonzero(mask)
+    if len(rows) == 0:
+        return pd.DataFrame()
+    
+    komponen_idx = cols % KOLOM_PER_MAPEL
+    mapel_idx = cols // KOLOM_PER_MAPEL
+    mapel_labels = [f"Mapel_{i + 1}" for i in range(mapel_idx.max() + 1)]
+    is_rerata = komponen_idx == KOLOM_PER_MAPEL - 1
+    
+    df_clean = pd.DataFrame({
+        'NO': no[rows].astype('int16'),
+        'NAMA_SISWA': nama[rows],
+        'NISN': nisn[rows],
+        'NIS': nis[rows],
+        'MAPEL_ID': _categorical_from_codes(mapel_idx, mapel_labels),
+        'KOMPONEN': _categorical_from_codes(komponen_idx, KOMPONEN_LABELS),
+        'SEMESTER': np.where(is_rerata, 0, komponen_idx + 1).astype('int8'),
+        'NILAI': nilai[rows, cols].astype('float32'),
+        'IS_RERATA': is_rerata,
+    })
+    
+    return df_clean
+
+
+def parse_leger_identity(df_data):
+    """
+    Parsing kolom identitas (NO, NAMA, NISN, NIS) dari baris data leger mentah
+    
+    Returns:
+    --------
+    valid : ndarray of bool
+        Baris dengan identitas valid (baris lain dilewati saat reshape)
+    no, nama, nisn, nis : ndarray
+        Identitas untuk baris yang valid saja
+    """
+    no = _parse_numeric(df_data.iloc[:, 0])
+    nisn = _parse_numeric(df_data.iloc[:, 2])
+    nis = _parse_numeric(df_data.iloc[:, 3])
+    
+    # Baris kosong atau identitas tidak valid dilewati
+    valid = (
+        df_data.iloc[:, 0].notna().to_numpy()
+        & df_data.iloc[:, 1].notna().to_numpy()
+        & np.isfinite(no)
+        & (df_data.iloc[:, 2].isna().to_numpy() | np.isfinite(nisn))
+        & (df_data.iloc[:, 3].isna().to_numpy() | np.isfinite(nis))
+    )
+    
+    no = no[valid].astype('int64')
+    nama = df_data.iloc[:, 1][valid].astype(str).str.strip().to_numpy(dtype=object)
+    
+    return valid, no, nama, _id_to_str(nisn[valid]), _id_to_str(nis[valid])
+
+
+def leger_student_keys(nisn, nama):
+    """
+    Kunci siswa untuk pembaruan inkremental: NISN, atau nama jika NISN kosong
+    """
+    nisn = pd.Series(nisn, dtype=object)
+    nama = pd.Series(nama, dtype=object, index=nisn.index)
+    return nisn.where(nisn.notna(), 'NAMA:' + nama.astype(str)).to_numpy(dtype=object)
+
+
+def merge_leger_delta(df_clean, df_delta):
+    """
+    Terapkan delta (upsert) ke data tidy
+    
+    Setiap kelompok (siswa, SEMESTER) yang muncul di ``df_delta`` menggantikan
+    seluruh baris kelompok yang sama di ``df_clean``. Baris delta dengan
+    NILAI kosong adalah penanda hapus (kelompok yang kini tidak punya nilai).
+    Kolom tambahan ``df_clean`` di luar ``TIDY_COLUMNS`` (mis. KELAS/SHEET
+    dataset multi-file) ikut dipertahankan; baris delta yang tidak
+    membawanya bernilai kosong di kolom tersebut.
+    
+    Parameters:
+    -----------
+    df_clean : DataFrame
+        Data tidy lama
+    df_delta : DataFrame
+        Data tidy baru untuk kelompok yang berubah
+    
+    Returns:
+    --------
+    df_merged : DataFrame
+        Data tidy gabungan, terurut per siswa (NO)
+    """
+    if df_delta.empty:
+        return df_clean
+    
+    delta_keys = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_delta['NISN'], df_delta['NAMA_SISWA']),
+        df_delta['SEMESTER'].to_numpy(),
+    ])
+    
+    if df_clean.empty:
+        kept = df_clean
+    else:
+        base_keys = pd.MultiIndex.from_arrays([
+            leger_student_keys(df_clean['NISN'], df_clean['NAMA_SISWA']),
+            df_clean['SEMESTER'].to_numpy(),
+        ])
+        kept = df_clean[~base_keys.isin(delta_keys)]
+    
+    added = df_delta[df_delta['NILAI'].notna()]
+    frames = [df for df in (kept, added) if not df.empty] or [kept]
+    df_merged = pd.concat(frames, ignore_index=True)
+    df_merged = df_merged.sort_values('NO', kind='mergesort', ignore_index=True)
+    
+    extra = [c for c in df_clean.columns if c not in TIDY_COLUMNS]
+    df_merged = optimize_leger_dtypes(df_merged.reindex(columns=TIDY_COLUMNS + extra))
+    categories = {c: 'category' for c in extra if isinstance(df_clean[c].dtype, pd.CategoricalDtype)}
+    return df_merged.astype(categories) if categories else df_merged
+
+
+def combine_leger_deltas(deltas):
+    """
+    Gabungkan beberapa delta berurutan menjadi satu delta
+
+    Untuk kelompok (siswa, SEMESTER) yang muncul di lebih dari satu delta,
+    hanya baris dari delta terakhir yang dipakai, sehingga
+    ``merge_leger_delta(df, combine_leger_deltas(deltas))`` sama dengan
+    menerapkan delta satu per satu tetapi data lengkap hanya dipindai sekali.
+    """
+    deltas = [df for df in deltas if not df.empty]
+    if len(deltas) <= 1:
+        return deltas[0] if deltas else pd.DataFrame(columns=TIDY_COLUMNS)
+
+    df_delta = pd.concat(deltas, ignore_index=True)
+    part = np.repeat(np.arange(len(deltas)), [len(df) for df in deltas])
+    codes, _ = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_delta['NISN'], df_delta['NAMA_SISWA']),
+        df_delta['SEMESTER'].to_numpy(),
+    ]).factorize()
+
+    latest = np.zeros(codes.max() + 1, dtype='int64')
+    np.maximum.at(latest, codes, part)
+    return df_delta[part == latest[codes]].reset_index(drop=True)
+
+
+def leger_group_hashes(df_clean):
+    """
+    Hash isi setiap kelompok (siswa, SEMESTER) dari data tidy leger
+
+    Hash satu kelompok mencakup identitas siswa (NO, NAMA_SISWA, NIS) dan
+    semua pasangan (MAPEL_ID, NILAI) di kelompok itu, tidak bergantung pada
+    urutan baris. Dihitung saat dataset dicatat ke katalog dan saat update
+    inkremental, sehingga kelompok yang tidak berubah dikenali sejak update
+    pertama.
+
+    Returns:
+    --------
+    hashes : DataFrame
+        Kolom ``HASH_COLUMNS``; ``ROWS`` adalah jumlah nilai per kelompok
+    """
+    if df_clean.empty:
+        return pd.DataFrame(columns=HASH_COLUMNS)
+
+    df = df_clean[df_clean['NILAI'].notna()]
+    cell_hash = pd.util.hash_pandas_object(pd.DataFrame({
+        'NO': df['NO'].to_numpy(dtype='int64'),
+        'NAMA': df['NAMA_SISWA'].astype(str).to_numpy(),
+        'NIS': pd.Series(df['NIS'].to_numpy(dtype=object)).fillna('').astype(str).to_numpy(),
+        'MAPEL': df['MAPEL_ID'].astype(str).to_numpy(),
+        'NILAI': df['NILAI'].to_numpy(dtype='float32'),
+    }), index=False).to_numpy()
+
+    codes, groups = pd.MultiIndex.from_arrays([
+        leger_student_keys(df['NISN'], df['NAMA_SISWA']),
+        df['SEMESTER'].to_numpy(dtype='int64'),
+    ]).factorize()
+
+    # XOR per kelompok: setiap (siswa, semester, mapel) hanya muncul sekali
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+
+    hashes = pd.DataFrame({
+        'STUDENT_KEY': groups.get_level_values(0).to_numpy(dtype=object),
+        'SEMESTER': groups.get_level_values(1).to_numpy(dtype='int64'),
+    })
+    hashes['HASH'] = np.bitwise_xor.reduceat(cell_hash[order], starts)
+    hashes['ROWS'] = np.diff(np.r_[starts, len(order)]).astype('int64')
+    return hashes[HASH_COLUMNS]
+
+
+def iter_leger_batches(file_path, sheet_name=None, batch_size=5000):
+    """
+    Baca leger secara streaming dan hasilkan data tidy per batch
+    
+    Workbook .xlsx dibaca baris per baris dengan openpyxl mode read-only,
+    sehingga memori puncak sebanding dengan satu batch, bukan seluruh sheet.
+    File .xls (tidak didukung openpyxl) dibaca utuh lalu dipotong per batch.
+    
+    Parameters:
+    -----------
+    file_path : str, bytes, or file-like
+        Path ke file Excel atau buffer (lihat ``clean_leger_data``)
+    sheet_name : str, optional
+        Nama sheet (default: sheet pertama)
+    batch_size : int
+        Jumlah baris siswa per batch
+    
+    Yields:
+    -------
+    df_batch : DataFrame
+        Data tidy untuk ``batch_size`` baris siswa berikutnya
+    """
+    for rows in _iter_data_rows(as_excel_source(file_path), sheet_name, batch_size):
+        df_batch = reshape_leger_rows(pd.DataFrame(rows))
+        if not df_batch.empty:
+            yield df_batch
+
+
+def concat_leger_batches(batches):
+    """
+    Gabungkan batch dari ``iter_leger_batches`` menjadi satu DataFrame tidy
+    dengan dtype yang sama seperti ``clean_leger_data``
+    """
+    batches = list(batches)
+    if not batches:
+        return pd.DataFrame()
+    
+    return optimize_leger_dtypes(pd.concat(batches, ignore_index=True))
+
+
+def clean_leger_streaming(file_path, sheet_name=None, batch_size=5000):
+    """
+    Bersihkan leger secara streaming tanpa menumpuk daftar batch di memori
+    
+    Setiap batch dari ``iter_leger_batches`` langsung ditulis ke file Parquet
+    sementara (lewat ``save_clean_data``), lalu file itu dimuat sekali.
+    DataFrame hasil tetap utuh di memori, tetapi puncaknya tidak lagi
+    daftar semua batch ditambah salinan hasil ``pd.concat``.
+    
+    Parameters:
+    -----------
+    file_path : str, bytes, or file-like
+        Path ke file Excel atau buffer (lihat ``clean_leger_data``)
+    sheet_name : str, optional
+        Nama sheet (default: sheet pertama)
+    batch_size : int
+        Jumlah baris siswa per batch
+    
+    Returns:
+    --------
+    df_clean : DataFrame
+        Data tidy dengan dtype yang sama seperti ``clean_leger_data``
+    """
+    batches = iter_leger_batches(file_path, sheet_name=sheet_name, batch_size=batch_size)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        save_results = save_clean_data(batches, output_dir=tmp_dir, fmt='parquet')
+        df_clean = load_clean_data(save_results['data_path'])
+    
+    if df_clean.empty:
+        return pd.DataFrame()
+    return optimize_leger_dtypes(df_clean)
+
+
+def optimize_leger_dtypes(df_clean):
+    """Terapkan dtype ringkas standar pada data tidy leger"""
+    if df_clean.empty:
+        return df_clean
+    
+    return df_clean.astype({
+        'NO': 'int16',
+        'SEMESTER': 'int8',
+        'NILAI': 'float32',
+        'IS_RERATA': 'bool',
+        'MAPEL_ID': 'category',
+        'KOMPONEN': 'category',
+    })
+
+
+def as_excel_source(source):
+    """
+    Normalisasi sumber Excel tanpa menulis ke disk
+    
+    Path dikembalikan apa adanya, bytes/memoryview dibungkus ``BytesIO``,
+    dan buffer (``UploadedFile``, ``BytesIO``) dikembalikan ke posisi awal.
+    """
+    if isinstance(source, (str, Path)):
+        return source
+    
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    
+    source.seek(0)
+    return source
+
+
+def _iter_data_rows(file_path, sheet_name, batch_size):
+    """Hasilkan list baris mentah (tuple) per batch, setelah baris header"""
+    if _is_legacy_xls(file_path):
+        df = pd.read_excel(file_path, sheet_name=sheet_name or 0, header=None)
+        df_data = df.iloc[find_data_start(df):]
+        for start in range(0, len(df_data), batch_size):
+            yield list(df_data.iloc[start:start + batch_size].itertuples(index=False))
+        return
+    
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        
+        # Lewati header; jika tidak ada header Smt, semua baris adalah data
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            row_text = ' '.join(str(val).upper() for val in row if val is not None)
+            if 'SMT1' in row_text or 'SMT2' in row_text:
+                buffer = []
+                break
+        
+        batch = buffer
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        
+        # Sisa buffer header (tanpa baris Smt) bisa melebihi batch_size
+        for start in range(0, len(batch), batch_size):
+            yield batch[start:start + batch_size]
+    finally:
+        wb.close()
+
+
+def _is_legacy_xls(file_path):
+    """Cek apakah sumber adalah .xls lama (format OLE2, bukan zip .xlsx)"""
+    if isinstance(file_path, (str, Path)):
+        return str(file_path).lower().endswith('.xls')
+    
+    position = file_path.tell()
+    signature = file_path.read(4)
+    file_path.seek(position)
+    return signature == b'\xd0\xcf\x11\xe0'
+
+
+def _parse_numeric(col):
+    """
+    Konversi nilai mentah ke float64; string dengan koma desimal
+    ("85,5") ikut dikonversi, nilai yang tidak valid menjadi NaN
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.to_numpy(dtype='float64', na_value=np.nan)
+    
+    values = pd.to_numeric(col, errors='coerce').astype('float64')
+    
+    # Hanya sel string yang gagal dikonversi yang perlu ganti koma
+    retry = values.isna() & col.notna()
+    if retry.any():
+        values[retry] = pd.to_numeric(
+            col[retry].astype(str).str.replace(',', '.', regex=False),
+            errors='coerce'
+        )
+    
+    return values.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _id_to_str(values):
+    """Konversi NISN/NIS numerik ke string tanpa desimal (None jika kosong)"""
+    result = np.full(len(values), None, dtype=object)
+    present = ~np.isnan(values)
+    result[present] = values[present].astype('int64').astype(str)
+    return result
+
+
+def _categorical_from_codes(codes, labels):
+    """
+    Bangun Categorical dari kode integer dengan kategori terurut seperti
+    hasil ``astype('category')`` (hanya kategori yang muncul)
+    """
+    present = np.unique(codes)
+    present_labels = np.asarray(labels, dtype=object)[present]
+    order = np.argsort(present_labels)
+    
+    remap = np.zeros(len(labels), dtype='int64')
+    remap[present[order]] = np.arange(len(present))
+    
+    return pd.Categorical.from_codes(remap[codes], categories=list(present_labels[order]))
+
+
 def calculate_basic_statistics(df_clean):
     """
     Menghitung statistik dasar dari data yang sudah dibersihkan
@@ -183,7 +551,8 @@ def create_student_summary(df_clean):
         index=['NO', 'NISN', 'NAMA_SISWA'],
         columns='MAPEL_ID',
         values='NILAI',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
     
     # Hitung rata-rata semua mata pelajaran
@@ -214,7 +583,7 @@ def create_subject_analysis(df_clean):
         return pd.DataFrame()
     
     # Analisis per mata pelajaran
-    subject_stats = df_rerata.groupby('MAPEL_ID').agg({
+    subject_stats = df_rerata.groupby('MAPEL_ID', observed=True).agg({
         'NILAI': ['count', 'mean', 'std', 'min', 'max'],
         'NAMA_SISWA': 'nunique'
     }).round(2)
@@ -226,36 +595,195 @@ def create_subject_analysis(df_clean):
     return subject_stats
 
 
-def save_clean_data(df_clean, output_dir='data/processed'):
+def save_clean_data(df_clean, output_dir=PROCESSED_DIR, fmt=PROCESSED_DATA_FORMAT, write_csv=False):
     """
     Menyimpan data yang sudah dibersihkan
+    
+    Format utama adalah kolumnar (Parquet atau Feather) sehingga dtype ringkas
+    (int8/float32/category) tetap terjaga dan bisa dimuat ulang dengan cepat
+    lewat ``load_clean_data``. Kolom kategori (``MAPEL_ID``, ``KOMPONEN``)
+    disimpan dengan dictionary encoding. File Excel tidak dibuat di sini,
+    melainkan sesuai permintaan lewat ``export_clean_excel``.
+    
+    Parameters:
+    -----------
+    df_clean : DataFrame or iterable of DataFrame
+        Data tidy, atau batch dari ``iter_leger_batches`` yang ditulis
+        bertahap sehingga data lengkap tidak perlu berada di memori sekaligus
+    output_dir : str
+        Direktori output
+    fmt : str
+        'parquet' atau 'feather'
+    write_csv : bool
+        Tulis juga salinan CSV
+    
+    Returns:
+    --------
+    dict
+        ``data_path``, ``format``, ``csv_path`` (None jika tidak ditulis),
+        ``excel_path`` (selalu None; lihat ``export_clean_excel``), ``timestamp``
     """
+    if fmt not in ('parquet', 'feather'):
+        raise ValueError(f"Format tidak didukung: {fmt}")
+    
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
     timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
     
-    # CSV
-    csv_path = Path(output_dir) / f'leger_clean_{timestamp}.csv'
-    df_clean.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    data_path = _reserve_data_path(output_dir, timestamp, fmt)
+    stem = data_path.stem
+    csv_path = Path(output_dir) / f'{stem}.csv' if write_csv else None
     
-    # Excel dengan multiple sheets
-    excel_path = Path(output_dir) / f'leger_clean_{timestamp}.xlsx'
-    with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-        # Sheet 1: Data lengkap
-        df_clean.to_excel(writer, sheet_name='Data_Lengkap', index=False)
+    try:
+        # Feather (IPC file) tidak mendukung dictionary berbeda antar batch
+        if fmt == 'feather' and not isinstance(df_clean, pd.DataFrame):
+            df_clean = concat_leger_batches(df_clean)
         
-        # Sheet 2: Summary per siswa
-        summary = create_student_summary(df_clean)
-        if not summary.empty:
-            summary.to_excel(writer, sheet_name='Summary_Siswa', index=False)
+        batches = [df_clean] if isinstance(df_clean, pd.DataFrame) else df_clean
         
-        # Sheet 3: Analisis per mapel
-        subject_stats = create_subject_analysis(df_clean)
-        if not subject_stats.empty:
-            subject_stats.to_excel(writer, sheet_name='Analisis_Mapel', index=False)
+        if fmt == 'feather':
+            pa_feather.write_feather(df_clean, data_path, compression='uncompressed')
+            if csv_path:
+                df_clean.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        else:
+            _write_parquet_batches(batches, data_path, csv_path)
+    except Exception:
+        # Jangan tinggalkan file penanda/setengah jadi yang akan terbaca sebagai dataset
+        data_path.unlink(missing_ok=True)
+        if csv_path:
+            csv_path.unlink(missing_ok=True)
+        raise
     
     return {
-        'csv_path': str(csv_path),
-        'excel_path': str(excel_path),
+        'data_path': str(data_path),
+        'format': fmt,
+        'csv_path': str(csv_path) if csv_path else None,
+        'excel_path': None,
         'timestamp': timestamp
-    }
\ No newline at end of file
+    }
+
+
+def _reserve_data_path(output_dir, timestamp, fmt):
+    """
+    Path file data yang unik walau dua penyimpanan terjadi di detik yang sama
+
+    File dibuat eksklusif (``O_EXCL``) sebagai penanda, sehingga dua thread
+    atau proses tidak bisa mendapat stem yang sama.
+    """
+    suffix = 0
+    while True:
+        stem = f'leger_clean_{timestamp}' + (f'_{suffix}' if suffix else '')
+        suffix += 1
+        if list(Path(output_dir).glob(f'{stem}.*')):
+            continue
+        data_path = Path(output_dir) / f'{stem}.{fmt}'
+        try:
+            with open(data_path, 'x'):
+                return data_path
+        except FileExistsError:
+            continue
+
+
+def _write_parquet_batches(batches, data_path, csv_path=None):
+    """Tulis batch DataFrame ke satu file Parquet (dan CSV) secara bertahap"""
+    writer = None
+    csv_file = open(csv_path, 'w', encoding='utf-8-sig', newline='') if csv_path else None
+    
+    try:
+        for batch in batches:
+            first = writer is None
+            if first:
+                # Kolom category menjadi tipe dictionary Arrow
+                schema = _arrow_schema(batch)
+                writer = pq.ParquetWriter(data_path, schema, use_dictionary=True)
+            
+            writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+            
+            if csv_file:
+                batch.to_csv(csv_file, index=False, header=first)
+        
+        if writer is None:
+            pd.DataFrame(columns=TIDY_COLUMNS).to_parquet(data_path, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+        if csv_file:
+            csv_file.close()
+
+
+def _arrow_schema(df):
+    """Schema Arrow dari batch pertama; kolom yang seluruhnya kosong jadi string"""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, pa.field(field.name, pa.string()))
+    return schema
+
+
+def load_clean_data(data_path):
+    """
+    Muat data tidy yang disimpan ``save_clean_data`` (memory-mapped)
+    
+    Dtype ringkas (category, int8, float32) ikut terbaca kembali.
+    """
+    data_path = Path(data_path)
+    
+    if data_path.suffix == '.feather':
+        table = pa_feather.read_table(data_path, memory_map=True)
+    else:
+        table = pq.read_table(data_path, memory_map=True)
+    
+    return table.to_pandas()
+
+
+def stored_columns(data_path):
+    """Nama kolom file ``save_clean_data`` (hanya skema, data tidak dibaca)"""
+    data_path = Path(data_path)
+    
+    if data_path.suffix == '.feather':
+        with pa.memory_map(str(data_path)) as source:
+            return pa.ipc.open_file(source).schema.names
+    return pq.read_schema(data_path).names
+
+
+def clean_excel_sheets(df_clean):
+    """
+    Sheet workbook data bersih: Data_Lengkap, Summary_Siswa, Analisis_Mapel
+    
+    Sheet ringkasan yang kosong tidak disertakan.
+    """
+    sheets = {'Data_Lengkap': df_clean}
+    
+    summary = create_student_summary(df_clean)
+    if not summary.empty:
+        sheets['Summary_Siswa'] = summary
+    
+    subject_stats = create_subject_analysis(df_clean)
+    if not subject_stats.empty:
+        sheets['Analisis_Mapel'] = subject_stats
+    
+    return sheets
+
+
+def export_clean_excel(data_path, excel_path=None):
+    """
+    Buat file Excel (Data_Lengkap, Summary_Siswa, Analisis_Mapel) dari data
+    yang sudah disimpan, hanya jika diminta, dengan penulis XLSX streaming
+    (lihat ``utils.xlsx_writer``). File yang sudah ada dan lebih baru dari
+    data dipakai ulang.
+    
+    Returns:
+    --------
+    excel_path : str
+        Path file Excel
+    """
+    data_path = Path(data_path)
+    excel_path = Path(excel_path) if excel_path else data_path.with_suffix('.xlsx')
+    
+    if excel_path.exists() and excel_path.stat().st_mtime >= data_path.stat().st_mtime:
+        return str(excel_path)
+    
+    df_clean = load_clean_data(data_path)
+    write_xlsx(clean_excel_sheets(df_clean), excel_path)
+    
+    return str(excel_path)
\ No newline at end of file
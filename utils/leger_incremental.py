@@ -0,0 +1,259 @@
+"""
+Modul update inkremental dataset leger yang sudah tersimpan
+
+Setiap semester leger bertambah satu kolom nilai (Smt1-Smt6), tetapi
+sebagian besar isinya sama dengan dataset yang sudah diproses. Mode ini
+membandingkan hash isi per (siswa, semester) leger baru dengan hash yang
+disimpan saat dataset dicatat (``leger_group_hashes``), lalu hanya kelompok
+yang baru, berubah, atau kini kosong yang ditulis sebagai file delta
+Parquet kecil di samping file utama (lihat ``merge_leger_delta``). Cube
+agregat dataset yang sedang dimuat diperbarui dengan biaya sebanding delta;
+DataFrame-nya baru dimuat ulang saat diminta lagi.
+"""
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.settings import LEGER_MAX_DELTA_PARTS, PROCESSED_DIR
+from utils.dataset_catalog import (
+    get_dataset_entry,
+    load_dataset,
+    supports_incremental_update,
+    update_dataset_entry
+)
+from utils.dataset_store import get_dataset_store
+from utils.leger_cleaner import (
+    HASH_COLUMNS,
+    TIDY_COLUMNS,
+    as_excel_source,
+    find_data_start,
+    leger_group_hashes,
+    leger_student_keys,
+    optimize_leger_dtypes,
+    parse_leger_identity,
+    reshape_leger_rows
+)
+
+GROUP_COLUMNS = ['STUDENT_KEY', 'SEMESTER']
+
+
+def ingest_leger_incremental(source, dataset_id, sheet_name=None, output_dir=PROCESSED_DIR):
+    """
+    Perbarui dataset tersimpan dengan leger terbaru tanpa menulis ulang semuanya
+
+    Hanya kelompok (siswa, semester) yang baru atau berubah yang ditulis
+    sebagai file delta; kelompok milik siswa di leger baru yang kini tidak
+    punya nilai ditulis sebagai penanda hapus. Siswa yang tidak ada di leger
+    baru tetap dipertahankan. Dataset tanpa file hash (didaftarkan sebelum
+    mode ini ada) di-hash dari data tersimpan pada update pertama. Hanya
+    dataset leger tunggal yang didukung (lihat ``supports_incremental_update``).
+
+    Parameters:
+    -----------
+    source : str, bytes, or file-like
+        Leger terbaru (lihat ``clean_leger_data``)
+    dataset_id : str
+        ID dataset di katalog
+    sheet_name : str, optional
+        Nama sheet (default: sheet pertama)
+
+    Returns:
+    --------
+    result : dict
+        ``changed_groups``, ``new_students``, ``rows_added``, ``rows_removed``,
+        ``part_path`` (None jika tidak ada perubahan) dan ``entry`` terbaru
+    """
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if entry is None:
+        raise KeyError(f"Dataset tidak ditemukan: {dataset_id}")
+    if not supports_incremental_update(entry):
+        raise ValueError(
+            "Update inkremental hanya untuk dataset leger tunggal; dataset multi-file "
+            "(per kelas) harus diproses ulang lewat mode multi-file"
+        )
+
+    df_raw = pd.read_excel(as_excel_source(source), sheet_name=sheet_name or 0, header=None)
+    df_data = df_raw.iloc[find_data_start(df_raw):]
+    df_new = reshape_leger_rows(df_data)
+
+    new_hashes = leger_group_hashes(df_new)
+    old_hashes = _read_hashes(entry, output_dir)
+
+    # Kelompok yang hash-nya baru atau berbeda
+    merged = new_hashes.merge(old_hashes, on=GROUP_COLUMNS, how='left', suffixes=('', '_OLD'))
+    changed = merged.loc[merged['HASH'] != merged['HASH_OLD'], HASH_COLUMNS]
+
+    # Kelompok lama milik siswa di leger baru yang kini tidak punya nilai
+    _, _, nama, nisn, _ = parse_leger_identity(df_data)
+    old_groups = pd.MultiIndex.from_frame(old_hashes[GROUP_COLUMNS])
+    emptied = old_hashes.loc[
+        old_hashes['STUDENT_KEY'].isin(leger_student_keys(nisn, nama))
+        & ~old_groups.isin(pd.MultiIndex.from_frame(new_hashes[GROUP_COLUMNS])),
+        GROUP_COLUMNS
+    ]
+    groups = pd.concat([changed[GROUP_COLUMNS], emptied], ignore_index=True)
+
+    result = {
+        'changed_groups': len(groups),
+        'new_students': int((~changed['STUDENT_KEY'].drop_duplicates().isin(old_hashes['STUDENT_KEY'])).sum()),
+        'rows_added': 0,
+        'rows_removed': 0,
+        'part_path': None,
+        'entry': entry,
+    }
+    if groups.empty:
+        return result
+
+    df_delta = df_new if not df_new.empty else pd.DataFrame(columns=TIDY_COLUMNS)
+    df_delta = _with_tombstones(_select_groups(df_delta, changed), groups, df_data)
+
+    # Cube dataset yang sedang dimuat diperbarui sebelum katalog menunjuk ke delta baru
+    cube = _cube_with_delta(dataset_id, df_delta)
+
+    # Tulis delta sebagai file Parquet terpisah (file utama tidak ditulis ulang)
+    data_path = Path(entry['data_path'])
+    parts = list(entry.get('parts', []))
+    part_path = data_path.with_name(f"{data_path.stem}.part-{len(parts) + 1}.parquet")
+    df_delta.to_parquet(part_path, index=False)
+    parts.append(str(part_path))
+
+    # Hash dan jumlah baris per kelompok diperbarui
+    is_replaced = old_groups.isin(pd.MultiIndex.from_frame(groups))
+    hashes = pd.concat([old_hashes[~is_replaced], changed], ignore_index=True)[HASH_COLUMNS]
+    hash_path = data_path.with_name(f"{data_path.stem}.hashes.parquet")
+    hashes.to_parquet(hash_path, index=False)
+
+    result['rows_added'] = int(changed['ROWS'].sum())
+    result['rows_removed'] = int(old_hashes.loc[is_replaced, 'ROWS'].sum())
+
+    # Ekspor lama (xlsx/csv) sudah tidak sesuai isi dataset
+    for stale in (data_path.with_suffix('.xlsx'), data_path.with_suffix('.csv')):
+        stale.unlink(missing_ok=True)
+
+    entry = update_dataset_entry(dataset_id, {
+        'parts': parts,
+        'hash_path': str(hash_path),
+        'rows': int(hashes['ROWS'].sum()),
+        'students': int(hashes['STUDENT_KEY'].nunique()),
+        'subjects': max(entry.get('subjects') or 0, int(df_delta['MAPEL_ID'].nunique())),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }, output_dir)
+
+    get_dataset_store().mark_stale(
+        dataset_id, lambda: load_dataset(dataset_id, output_dir),
+        {'aggregate_cube': cube} if cube is not None else None
+    )
+
+    if len(parts) > LEGER_MAX_DELTA_PARTS:
+        entry = compact_dataset(dataset_id, output_dir)
+
+    result.update({'part_path': str(part_path), 'entry': entry})
+    return result
+
+
+def compact_dataset(dataset_id, output_dir=PROCESSED_DIR):
+    """Gabungkan semua file delta ke file utama dataset lalu hapus delta-nya"""
+    entry = get_dataset_entry(dataset_id, output_dir)
+    if entry is None or not entry.get('parts'):
+        return entry
+
+    df_clean = load_dataset(dataset_id, output_dir)
+    data_path = Path(entry['data_path'])
+    tmp_path = data_path.with_name(f".{data_path.name}.tmp")
+
+    if data_path.suffix == '.feather':
+        df_clean.to_feather(tmp_path, compression='uncompressed')
+    else:
+        df_clean.to_parquet(tmp_path, index=False)
+    tmp_path.replace(data_path)
+
+    for part in entry['parts']:
+        Path(part).unlink(missing_ok=True)
+
+    return update_dataset_entry(dataset_id, {'parts': [], 'rows': int(len(df_clean))}, output_dir)
+
+
+def _read_hashes(entry, output_dir):
+    """
+    Hash tersimpan dataset
+
+    Dataset yang didaftarkan sebelum hash disimpan saat pencatatan di-hash
+    dari data tersimpan (sekali, lalu disimpan bersama delta pertama).
+    """
+    hash_path = entry.get('hash_path')
+    if hash_path and Path(hash_path).exists():
+        return pd.read_parquet(hash_path)
+    return leger_group_hashes(load_dataset(entry['dataset_id'], output_dir))
+
+
+def _select_groups(df_delta, changed):
+    """Ambil baris tidy milik kelompok (siswa, semester) yang berubah saja"""
+    if df_delta.empty:
+        return df_delta
+
+    keys = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_delta['NISN'], df_delta['NAMA_SISWA']),
+        df_delta['SEMESTER'].to_numpy(),
+    ])
+    wanted = pd.MultiIndex.from_frame(changed[['STUDENT_KEY', 'SEMESTER']])
+    return df_delta[keys.isin(wanted)]
+
+
+def _with_tombstones(df_delta, changed, df_rows):
+    """
+    Tambahkan baris penanda hapus (NILAI kosong) untuk kelompok berubah
+    yang kini tidak punya nilai sama sekali
+    """
+    present = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_delta['NISN'], df_delta['NAMA_SISWA']),
+        df_delta['SEMESTER'].to_numpy(),
+    ])
+    groups = changed[['STUDENT_KEY', 'SEMESTER']]
+    missing = groups[~pd.MultiIndex.from_frame(groups).isin(present)]
+
+    if not missing.empty:
+        _, no, nama, nisn, nis = parse_leger_identity(df_rows)
+        identity = pd.DataFrame({
+            'STUDENT_KEY': leger_student_keys(nisn, nama),
+            'NO': no, 'NAMA_SISWA': nama, 'NISN': nisn, 'NIS': nis,
+        }).drop_duplicates('STUDENT_KEY')
+
+        tombstones = missing.merge(identity, on='STUDENT_KEY').assign(
+            MAPEL_ID=None, KOMPONEN=None, NILAI=np.nan,
+            IS_RERATA=lambda d: d['SEMESTER'] == 0,
+        )
+        tombstones = tombstones[TIDY_COLUMNS]
+        if df_delta.empty:
+            df_delta = tombstones
+        else:
+            # Samakan dtype agar kolom kosong penanda tidak mengubah dtype hasil
+            df_delta = pd.concat(
+                [df_delta[TIDY_COLUMNS], tombstones.astype(df_delta[TIDY_COLUMNS].dtypes.to_dict())],
+                ignore_index=True
+            )
+
+    return optimize_leger_dtypes(df_delta[TIDY_COLUMNS].reset_index(drop=True))
+
+
+def _cube_with_delta(dataset_id, df_delta):
+    """
+    Cube agregat dataset yang sedang dimuat setelah delta diterapkan, atau
+    None jika dataset/cube-nya tidak ada di store bersama
+    """
+    store = get_dataset_store()
+    cube = store.peek_derived(dataset_id, 'aggregate_cube')
+    df_clean = store.get(dataset_id) if cube is not None else None
+    if df_clean is None:
+        return None
+
+    delta_keys = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_delta['NISN'], df_delta['NAMA_SISWA']),
+        df_delta['SEMESTER'].to_numpy(),
+    ])
+    base_keys = pd.MultiIndex.from_arrays([
+        leger_student_keys(df_clean['NISN'], df_clean['NAMA_SISWA']),
+        df_clean['SEMESTER'].to_numpy(),
+    ])
+    return cube.apply_delta(df_clean[base_keys.isin(delta_keys)], df_delta[df_delta['NILAI'].notna()])
@@ -0,0 +1,269 @@
+"""
+Modul penulis PDF sederhana (pure Python, tanpa dependensi)
+
+Cukup untuk dokumen tabel/teks seperti rapor dan rekap kelas: teks dengan
+font standar Helvetica/Helvetica-Bold (tidak perlu di-embed), garis dan
+kotak. Setiap halaman digambar pada ``PdfCanvas`` lalu dikompresi menjadi
+content stream; ``build_pdf`` merakit stream halaman menjadi satu dokumen,
+sehingga halaman yang dirender di proses lain bisa digabung tanpa parsing.
+"""
+import numbers
+import zlib
+
+import pandas as pd
+
+# Ukuran A4 dalam point (1/72 inci)
+A4 = (595.28, 841.89)
+
+# Lebar glyph (per 1000 unit em) karakter ASCII 32-126, dari metrik AFM standar
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+_DEFAULT_WIDTH = 556
+
+_FONTS = {False: ('F1', _HELVETICA_WIDTHS), True: ('F2', _HELVETICA_BOLD_WIDTHS)}
+
+
+def text_width(text, size, bold=False):
+    """Lebar teks (point) dengan font Helvetica"""
+    widths = _FONTS[bool(bold)][1]
+    total = sum(widths[ord(ch) - 32] if 32 <= ord(ch) <= 126 else _DEFAULT_WIDTH for ch in text)
+    return total * size / 1000
+
+
+def fit_text(text, width, size, bold=False):
+    """Potong teks dengan '...' agar muat dalam ``width`` point"""
+    text = str(text)
+    if text_width(text, size, bold) <= width:
+        return text
+    while text and text_width(text + '...', size, bold) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+class PdfCanvas:
+    """
+    Satu halaman PDF
+
+    Koordinat dihitung dari pojok kiri **atas** halaman (y bertambah ke
+    bawah), dalam point.
+    """
+
+    def __init__(self, page_size=A4):
+        self.width, self.height = page_size
+        self._ops = []
+
+    def text(self, x, y, text, size=10, bold=False, align='left', color=None):
+        """Tulis teks; ``y`` adalah garis dasar, ``align`` 'left'/'center'/'right'"""
+        text = str(text)
+        if align != 'left':
+            shift = text_width(text, size, bold)
+            x -= shift / 2 if align == 'center' else shift
+        font = _FONTS[bool(bold)][0]
+        op = f"BT /{font} {size:g} Tf {x:.2f} {self.height - y:.2f} Td ({_escape(text)}) Tj ET"
+        # Warna dalam q/Q agar tidak terbawa ke teks berikutnya
+        self._ops.append(f"q {_rgb(color)} rg {op} Q" if color else op)
+
+    def line(self, x1, y1, x2, y2, width=0.5, color=None):
+        stroke = f"{_rgb(color)} RG " if color else ''
+        self._ops.append(
+            f"q {stroke}{width:g} w {x1:.2f} {self.height - y1:.2f} m {x2:.2f} {self.height - y2:.2f} l S Q"
+        )
+
+    def rect(self, x, y, w, h, fill=None, stroke=True, width=0.5):
+        """Kotak dengan pojok kiri atas (x, y); ``fill`` warna RGB 0-1 opsional"""
+        paint = 'B' if fill and stroke else ('f' if fill else 'S')
+        fill_op = f"{_rgb(fill)} rg " if fill else ''
+        self._ops.append(
+            f"q {fill_op}{width:g} w {x:.2f} {self.height - y - h:.2f} {w:.2f} {h:.2f} re {paint} Q"
+        )
+
+    def stream(self):
+        """Content stream halaman (terkompresi FlateDecode)"""
+        return zlib.compress('\n'.join(self._ops).encode('cp1252', errors='replace'))
+
+
+def draw_table(canvas, x, y, widths, header, rows, aligns=None, size=8, row_height=14,
+               header_fill=(0.85, 0.89, 0.95)):
+    """
+    Gambar tabel sederhana mulai dari (x, y); baris header diisi warna
+
+    Parameters:
+    -----------
+    widths : list of float
+        Lebar setiap kolom (point)
+    header : list of str
+    rows : list of list
+        Nilai sel (sudah berupa teks); sel bisa berupa ``(teks, warna)``
+    aligns : list of str, optional
+        'left'/'center'/'right' per kolom (default 'left')
+
+    Returns:
+    --------
+    y : float
+        Posisi y tepat di bawah tabel
+    """
+    aligns = aligns or ['left'] * len(widths)
+    total = sum(widths)
+
+    canvas.rect(x, y, total, row_height, fill=header_fill)
+    _draw_row(canvas, x, y, widths, header, aligns, size, row_height, bold=True)
+    y += row_height
+    for row in rows:
+        _draw_row(canvas, x, y, widths, row, aligns, size, row_height)
+        y += row_height
+        canvas.line(x, y, x + total, y, width=0.25, color=(0.7, 0.7, 0.7))
+    canvas.rect(x, y - row_height * (len(rows) + 1), total, row_height * (len(rows) + 1))
+    return y
+
+
+def table_pages(frame, title, subtitle=None, page_size=None, size=8, row_height=14, margin=36):
+    """
+    Halaman PDF (content stream) untuk seluruh isi DataFrame
+
+    Lebar kolom mengikuti panjang isi (sampel baris awal); tabel lebar
+    otomatis memakai A4 landscape. Header tabel diulang di setiap halaman.
+
+    Returns:
+    --------
+    pages : list of tuple
+        ``(content_stream, page_size)`` per halaman (lihat ``build_pdf``)
+    """
+    header = [str(column) for column in frame.columns]
+    if page_size is None:
+        page_size = (A4[1], A4[0]) if len(header) > 8 else A4
+    width, height = page_size
+
+    cells = [[_format_cell(value) for value in row] for row in frame.itertuples(index=False)]
+    sample = cells[:200]
+    natural = [
+        max([text_width(name, size, True)] + [text_width(row[j], size) for row in sample]) + 8
+        for j, name in enumerate(header)
+    ]
+    usable = width - 2 * margin
+    scale = min(1.0, usable / sum(natural)) if natural else 1.0
+    widths = [w * scale for w in natural]
+    aligns = ['right' if pd_numeric else 'left' for pd_numeric in _numeric_columns(frame)]
+
+    top = margin + 44
+    per_page = max(1, int((height - top - margin - 14) // row_height) - 1)
+    n_pages = max(1, -(-len(cells) // per_page))
+    pages = []
+    for page_no in range(n_pages):
+        canvas = PdfCanvas(page_size)
+        canvas.text(margin, margin + 10, title, size=14, bold=True)
+        if subtitle:
+            canvas.text(margin, margin + 26, subtitle, size=9, color=(0.35, 0.35, 0.35))
+        rows = [
+            [fit_text(value, w - 6, size) for value, w in zip(row, widths)]
+            for row in cells[page_no * per_page:(page_no + 1) * per_page]
+        ]
+        draw_table(canvas, margin, top, widths, [fit_text(h, w - 6, size, True) for h, w in zip(header, widths)],
+                   rows, aligns, size, row_height)
+        canvas.text(width - margin, height - margin / 2, f"Halaman {page_no + 1} dari {n_pages}",
+                    size=7, align='right', color=(0.4, 0.4, 0.4))
+        pages.append((canvas.stream(), page_size))
+    return pages
+
+
+def build_pdf(pages, page_size=A4, title=None):
+    """
+    Rakit content stream halaman menjadi dokumen PDF
+
+    Parameters:
+    -----------
+    pages : iterable
+        Hasil ``PdfCanvas.stream()`` sesuai urutan halaman, atau tuple
+        ``(stream, page_size)`` untuk halaman dengan ukuran berbeda
+    title : str, optional
+        Judul dokumen (metadata)
+
+    Returns:
+    --------
+    pdf : bytes
+    """
+    pages = [page if isinstance(page, tuple) else (page, page_size) for page in pages]
+    pages = pages or [(PdfCanvas(page_size).stream(), page_size)]
+    n = len(pages)
+    # Objek: 1 katalog, 2 pages, 3-4 font, 5 info, lalu (page, content) per halaman
+    first_page = 6
+    page_ids = [first_page + 2 * i for i in range(n)]
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{pid} 0 R' for pid in page_ids)}] /Count {n} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        f"<< /Producer (SIM Akademik) /Title ({_escape(title or '')}) >>".encode('cp1252', errors='replace'),
+    ]
+    for pid, (content, (width, height)) in zip(page_ids, pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(content)} /Filter /FlateDecode >>\nstream\n".encode() + content + b"\nendstream"
+        )
+
+    out = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
+    offsets, position = [], len(out[0])
+    for number, body in enumerate(objects, start=1):
+        chunk = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        offsets.append(position)
+        out.append(chunk)
+        position += len(chunk)
+
+    xref = [f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"]
+    xref.extend(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out.append(''.join(xref).encode())
+    out.append(
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 5 0 R >>\nstartxref\n{position}\n%%EOF\n".encode()
+    )
+    return b''.join(out)
+
+
+def _draw_row(canvas, x, y, widths, values, aligns, size, row_height, bold=False):
+    baseline = y + row_height / 2 + size * 0.35
+    for value, w, align in zip(values, widths, aligns):
+        text, color = value if isinstance(value, tuple) else (value, None)
+        if align == 'right':
+            canvas.text(x + w - 3, baseline, text, size, bold, 'right', color)
+        elif align == 'center':
+            canvas.text(x + w / 2, baseline, text, size, bold, 'center', color)
+        else:
+            canvas.text(x + 3, baseline, text, size, bold, 'left', color)
+        x += w
+
+
+def _format_cell(value):
+    """Teks sel tabel: angka desimal 2 digit, kosong menjadi '-'"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return '-'
+    if isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def _numeric_columns(frame):
+    return [frame.iloc[:, j].dtype.kind in 'iuf' for j in range(frame.shape[1])]
+
+
+def _escape(text):
+    return str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').replace('\r', '').replace('\n', ' ')
+
+
+def _rgb(color):
+    return ' '.join(f"{c:g}" for c in color)
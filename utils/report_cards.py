@@ -0,0 +1,273 @@
+"""
+Modul rapor PDF per siswa dan rekap kelas
+
+Nilai setiap siswa (mapel x Smt1-Smt6/Rerata) diambil dari data tidy leger
+sekaligus ke satu array, dipecah menjadi batch kecil, lalu dirender di
+process pool dengan ``utils.pdf_writer`` (pure Python, tanpa jaringan).
+Worker hanya mengembalikan content stream halaman; proses utama merakitnya
+menjadi satu ZIP (satu PDF per siswa) atau satu PDF gabungan per angkatan,
+diawali halaman rekap kelas.
+"""
+import os
+import re
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analytics.subject_analytics import DEFAULT_KKM
+from config.settings import APP_NAME, REPORT_CARD_BATCH_SIZE
+from utils.leger_cleaner import KOMPONEN_LABELS, leger_student_keys
+from utils.pdf_writer import A4, PdfCanvas, build_pdf, draw_table, fit_text, table_pages
+
+BUNDLE_ZIP = 'zip'
+BUNDLE_PDF = 'pdf'
+
+_MARGIN = 40
+_ROW_HEIGHT = 16
+_TABLE_TOP = 176
+_CARD_WIDTHS = [24, 131] + [40] * 6 + [48, 72]
+_RED = (0.75, 0.1, 0.1)
+
+
+def student_report_data(df_clean, kkm=DEFAULT_KKM):
+    """
+    Data rapor setiap siswa dari data tidy leger
+
+    Returns:
+    --------
+    students : list of dict
+        Identitas (``nama``, ``nisn``, ``nis``, ``kelas``), ``mapel`` (nama
+        mapel yang punya nilai), ``nilai`` (array mapel x 7: Smt1-Smt6,
+        Rerata), ``rata_rata``, ``tidak_tuntas``, ``peringkat``, ``total``
+    recap : DataFrame
+        Rekap per siswa (urut peringkat) untuk halaman rekap kelas
+    """
+    keys = leger_student_keys(df_clean['NISN'], df_clean['NAMA_SISWA'])
+    student_codes, _ = pd.factorize(keys)
+    mapel = df_clean['MAPEL_ID'].astype('category')
+    mapel_names = [str(name) for name in mapel.cat.categories]
+    semester = df_clean['SEMESTER'].to_numpy()
+    komponen = np.where(semester == 0, len(KOMPONEN_LABELS) - 1, np.clip(semester - 1, 0, 5))
+
+    n_students = student_codes.max() + 1 if len(student_codes) else 0
+    grid = np.full((n_students, len(mapel_names), len(KOMPONEN_LABELS)), np.nan, dtype='float32')
+    grid[student_codes, mapel.cat.codes.to_numpy(), komponen] = df_clean['NILAI'].to_numpy(dtype='float32')
+
+    rerata = grid[:, :, -1]
+    with warnings.catch_warnings():
+        # Siswa tanpa nilai rerata: rata-rata NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        rata_rata = np.nanmean(rerata, axis=1)
+    tidak_tuntas = (rerata < kkm).sum(axis=1)
+    peringkat = pd.Series(rata_rata).rank(ascending=False, method='min').to_numpy()
+
+    first = np.unique(student_codes, return_index=True)[1]
+    id_columns = [col for col in ('NAMA_SISWA', 'NISN', 'NIS', 'KELAS') if col in df_clean.columns]
+    identity = df_clean.iloc[first][id_columns].reset_index(drop=True)
+
+    recap = identity.copy()
+    recap['RATA_RATA'] = np.round(rata_rata, 2)
+    recap['MAPEL_TIDAK_TUNTAS'] = tidak_tuntas
+    recap['PERINGKAT'] = pd.array(peringkat, dtype='Int64')
+    recap = recap[['PERINGKAT'] + id_columns + ['RATA_RATA', 'MAPEL_TIDAK_TUNTAS']]
+
+    present = ~np.isnan(grid).all(axis=2)
+    students = []
+    for i, row in enumerate(identity.itertuples(index=False)):
+        values = dict(zip(id_columns, row))
+        students.append({
+            'nama': values['NAMA_SISWA'],
+            'nisn': values.get('NISN'),
+            'nis': values.get('NIS'),
+            'kelas': values.get('KELAS'),
+            'mapel': [name for name, has in zip(mapel_names, present[i]) if has],
+            'nilai': grid[i][present[i]],
+            'rata_rata': rata_rata[i],
+            'tidak_tuntas': int(tidak_tuntas[i]),
+            'peringkat': None if np.isnan(peringkat[i]) else int(peringkat[i]),
+            'total': n_students,
+        })
+    return students, recap.sort_values('PERINGKAT', kind='stable', ignore_index=True)
+
+
+def render_report_card(student, kkm=DEFAULT_KKM, printed_at=None):
+    """
+    Halaman rapor satu siswa
+
+    Returns:
+    --------
+    pages : list of bytes
+        Content stream halaman (lebih dari satu jika mapel tidak muat)
+    """
+    printed_at = printed_at or datetime.now().strftime('%d-%m-%Y')
+    header = ['No', 'Mata Pelajaran'] + KOMPONEN_LABELS + ['Keterangan']
+    aligns = ['center', 'left'] + ['center'] * 7 + ['left']
+
+    rows = []
+    for no, (mapel, nilai) in enumerate(zip(student['mapel'], student['nilai']), start=1):
+        rerata = nilai[-1]
+        if np.isnan(rerata):
+            status = '-'
+        else:
+            status = 'Tuntas' if rerata >= kkm else ('Belum Tuntas', _RED)
+        cells = ['-' if np.isnan(value) else f"{value:.1f}" for value in nilai]
+        if not np.isnan(rerata) and rerata < kkm:
+            cells[-1] = (cells[-1], _RED)
+        rows.append([str(no), fit_text(mapel, _CARD_WIDTHS[1] - 6, 8)] + cells + [status])
+
+    per_page = int((A4[1] - _TABLE_TOP - 150) // _ROW_HEIGHT) - 1
+    chunks = [rows[start:start + per_page] for start in range(0, len(rows), per_page)] or [[]]
+    pages = []
+    for page_no, chunk in enumerate(chunks):
+        canvas = PdfCanvas(A4)
+        _card_header(canvas, student)
+        y = draw_table(canvas, _MARGIN, _TABLE_TOP, _CARD_WIDTHS, header, chunk, aligns, 8, _ROW_HEIGHT)
+        if page_no == len(chunks) - 1:
+            _card_summary(canvas, student, kkm, y + 24)
+        canvas.text(_MARGIN, A4[1] - 28, f"Dicetak {printed_at} - {APP_NAME}", size=7, color=(0.4, 0.4, 0.4))
+        if len(chunks) > 1:
+            canvas.text(A4[0] - _MARGIN, A4[1] - 28, f"Halaman {page_no + 1} dari {len(chunks)}",
+                        size=7, align='right', color=(0.4, 0.4, 0.4))
+        pages.append(canvas.stream())
+    return pages
+
+
+def recap_pages(recap, title="Rekap Nilai Kelas"):
+    """Halaman rekap kelas; satu bagian per KELAS jika kolomnya ada"""
+    if 'KELAS' not in recap.columns:
+        return table_pages(recap, title, f"{len(recap):,} siswa")
+    pages = []
+    for kelas, group in recap.groupby('KELAS', observed=True, sort=True):
+        group = group.drop(columns='KELAS')
+        pages.extend(table_pages(group, f"{title} {kelas}", f"{len(group):,} siswa"))
+    return pages
+
+
+def write_report_cards(df_clean, path, kkm=DEFAULT_KKM, bundle=BUNDLE_ZIP, workers=None,
+                       batch_size=REPORT_CARD_BATCH_SIZE, progress=None):
+    """
+    Render rapor seluruh siswa dan tulis ke ``path``
+
+    Parameters:
+    -----------
+    df_clean : DataFrame
+        Data tidy leger (boleh berisi kolom KELAS)
+    bundle : str
+        ``'zip'``: satu PDF per siswa + rekap dalam ZIP; ``'pdf'``: satu
+        PDF gabungan (rekap kelas lalu rapor)
+    workers : int, optional
+        Jumlah proses render (default jumlah CPU; 1 = tanpa process pool)
+    progress : callable, optional
+        Dipanggil ``progress(selesai, total)`` setiap batch selesai
+
+    Returns:
+    --------
+    n_students : int
+    """
+    students, recap = student_report_data(df_clean, kkm)
+    printed_at = datetime.now().strftime('%d-%m-%Y')
+    batches = [students[start:start + batch_size] for start in range(0, len(students), batch_size)]
+    rendered = _render_batches(batches, kkm, printed_at, workers, progress, len(students))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if bundle == BUNDLE_PDF:
+        pages = recap_pages(recap)
+        for batch in rendered:
+            for student_pages in batch:
+                pages.extend(student_pages)
+        tmp_path.write_bytes(build_pdf(pages, title="Rapor Nilai Siswa"))
+    else:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as archive:
+            archive.writestr('rekap_kelas.pdf', build_pdf(recap_pages(recap), title="Rekap Nilai Kelas"))
+            number = 0
+            for batch, batch_students in zip(rendered, batches):
+                for student_pages, student in zip(batch, batch_students):
+                    number += 1
+                    archive.writestr(_card_filename(number, student),
+                                     build_pdf(student_pages, title=f"Rapor {student['nama']}"))
+    os.replace(tmp_path, path)
+    return len(students)
+
+
+def _render_batch(students, kkm, printed_at):
+    """Worker: content stream rapor setiap siswa dalam satu batch"""
+    return [render_report_card(student, kkm, printed_at) for student in students]
+
+
+def _render_batches(batches, kkm, printed_at, workers, progress, total):
+    """Render semua batch (urutan dipertahankan), lewat process pool jika memungkinkan"""
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(batches)
+    done = 0
+
+    if workers > 1 and len(batches) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+                futures = {pool.submit(_render_batch, batch, kkm, printed_at): i for i, batch in enumerate(batches)}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    done += len(batches[i])
+                    if progress:
+                        progress(done, total)
+            return results
+        except (BrokenProcessPool, OSError):
+            results, done = [None] * len(batches), 0
+
+    for i, batch in enumerate(batches):
+        results[i] = _render_batch(batch, kkm, printed_at)
+        done += len(batch)
+        if progress:
+            progress(done, total)
+    return results
+
+
+def _card_header(canvas, student):
+    width = A4[0]
+    canvas.text(width / 2, 56, "RAPOR NILAI SISWA", size=16, bold=True, align='center')
+    canvas.text(width / 2, 74, APP_NAME, size=10, align='center', color=(0.35, 0.35, 0.35))
+    canvas.line(_MARGIN, 86, width - _MARGIN, 86, width=1)
+
+    identity = [
+        ("Nama", student['nama']), ("NISN", student['nisn']),
+        ("NIS", student['nis']), ("Kelas", student['kelas']),
+    ]
+    for i, (label, value) in enumerate(identity):
+        x = _MARGIN + (i % 2) * 260
+        y = 112 + (i // 2) * 18
+        canvas.text(x, y, label, size=9, bold=True)
+        canvas.text(x + 45, y, f": {fit_text(_display(value), 200, 9)}", size=9)
+
+
+def _card_summary(canvas, student, kkm, y):
+    rata_rata = student['rata_rata']
+    peringkat = student['peringkat']
+    lines = [
+        ("Rata-rata nilai", '-' if np.isnan(rata_rata) else f"{rata_rata:.2f}"),
+        ("KKM", f"{kkm:g}"),
+        ("Mapel belum tuntas", str(student['tidak_tuntas'])),
+        ("Peringkat", '-' if peringkat is None else f"{peringkat} dari {student['total']}"),
+    ]
+    for i, (label, value) in enumerate(lines):
+        canvas.text(_MARGIN, y + i * 16, label, size=9, bold=True)
+        canvas.text(_MARGIN + 110, y + i * 16, f": {value}", size=9)
+
+
+def _card_filename(number, student):
+    parts = [student['kelas'], student['nisn'] if _display(student['nisn']) != '-' else student['nama']]
+    slug = '_'.join(_display(part) for part in parts if _display(part) != '-')
+    return f"rapor_{number:05d}_{re.sub(r'[^A-Za-z0-9-]+', '_', slug).strip('_')}.pdf"
+
+
+def _display(value):
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return '-'
+    return str(value)
@@ -0,0 +1,307 @@
+"""
+Modul engine laporan
+
+Setiap jenis laporan dibangun dari agregat yang sudah ada per dataset
+(cube agregat untuk laporan per siswa/mapel, ``RiskIndex`` untuk laporan
+kelulusan dan siswa berisiko). Filter semester, mapel dan tanggal
+diterapkan sebelum serialisasi, lalu hasilnya ditulis ke file per potongan
+baris sehingga memori tidak pernah menampung seluruh isi file sekaligus.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analytics.early_warning import RiskIndex, score_student_risk
+from analytics.subject_analytics import DEFAULT_KKM
+from config.settings import REPORT_CHUNK_ROWS, REPORT_DIR, REPORT_KEEP_FILES, REPORT_MIN_AGE_SECONDS
+from utils.aggregate_cube import build_aggregate_cube
+from utils.pdf_writer import build_pdf, table_pages
+from utils.report_cards import BUNDLE_ZIP, write_report_cards
+from utils.xlsx_writer import write_xlsx
+
+REPORT_OVERALL = "Laporan Nilai Keseluruhan"
+REPORT_STUDENT = "Laporan Per Siswa"
+REPORT_SUBJECT = "Laporan Per Mata Pelajaran"
+REPORT_GRADUATION = "Laporan Kelulusan"
+REPORT_AT_RISK = "Laporan Siswa Berisiko"
+
+REPORT_TYPES = [REPORT_OVERALL, REPORT_STUDENT, REPORT_SUBJECT, REPORT_GRADUATION, REPORT_AT_RISK]
+
+REPORT_FORMATS = {'CSV': '.csv', 'Excel': '.xlsx', 'PDF': '.pdf'}
+
+_prune_lock = threading.Lock()
+
+DATE_COLUMNS = ['TANGGAL', 'tanggal', 'DATE', 'date']
+
+
+def find_date_column(df):
+    """Kolom tanggal pada data (nama umum atau dtype datetime), atau None"""
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            return column
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            return column
+    return None
+
+
+def filter_leger(df, semesters=None, subjects=None, date_range=None):
+    """
+    Terapkan filter ke data tidy dalam satu mask boolean
+
+    Parameters:
+    -----------
+    semesters : list, optional
+        SEMESTER yang dipertahankan (0 = rerata)
+    subjects : list, optional
+        MAPEL_ID yang dipertahankan
+    date_range : tuple, optional
+        ``(mulai, selesai)`` inklusif; hanya berlaku jika data punya kolom tanggal
+
+    Returns:
+    --------
+    df : DataFrame
+        Data asli (tanpa salinan) jika tidak ada filter
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if semesters and 'SEMESTER' in df.columns:
+        mask &= df['SEMESTER'].isin(semesters).to_numpy()
+    if subjects and 'MAPEL_ID' in df.columns:
+        mask &= df['MAPEL_ID'].isin(subjects).to_numpy()
+
+    date_col = find_date_column(df) if date_range else None
+    if date_col is not None:
+        dates = pd.to_datetime(df[date_col], errors='coerce')
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        mask &= ((dates >= start) & (dates < end + pd.Timedelta(days=1))).to_numpy()
+
+    return df if mask.all() else df[mask]
+
+
+def build_report(report_type, df, cube=None, risk_index=None, semesters=None, subjects=None,
+                 date_range=None, kkm=DEFAULT_KKM):
+    """
+    Bangun tabel laporan
+
+    Parameters:
+    -----------
+    report_type : str
+        Salah satu ``REPORT_TYPES``
+    df : DataFrame
+        Data tidy dataset aktif
+    cube : AggregateCube, optional
+        Cube agregat dataset (lihat ``get_active_cube``); dibangun dari
+        ``df`` jika tidak diberikan
+    risk_index : RiskIndex, optional
+        Indeks early warning dataset (dipakai jika tidak ada filter mapel)
+    semesters, subjects, date_range :
+        Filter (lihat ``filter_leger``)
+    kkm : float
+        KKM untuk laporan kelulusan dan siswa berisiko
+
+    Returns:
+    --------
+    report : DataFrame
+    """
+    is_leger = {'NISN', 'NAMA_SISWA', 'MAPEL_ID', 'SEMESTER', 'NILAI', 'IS_RERATA'}.issubset(df.columns)
+    if report_type == REPORT_OVERALL or not is_leger:
+        return filter_leger(df, semesters, subjects, date_range)
+
+    # Data leger tidak bertanggal; filter tanggal hanya berlaku bila kolomnya ada
+    if date_range and find_date_column(df) is not None:
+        df = filter_leger(df, date_range=date_range)
+        cube, risk_index = None, None
+
+    if report_type in (REPORT_STUDENT, REPORT_SUBJECT):
+        if cube is None:
+            cube = build_aggregate_cube(df)
+        cells = _filter_cells(cube.cells, semesters, subjects)
+        if report_type == REPORT_STUDENT:
+            return _student_report(cells)
+        return _subject_report(cells)
+
+    if report_type in (REPORT_GRADUATION, REPORT_AT_RISK):
+        # Kelulusan berbasis nilai rerata; filter semester tidak berlaku
+        if subjects or risk_index is None:
+            risk_index = RiskIndex(filter_leger(df, subjects=subjects))
+        features = risk_index.features(kkm)
+        if report_type == REPORT_GRADUATION:
+            return _graduation_report(features)
+        ranked = score_student_risk(features)
+        return ranked[ranked['BERISIKO']].reset_index(drop=True)
+
+    raise ValueError(f"Jenis laporan tidak dikenal: {report_type}")
+
+
+def iter_csv_chunks(frame, chunk_rows=REPORT_CHUNK_ROWS):
+    """
+    Serialisasi CSV (UTF-8 dengan BOM) per potongan baris
+
+    Yields:
+    -------
+    chunk : bytes
+    """
+    yield frame.iloc[:0].to_csv(index=False).encode('utf-8-sig')
+    for start in range(0, len(frame), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode('utf-8')
+
+
+def write_report(frame, path, fmt='CSV', sheet_name='Laporan', chunk_rows=REPORT_CHUNK_ROWS, title=None):
+    """
+    Tulis laporan ke ``path`` (atomik: file sementara lalu rename)
+
+    CSV dan Excel (penulis XLSX streaming) ditulis per potongan
+    ``chunk_rows`` baris; PDF berupa tabel berjudul ``title``.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+    if fmt == 'CSV':
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter_csv_chunks(frame, chunk_rows):
+                f.write(chunk)
+    elif fmt == 'Excel':
+        write_xlsx({sheet_name: frame}, tmp_path, chunk_rows=chunk_rows)
+    elif fmt == 'PDF':
+        title = title or sheet_name
+        subtitle = f"{len(frame):,} baris - dibuat {datetime.now().strftime('%d-%m-%Y %H:%M')}"
+        tmp_path.write_bytes(build_pdf(table_pages(frame, title, subtitle), title=title))
+    else:
+        raise ValueError(f"Format laporan tidak didukung: {fmt}")
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_report(frame, report_type, fmt='CSV', output_dir=REPORT_DIR):
+    """
+    Tulis laporan ke direktori laporan dengan nama bertimestamp
+
+    File laporan lama di ``output_dir`` dipangkas hingga ``REPORT_KEEP_FILES``
+    terbaru (lihat ``_prune_reports``).
+
+    Returns:
+    --------
+    path : Path
+    """
+    path = write_report(frame, _report_path(report_type, REPORT_FORMATS[fmt], output_dir), fmt, title=report_type)
+    _prune_reports(output_dir)
+    return path
+
+
+def export_report_cards(df, kkm=DEFAULT_KKM, bundle=BUNDLE_ZIP, output_dir=REPORT_DIR, workers=None,
+                        progress=None):
+    """
+    Rapor PDF seluruh siswa (lihat ``utils.report_cards``) di direktori laporan
+
+    Parameters:
+    -----------
+    bundle : str
+        ``'zip'`` (satu PDF per siswa) atau ``'pdf'`` (satu PDF gabungan)
+    progress : callable, optional
+        ``progress(selesai, total)`` untuk progress bar
+
+    Returns:
+    --------
+    path : Path
+    """
+    suffix = '.zip' if bundle == BUNDLE_ZIP else '.pdf'
+    path = _report_path("Rapor Siswa", suffix, output_dir)
+    write_report_cards(df, path, kkm, bundle, workers=workers, progress=progress)
+    _prune_reports(output_dir)
+    return path
+
+
+def _report_path(report_type, suffix, output_dir):
+    """Path laporan bertimestamp, mis. ``laporan_per_siswa_<waktu>.csv``"""
+    slug = report_type.lower().replace('laporan', '').strip().replace(' ', '_')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    return Path(output_dir) / f"laporan_{slug}_{timestamp}{suffix}"
+
+
+def _filter_cells(cells, semesters, subjects):
+    """
+    Filter sel cube; tanpa filter semester laporan memakai nilai rerata
+    (SEMESTER 0) seperti ringkasan per siswa
+    """
+    semester = cells.index.get_level_values('SEMESTER')
+    mask = semester.isin(semesters) if semesters else semester == 0
+    if subjects:
+        mask &= cells.index.get_level_values('MAPEL_ID').isin(subjects)
+    return cells[mask]
+
+
+def _student_report(cells):
+    """Rata-rata per siswa per mapel, rata-rata total dan ranking"""
+    grouped = cells.groupby(level=['NISN', 'NAMA_SISWA', 'MAPEL_ID'], observed=True, dropna=False)
+    sums = grouped[['SUM', 'COUNT']].sum()
+    per_subject = (sums['SUM'] / sums['COUNT']).unstack('MAPEL_ID')
+
+    totals = cells.groupby(level=['NISN', 'NAMA_SISWA'], observed=True, dropna=False)[['SUM', 'COUNT']].sum()
+    report = per_subject.round(2)
+    report.columns = [str(column) for column in report.columns]
+    report['RATA_RATA'] = per_subject.mean(axis=1).round(2)
+    report['JUMLAH_MAPEL'] = per_subject.notna().sum(axis=1)
+    report['JUMLAH_NILAI'] = totals['COUNT'].reindex(report.index)
+    report = report.reset_index().sort_values('RATA_RATA', ascending=False, ignore_index=True)
+    report['RANKING'] = np.arange(1, len(report) + 1)
+    return report
+
+
+def _subject_report(cells):
+    """Statistik per mapel dari jumlah/jumlah kuadrat sel"""
+    grouped = cells.groupby(level='MAPEL_ID', observed=True)
+    agg = grouped.agg(
+        COUNT=('COUNT', 'sum'), SUM=('SUM', 'sum'), SUMSQ=('SUMSQ', 'sum'),
+        MIN=('MIN', 'min'), MAX=('MAX', 'max'),
+    )
+    mean = agg['SUM'] / agg['COUNT']
+    variance = (agg['SUMSQ'] - agg['COUNT'] * mean ** 2) / (agg['COUNT'] - 1)
+    students = cells.reset_index().groupby('MAPEL_ID', observed=True)['NISN'].nunique()
+
+    return pd.DataFrame({
+        'JUMLAH_NILAI': agg['COUNT'],
+        'RATA_RATA': mean.round(2),
+        'STD': np.sqrt(variance.clip(lower=0)).round(2),
+        'MIN': agg['MIN'],
+        'MAX': agg['MAX'],
+        'JUMLAH_SISWA': students.reindex(agg.index),
+    }).reset_index()
+
+
+def _graduation_report(features):
+    """Status kelulusan per siswa: lulus jika semua mapel tuntas"""
+    columns = [col for col in ('NAMA_SISWA', 'NISN', 'KELAS') if col in features.columns]
+    report = features[columns + ['RATA_RATA', 'JUMLAH_MAPEL', 'MAPEL_TIDAK_TUNTAS', 'NILAI_MIN']].copy()
+    lulus = (report['MAPEL_TIDAK_TUNTAS'] == 0) & (report['JUMLAH_MAPEL'] > 0)
+    report['STATUS'] = np.where(lulus, 'LULUS', 'TIDAK LULUS')
+    report['RATA_RATA'] = report['RATA_RATA'].round(2)
+    return report.sort_values(['STATUS', 'NAMA_SISWA'], kind='stable', ignore_index=True)
+
+
+def _prune_reports(output_dir, keep=REPORT_KEEP_FILES, min_age=REPORT_MIN_AGE_SECONDS):
+    """
+    Hapus file laporan lama di ``output_dir``, sisakan ``keep`` terbaru
+
+    File yang lebih muda dari ``min_age`` detik tidak pernah dihapus, sehingga
+    laporan yang baru selesai ditulis proses lain (dan belum diunduh) aman
+    walau banyak laporan dibuat bersamaan.
+    """
+    cutoff = time.time() - min_age
+    with _prune_lock:
+        files = []
+        for path in Path(output_dir).glob('laporan_*'):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        files.sort(reverse=True)
+        for mtime, old in files[keep:]:
+            if mtime < cutoff:
+                old.unlink(missing_ok=True)
@@ -0,0 +1,412 @@
+"""
+Modul penulis XLSX streaming
+
+Pengganti ``pd.ExcelWriter(engine='openpyxl')`` untuk data besar. XML setiap
+sheet dibangun per potongan baris secara vektor (nilai unik string/kategori
+di-escape sekali), langsung dikompresi deflate ke file sementara, lalu semua
+bagian dirakit menjadi satu paket ZIP. Memori yang dipakai hanya sebesar
+satu potongan baris, dan sheet yang saling independen (mis. Data_Lengkap,
+Summary_Siswa, Analisis_Mapel) bisa dibangun paralel di proses terpisah.
+
+String ditulis sebagai *inline string* (tanpa tabel shared strings) sehingga
+setiap sheet benar-benar berdiri sendiri.
+"""
+import os
+import re
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.settings import XLSX_CHUNK_ROWS, XLSX_COMPRESS_LEVEL, XLSX_PARALLEL_MIN_ROWS
+
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_COLUMNS = 16384
+
+# Ukuran/offset mulai dari batas ini ditulis di field ekstra ZIP64
+ZIP64_LIMIT = 0xFFFFFFFF
+
+# Indeks cellXfs di styles.xml
+STYLE_DATETIME = 1
+STYLE_HEADER = 2
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_SHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+_ILLEGAL_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Serial tanggal Excel (sistem 1900) dihitung dari 1899-12-30; Excel menganggap
+# 1900 tahun kabisat (serial 60 = 29 Feb 1900), sehingga serial sebelum
+# 1900-03-01 dikurangi satu. Tanggal sebelum 1900 tidak bisa ditampilkan Excel.
+_EXCEL_EPOCH = np.datetime64('1899-12-30T00:00:00', 'ns')
+_EXCEL_LEAP_BUG_SERIAL = 61
+
+
+def write_xlsx(sheets, path, parallel=None, chunk_rows=XLSX_CHUNK_ROWS):
+    """
+    Tulis beberapa DataFrame ke satu file XLSX (tanpa index)
+
+    Parameters:
+    -----------
+    sheets : dict
+        Nama sheet -> DataFrame, sesuai urutan sheet di workbook. Nama
+        disesuaikan aturan Excel; nama yang bentrok setelah itu diberi
+        akhiran `` (2)``, `` (3)``, ...
+    path : str, Path, or file-like
+        File tujuan; path ditulis atomik (file sementara lalu rename),
+        file-like (mis. ``BytesIO``) ditulis berurutan
+    parallel : bool, optional
+        Bangun sheet di proses terpisah. Default: otomatis jika ada lebih
+        dari satu CPU dan total baris >= ``XLSX_PARALLEL_MIN_ROWS``
+    chunk_rows : int
+        Jumlah baris per potongan XML
+
+    Returns:
+    --------
+    path : Path or file-like
+    """
+    sheets = dict(zip(_unique_sheet_names(sheets), sheets.values()))
+    for name, frame in sheets.items():
+        if len(frame) + 1 > XLSX_MAX_ROWS or frame.shape[1] > XLSX_MAX_COLUMNS:
+            raise ValueError(f"Sheet '{name}' melebihi batas Excel ({XLSX_MAX_ROWS:,} baris)")
+
+    if parallel is None:
+        total_rows = sum(len(frame) for frame in sheets.values())
+        parallel = (os.cpu_count() or 1) > 1 and len(sheets) > 1 and total_rows >= XLSX_PARALLEL_MIN_ROWS
+
+    with tempfile.TemporaryDirectory(prefix='xlsx_') as tmp_dir:
+        jobs = [(frame, os.path.join(tmp_dir, f"sheet{i}.xml.deflate"), chunk_rows)
+                for i, frame in enumerate(sheets.values(), start=1)]
+        parts = _build_sheets(jobs, parallel)
+
+        entries = [(f"xl/worksheets/sheet{i}.xml", part) for i, part in enumerate(parts, start=1)]
+        entries = _package_parts(list(sheets)) + entries
+
+        if hasattr(path, 'write'):
+            _write_zip(path, entries)
+            return path
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            _write_zip(f, entries)
+        os.replace(tmp_path, path)
+        return path
+
+
+def xlsx_bytes(sheets, **kwargs):
+    """Isi file XLSX sebagai bytes (untuk ``st.download_button``)"""
+    from io import BytesIO
+    buffer = BytesIO()
+    write_xlsx(sheets, buffer, **kwargs)
+    return buffer.getvalue()
+
+
+def iter_sheet_xml(frame, chunk_rows=XLSX_CHUNK_ROWS):
+    """
+    XML worksheet untuk ``frame`` per potongan baris
+
+    Yields:
+    -------
+    chunk : str
+    """
+    n_rows, n_cols = frame.shape
+    letters = [_column_letter(i) for i in range(max(n_cols, 1))]
+    dimension = f"A1:{letters[-1]}{n_rows + 1}"
+
+    yield (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+           f'<worksheet xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
+           f'<dimension ref="{dimension}"/><sheetData>')
+
+    header = ''.join(
+        f'<c r="{letter}1" s="{STYLE_HEADER}"{_string_fragment(str(column))}'
+        for letter, column in zip(letters, frame.columns)
+    )
+    yield f'<row r="1">{header}</row>'
+
+    for start in range(0, n_rows, chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        row_numbers = [str(r) for r in range(start + 2, start + len(chunk) + 2)]
+        cells = [
+            [f'<c r="{letter}{r}"{frag}' if frag else ''
+             for r, frag in zip(row_numbers, _column_fragments(chunk.iloc[:, j]))]
+            for j, letter in enumerate(letters[:n_cols])
+        ]
+        starts = [f'<row r="{r}">' for r in row_numbers]
+        yield ''.join(map(''.join, zip(starts, *cells, ['</row>'] * len(row_numbers))))
+
+    yield '</sheetData></worksheet>'
+
+
+def _build_sheets(jobs, parallel):
+    """Bangun semua sheet (paralel jika diminta, berurutan jika pool gagal)"""
+    if parallel and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+                return list(pool.map(_write_sheet_part, *zip(*jobs)))
+        except (BrokenProcessPool, OSError):
+            pass
+    return [_write_sheet_part(*job) for job in jobs]
+
+
+def _write_sheet_part(frame, part_path, chunk_rows):
+    """
+    Tulis XML sheet terkompresi (raw deflate) ke ``part_path``
+
+    Returns:
+    --------
+    part : tuple
+        ``(part_path, crc32, ukuran_terkompresi, ukuran_asli)``
+    """
+    compressor = zlib.compressobj(XLSX_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    crc, size, compressed = 0, 0, 0
+    with open(part_path, 'wb') as f:
+        for chunk in iter_sheet_xml(frame, chunk_rows):
+            data = chunk.encode('utf-8')
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            block = compressor.compress(data)
+            compressed += len(block)
+            f.write(block)
+        block = compressor.flush()
+        compressed += len(block)
+        f.write(block)
+    return part_path, crc, compressed, size
+
+
+def _column_fragments(series):
+    """
+    Fragmen XML setiap sel kolom (setelah ``<c r="..."``), '' untuk nilai kosong
+
+    Nilai string/kategori di-escape sekali per nilai unik lalu disebar
+    dengan indeks kode.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = np.array([_value_fragment(value) for value in dtype.categories] + [''], dtype=object)
+        return categories[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_bool_dtype(dtype):
+        values = series.to_numpy(dtype=bool, na_value=False)
+        return np.where(values, ' t="b"><v>1</v></c>', ' t="b"><v>0</v></c>').tolist()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        values = series.dt.tz_localize(None) if getattr(dtype, 'tz', None) else series
+        stamps = values.to_numpy(dtype='datetime64[ns]')
+        serial = _excel_serial((stamps - _EXCEL_EPOCH) / np.timedelta64(1, 'D'))
+        return _number_fragments(serial, f' s="{STYLE_DATETIME}"')
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_complex_dtype(dtype):
+        if pd.api.types.is_extension_array_dtype(dtype):
+            return _number_fragments(series.to_numpy(dtype='float64', na_value=np.nan))
+        return _number_fragments(series.to_numpy())
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    table = np.array([_value_fragment(value) for value in uniques] + [''], dtype=object)
+    return table[codes].tolist()
+
+
+def _number_fragments(values, style=''):
+    """Fragmen sel angka; NaN/inf menjadi sel kosong"""
+    text = values.astype(str)
+    if values.dtype.kind == 'f':
+        text = np.where(np.isfinite(values), text, '')
+    return [f'{style}><v>{v}</v></c>' if v else '' for v in text.tolist()]
+
+
+def _value_fragment(value):
+    """Fragmen satu nilai Python (dipakai untuk nilai unik objek/kategori)"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return f' t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return f'><v>{value}</v></c>' if np.isfinite(value) else ''
+    if isinstance(value, (pd.Timestamp, datetime, np.datetime64)):
+        stamp = pd.Timestamp(value).tz_localize(None)
+        serial = _excel_serial((stamp - pd.Timestamp(_EXCEL_EPOCH)) / pd.Timedelta(days=1))
+        return f' s="{STYLE_DATETIME}"><v>{serial}</v></c>'
+    return _string_fragment(str(value))
+
+
+def _excel_serial(days):
+    """Hari sejak ``_EXCEL_EPOCH`` -> serial Excel (koreksi 29 Feb 1900)"""
+    return np.where(days < _EXCEL_LEAP_BUG_SERIAL, days - 1, days)
+
+
+def _string_fragment(text):
+    text = _ILLEGAL_XML.sub('', text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f' t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+def _column_letter(index):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _sheet_name(name):
+    """Nama sheet valid: tanpa karakter terlarang, maksimal 31 karakter"""
+    name = re.sub(r'[\[\]:*?/\\]', '_', str(name)).strip("'")[:31]
+    return name or 'Sheet'
+
+
+def _unique_sheet_names(names):
+    """Nama sheet valid dan unik (tanpa beda huruf besar/kecil, seperti Excel)"""
+    used = set()
+    unique = []
+    for name in names:
+        base = candidate = _sheet_name(name)
+        counter = 2
+        while candidate.lower() in used:
+            suffix = f' ({counter})'
+            candidate = base[:31 - len(suffix)] + suffix
+            counter += 1
+        used.add(candidate.lower())
+        unique.append(candidate)
+    return unique
+
+
+def _package_parts(sheet_names):
+    """Bagian paket XLSX selain worksheet: content types, relasi, workbook, styles"""
+    n = len(sheet_names)
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_CT_SHEET}"/>'
+                  for i in range(1, n + 1))
+        + '</Types>'
+    )
+    root_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>'
+        + ''.join(f'<sheet name="{_string_text(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                  for i, name in enumerate(sheet_names, start=1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<Relationships xmlns="{_NS_PKG_REL}">'
+        + ''.join(f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                  for i in range(1, n + 1))
+        + f'<Relationship Id="rId{n + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    )
+    styles = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<styleSheet xmlns="{_NS_MAIN}">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/></numFmts>'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+    return [
+        ('[Content_Types].xml', content_types.encode('utf-8')),
+        ('_rels/.rels', root_rels.encode('utf-8')),
+        ('xl/workbook.xml', workbook.encode('utf-8')),
+        ('xl/_rels/workbook.xml.rels', workbook_rels.encode('utf-8')),
+        ('xl/styles.xml', styles.encode('utf-8')),
+    ]
+
+
+def _string_text(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _write_zip(f, entries):
+    """
+    Tulis arsip ZIP (deflate, ZIP64 jika perlu) dari ``entries``
+
+    Setiap entri berupa ``(nama, bytes)`` atau ``(nama, part)`` dengan
+    ``part`` hasil ``_write_sheet_part`` (data sudah terkompresi, disalin apa
+    adanya per blok).
+    """
+    now = datetime.now()
+    dos_time = (now.hour << 11) | (now.minute << 5) | (now.second // 2)
+    dos_date = ((now.year - 1980) << 9) | (now.month << 5) | now.day
+
+    offset, central = 0, []
+    for name, source in entries:
+        if isinstance(source, bytes):
+            crc, size = zlib.crc32(source), len(source)
+            compressor = zlib.compressobj(XLSX_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+            payload = compressor.compress(source) + compressor.flush()
+            compressed = len(payload)
+        else:
+            part_path, crc, compressed, size = source
+            payload = None
+
+        name_bytes = name.encode('utf-8')
+        zip64 = size >= ZIP64_LIMIT or compressed >= ZIP64_LIMIT
+        extra = struct.pack('<HHQQ', 1, 16, size, compressed) if zip64 else b''
+        f.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, 0x0800, 8, dos_time, dos_date, crc,
+            0xFFFFFFFF if zip64 else compressed, 0xFFFFFFFF if zip64 else size, len(name_bytes), len(extra)
+        ))
+        f.write(name_bytes)
+        f.write(extra)
+        if payload is not None:
+            f.write(payload)
+        else:
+            with open(part_path, 'rb') as part:
+                while block := part.read(1 << 20):
+                    f.write(block)
+
+        central.append((name_bytes, crc, compressed, size, offset))
+        offset += 30 + len(name_bytes) + len(extra) + compressed
+
+    cd_start = offset
+    for name_bytes, crc, compressed, size, entry_offset in central:
+        fields = [value for value in (size, compressed, entry_offset) if value >= ZIP64_LIMIT]
+        extra = struct.pack(f'<HH{len(fields)}Q', 1, 8 * len(fields), *fields) if fields else b''
+        f.write(struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, 45, 45 if fields else 20, 0x0800, 8, dos_time, dos_date, crc,
+            _zip32(compressed), _zip32(size), len(name_bytes), len(extra), 0, 0, 0, 0,
+            _zip32(entry_offset)
+        ))
+        f.write(name_bytes)
+        f.write(extra)
+        offset += 46 + len(name_bytes) + len(extra)
+
+    cd_size = offset - cd_start
+    if cd_start >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+        f.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                            len(central), len(central), cd_size, cd_start))
+        f.write(struct.pack('<IIQI', 0x07064b50, 0, offset, 1))
+    f.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(central), len(central),
+                        _zip32(cd_size), _zip32(cd_start), 0))
+
+
+def _zip32(value):
+    """Nilai field 32-bit ZIP: 0xFFFFFFFF jika nilai aslinya ada di ZIP64"""
+    return 0xFFFFFFFF if value >= ZIP64_LIMIT else value